@@ -445,7 +445,7 @@ function DatasetUploadModal() {
             <input
               ref={fileInputRef}
               type="file"
-              accept=".csv,.tsv,.json,.xlsx,.xls,.parquet"
+              accept=".csv,.tsv,.json,.ndjson,.jsonl,.xlsx,.xls,.parquet,.gz,.zst,.zip"
               className="hidden"
               onChange={(event) => handleFilePick(event.target.files?.[0] ?? null)}
             />
@@ -12,6 +12,28 @@ class Settings(BaseSettings):
     supabase_datasets_bucket: str = "datasets"
     supabase_models_bucket: str = "models"
 
+    # Shared on-disk dataset cache
+    dataset_cache_dir: str | None = None
+    dataset_cache_max_mb: int = 2048  # 0 disables the cache
+
+    # Uploads up to this size get interactive profiling priority
+    interactive_upload_max_mb: int = 10
+
+    # Store uploads as deduplicated content-defined chunks plus a manifest
+    chunked_storage_enabled: bool = True
+
+    # Per-process cache of filtered/sorted row orders for the row browser
+    row_browser_cache_mb: int = 256
+
+    # Project SQL: per-query time limit and per-process result cache
+    sql_timeout_seconds: float = 30
+    sql_cache_mb: int = 256
+
+    # In-process jobs (exports, transforms): lease held by this process, renewed by heartbeats
+    worker_id: str | None = None
+    job_lease_seconds: int = 60
+    job_queued_grace_seconds: int = 300
+
     # Groq
     groq_api_key: str | None = None
     groq_model: str = "llama-3.1-70b-versatile"
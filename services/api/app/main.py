@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -8,6 +9,7 @@ from app.middleware.error_handler import error_handler_middleware
 from app.middleware.logging import logging_middleware
 from app.routers import auth, projects, datasets, profiles, visuals, chat, ml, jobs, websocket
 from app.routers import code as code_router
+from app.services.job_lease import sweep_orphaned_jobs
 
 
 logging.basicConfig(
@@ -20,7 +22,9 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     logger.info("Starting DataCanvas API...")
+    sweeper = asyncio.create_task(sweep_orphaned_jobs())
     yield
+    sweeper.cancel()
     logger.info("Shutting down DataCanvas API...")
 
 
@@ -40,6 +44,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Resumable uploads report progress in headers (HEAD /api/datasets/uploads/{id}).
+    expose_headers=["Upload-Offset", "Upload-Length"],
 )
 
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
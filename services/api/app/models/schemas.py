@@ -34,6 +34,14 @@ class DatasetCreate(BaseModel):
     description: Optional[str] = None
 
 
+class SqlQueryRequest(BaseModel):
+    query: str = Field(..., min_length=1, max_length=20000)
+    format: str = Field(default="json", pattern="^(json|arrow)$")
+    max_rows: int = Field(default=10_000, ge=1, le=100_000)
+    # Dataset id -> version id; other datasets use their latest version
+    versions: dict[str, str] = {}
+
+
 class DatasetResponse(BaseModel):
     id: str
     project_id: str
@@ -137,6 +145,8 @@ class JobResponse(BaseModel):
     job_type: str
     status: str
     progress: int
+    priority: int = 50
+    progress_detail: Optional[dict[str, Any]] = None
     payload: dict[str, Any]
     result: Optional[dict[str, Any]] = None
     error_message: Optional[str] = None
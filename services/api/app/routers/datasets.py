@@ -1,12 +1,51 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import re
 import uuid
-from typing import Any
+from typing import Any, BinaryIO, Literal
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Header, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from app.middleware.auth import get_current_user, require_auth, AuthenticatedUser
 from app.config import settings
-from app.services.supabase import supabase_service
-from app.services.file_handler import infer_file_type
+from app.services.supabase import JOB_PRIORITY_DEFAULT, JOB_PRIORITY_INTERACTIVE, supabase_service
+from app.services.file_handler import infer_compression, infer_file_type, zip_member_name
+from app.services.chunk_store import (
+    CDC_MAX_SIZE,
+    build_manifest,
+    put_chunk,
+    store_chunked,
+    stored_chunks,
+    write_manifest,
+)
+from app.services.dataset_export import (
+    EXPORT_FORMATS,
+    export_filename,
+    open_export,
+    run_export_job,
+    stream_export,
+)
+from app.services.dataset_reader import finite_or_null, list_version_sheets, normalize_file_type
+from app.services.pipeline import describe_steps, preview_pipeline, run_pipeline_job, validate_steps
+from app.services.row_browser import FILTER_OPS, MAX_PAGE_SIZE, PAGE_SIZE, browse_rows
+from app.services.schema_sniffer import sniff_head, sniff_schema
+from app.services.storage_reader import chunk_storage_path, iter_object
+from app.services.storage_upload import (
+    CHUNK_SIZE,
+    RESUMABLE_CHUNK_SIZE,
+    UploadConflict,
+    append_resumable_chunk,
+    create_resumable_upload,
+    resumable_offset,
+    terminate_resumable_upload,
+    upload_stream,
+)
+from app.services.version_diff import DIFF_VERSION, compute_version_diff
 
 
 router = APIRouter()
@@ -25,6 +64,7 @@ def _map_version_for_store(version: dict[str, Any]) -> dict[str, Any]:
         "id": version.get("id"),
         "row_count_est": version.get("row_count"),
         "column_count_est": version.get("column_count"),
+        "compression": version.get("compression"),
         "created_at": version.get("created_at"),
     }
 
@@ -133,12 +173,7 @@ async def list_versions(
     return {"versions": mapped}
 
 
-@router.post("/{dataset_id}/upload")
-async def upload_dataset(
-    dataset_id: str,
-    file: UploadFile = File(...),
-    user: AuthenticatedUser = Depends(require_auth),
-):
+async def _get_owned_dataset(dataset_id: str, user: AuthenticatedUser) -> dict:
     dataset_result = await supabase_service.get_dataset(dataset_id)
     dataset = dataset_result.data
     if not dataset:
@@ -146,31 +181,59 @@ async def upload_dataset(
     project = dataset.get("project") or {}
     if project.get("user_id") != user.user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
-
-    file_content = await file.read()
-    file_size = len(file_content)
-    detected_type = infer_file_type(file.filename, file.content_type)
+    return dataset
+
+
+def _detect_upload_type(
+    filename: str | None,
+    content_type: str | None,
+    archive: BinaryIO | None = None,
+) -> tuple[str, str | None]:
+    """File type and compression of an upload; zip archives are typed by their member when readable."""
+    # Compressed uploads stay compressed in storage; readers inflate them as they stream in.
+    compression = infer_compression(filename)
+    type_source = filename
+    if compression == "zip" and archive is not None:
+        type_source = zip_member_name(archive) or filename
+    detected_type = infer_file_type(type_source, content_type)
     if not detected_type:
         raise HTTPException(status_code=400, detail="Unsupported file type")
+    return detected_type, compression
 
-    storage_path = f"{user.user_id}/{dataset_id}/{uuid.uuid4()}/{file.filename}"
 
-    supabase_service.upload_file(
-        bucket=settings.supabase_datasets_bucket,
-        path=storage_path,
-        file_data=file_content,
-        content_type=file.content_type or "application/octet-stream",
-    )
+def _storage_path(user: AuthenticatedUser, dataset_id: str, filename: str | None) -> str:
+    return f"{user.user_id}/{dataset_id}/{uuid.uuid4()}/{filename}"
+
 
+async def _register_version(
+    dataset_id: str,
+    user: AuthenticatedUser,
+    *,
+    storage_path: str,
+    filename: str | None,
+    file_type: str,
+    file_size: int,
+    compression: str | None,
+    preliminary_schema: dict | None,
+    content_sha256: str | None = None,
+    chunk_count: int | None = None,
+    stored_bytes: int | None = None,
+) -> dict:
+    """Record a stored upload as a new dataset version and queue its profile job."""
     supabase_service.client.table("datasets").update({
-        "file_type": detected_type,
-        "original_filename": file.filename,
+        "file_type": file_type,
+        "original_filename": filename,
     }).eq("id", dataset_id).execute()
 
     version_result = await supabase_service.create_dataset_version(
         dataset_id=dataset_id,
         storage_path=storage_path,
         file_size_bytes=file_size,
+        compression=compression,
+        preliminary_schema=preliminary_schema,
+        content_sha256=content_sha256,
+        chunk_count=chunk_count,
+        stored_bytes=stored_bytes,
         status="uploaded",
     )
     if not version_result.data:
@@ -178,16 +241,749 @@ async def upload_dataset(
 
     version_id = version_result.data[0]["id"]
 
+    # Small files are interactive: let them overtake bulk work in the profiler queue.
+    is_small = file_size <= settings.interactive_upload_max_mb * 1024 * 1024
     job_result = await supabase_service.create_job(
         user_id=user.user_id,
         job_type="profile",
         payload={"version_id": version_id, "storage_path": storage_path},
+        priority=JOB_PRIORITY_INTERACTIVE if is_small else JOB_PRIORITY_DEFAULT,
     )
 
     await supabase_service.update_dataset_version(version_id, status="profiling")
 
     job_id = job_result.data[0]["id"] if job_result.data else None
-    return {"dataset_version_id": version_id, "job_id": job_id}
+    return {"dataset_version_id": version_id, "job_id": job_id, "preliminary_schema": preliminary_schema}
+
+
+@router.post("/{dataset_id}/upload")
+async def upload_dataset(
+    dataset_id: str,
+    file: UploadFile = File(...),
+    user: AuthenticatedUser = Depends(require_auth),
+):
+    """
+    Upload a dataset file in one request.
+
+    The multipart body is spooled to disk by the framework. With chunked
+    storage enabled it is split into content-defined chunks and only chunks
+    the user has not stored before are uploaded, under a manifest at the
+    version's storage path. Otherwise it is streamed to storage as one object,
+    ``CHUNK_SIZE`` bytes at a time and hashed and measured on the way. Either
+    way memory use does not grow with the file. Multi-GB files should use the
+    resumable endpoints below.
+    """
+    await _get_owned_dataset(dataset_id, user)
+    file_type, compression = _detect_upload_type(file.filename, file.content_type, file.file)
+    if file.size is None:
+        file.file.seek(0, io.SEEK_END)
+        file.size = file.file.tell()
+
+    # Columns, dtypes and a row estimate from the first chunk, so the UI can
+    # render before the profile job finishes.
+    preliminary_schema = await asyncio.to_thread(sniff_schema, file.file, file_type, file.size, compression)
+
+    storage_path = _storage_path(user, dataset_id, file.filename)
+    if settings.chunked_storage_enabled:
+        stored = await store_chunked(settings.supabase_datasets_bucket, user.user_id, storage_path, file.file)
+        return await _register_version(
+            dataset_id,
+            user,
+            storage_path=storage_path,
+            filename=file.filename,
+            file_type=file_type,
+            file_size=stored["size"],
+            compression=compression,
+            preliminary_schema=preliminary_schema,
+            content_sha256=stored["sha256"],
+            chunk_count=stored["chunk_count"],
+            stored_bytes=stored["stored_bytes"],
+        )
+
+    digest = hashlib.sha256()
+    written = 0
+
+    async def chunks():
+        nonlocal written
+        await file.seek(0)
+        while chunk := await file.read(CHUNK_SIZE):
+            digest.update(chunk)
+            written += len(chunk)
+            yield chunk
+
+    await upload_stream(
+        settings.supabase_datasets_bucket,
+        storage_path,
+        chunks(),
+        file.size,
+        file.content_type or "application/octet-stream",
+    )
+
+    return await _register_version(
+        dataset_id,
+        user,
+        storage_path=storage_path,
+        filename=file.filename,
+        file_type=file_type,
+        file_size=written,
+        compression=compression,
+        preliminary_schema=preliminary_schema,
+        content_sha256=digest.hexdigest(),
+    )
+
+
+class ResumableUploadRequest(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    content_type: str | None = None
+
+
+async def _get_upload_session(upload_id: str, user: AuthenticatedUser) -> dict:
+    result = await supabase_service.get_upload_session(upload_id)
+    session = result.data
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if session.get("user_id") != user.user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    return session
+
+
+async def _read_chunk(request: Request, limit: int) -> bytes:
+    """Read a request body of at most ``limit`` bytes."""
+    buffer = bytearray()
+    async for part in request.stream():
+        buffer.extend(part)
+        if len(buffer) > limit:
+            raise HTTPException(status_code=413, detail=f"Chunks may not exceed {limit} bytes")
+    return bytes(buffer)
+
+
+def _offset_conflict(offset: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={"message": "Upload-Offset does not match the upload", "offset": offset},
+    )
+
+
+@router.post("/{dataset_id}/uploads", status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    dataset_id: str,
+    payload: ResumableUploadRequest,
+    user: AuthenticatedUser = Depends(require_auth),
+):
+    """
+    Start a resumable upload (relayed to the storage TUS endpoint).
+
+    The client sends the file as raw ``chunk_size`` pieces with
+    ``PATCH /uploads/{upload_id}`` and an ``Upload-Offset`` header. After an
+    interruption, ``HEAD /uploads/{upload_id}`` returns the offset to resume
+    from. The API buffers at most one chunk per request.
+    """
+    await _get_owned_dataset(dataset_id, user)
+    file_type, compression = _detect_upload_type(payload.filename, payload.content_type)
+    storage_path = _storage_path(user, dataset_id, payload.filename)
+    content_type = payload.content_type or "application/octet-stream"
+
+    upload_url = await create_resumable_upload(
+        settings.supabase_datasets_bucket, storage_path, payload.size, content_type
+    )
+    result = await supabase_service.create_upload_session(
+        user_id=user.user_id,
+        dataset_id=dataset_id,
+        storage_path=storage_path,
+        filename=payload.filename,
+        file_type=file_type,
+        compression=compression,
+        content_type=content_type,
+        size=payload.size,
+        upload_url=upload_url,
+        status="active",
+    )
+    if not result.data:
+        raise HTTPException(status_code=400, detail="Failed to create upload")
+    return {"upload_id": result.data[0]["id"], "offset": 0, "chunk_size": RESUMABLE_CHUNK_SIZE}
+
+
+@router.head("/uploads/{upload_id}")
+async def get_upload_offset(upload_id: str, user: AuthenticatedUser = Depends(require_auth)):
+    """Report how many bytes storage has received (``Upload-Offset``)."""
+    session = await _get_upload_session(upload_id, user)
+    offset = session.get("received_bytes") or 0
+    if session.get("status") == "active":
+        offset = await resumable_offset(session["upload_url"])
+        if offset != session.get("received_bytes"):
+            await supabase_service.update_upload_session(upload_id, received_bytes=offset)
+    return Response(headers={
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(session["size"]),
+        "Cache-Control": "no-store",
+    })
+
+
+@router.patch("/uploads/{upload_id}")
+async def append_upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    upload_checksum: str | None = Header(None, alias="Upload-Checksum"),
+    user: AuthenticatedUser = Depends(require_auth),
+):
+    """
+    Append the request body at ``Upload-Offset``.
+
+    Every chunk but the last must be exactly ``chunk_size`` bytes. An optional
+    ``Upload-Checksum: sha256 <base64 digest>`` is verified before the chunk is
+    forwarded. The chunk that completes the upload creates the dataset version
+    and queues profiling, like a one-shot upload.
+
+    Unlike one-shot uploads, resumable versions have no ``content_sha256`` and
+    are stored as one plain object rather than deduplicated chunks: the file
+    is never on the API whole, chunks may arrive in different processes, and
+    a running digest cannot be carried between requests.
+    """
+    session = await _get_upload_session(upload_id, user)
+    if session.get("status") != "active":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Upload is {session.get('status')}")
+    size = session["size"]
+    if upload_offset != session.get("received_bytes"):
+        # The last PATCH may have reached storage without its offset being recorded.
+        actual = await resumable_offset(session["upload_url"])
+        await supabase_service.update_upload_session(upload_id, received_bytes=actual)
+        if upload_offset != actual:
+            raise _offset_conflict(actual)
+
+    chunk = await _read_chunk(request, RESUMABLE_CHUNK_SIZE)
+    if len(chunk) != min(RESUMABLE_CHUNK_SIZE, size - upload_offset):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chunks must be {RESUMABLE_CHUNK_SIZE} bytes; only the last one may be shorter",
+        )
+    if upload_checksum:
+        algorithm, _, expected = upload_checksum.partition(" ")
+        if algorithm.lower() != "sha256":
+            raise HTTPException(status_code=400, detail="Only sha256 checksums are supported")
+        if base64.b64encode(hashlib.sha256(chunk).digest()).decode("ascii") != expected.strip():
+            # 460 is the TUS checksum-mismatch status.
+            raise HTTPException(status_code=460, detail="Checksum mismatch")
+
+    updates: dict[str, Any] = {}
+    if upload_offset == 0:
+        updates["preliminary_schema"] = await asyncio.to_thread(
+            sniff_head, chunk, session["file_type"], size, session.get("compression")
+        )
+    try:
+        offset = await append_resumable_chunk(session["upload_url"], upload_offset, chunk)
+    except UploadConflict as exc:
+        await supabase_service.update_upload_session(upload_id, received_bytes=exc.offset)
+        raise _offset_conflict(exc.offset)
+    updates["received_bytes"] = offset
+
+    if offset < size:
+        await supabase_service.update_upload_session(upload_id, **updates)
+        return {"offset": offset, "complete": False}
+
+    preliminary_schema = updates.get("preliminary_schema", session.get("preliminary_schema"))
+    registered = await _register_version(
+        session["dataset_id"],
+        user,
+        storage_path=session["storage_path"],
+        filename=session["filename"],
+        file_type=session["file_type"],
+        file_size=size,
+        compression=session.get("compression"),
+        preliminary_schema=preliminary_schema,
+    )
+    await supabase_service.update_upload_session(
+        upload_id,
+        status="completed",
+        dataset_version_id=registered["dataset_version_id"],
+        **updates,
+    )
+    return {"offset": offset, "complete": True, **registered}
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str, user: AuthenticatedUser = Depends(require_auth)):
+    """Abandon an unfinished upload and discard what storage has received."""
+    session = await _get_upload_session(upload_id, user)
+    if session.get("status") != "active":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Upload is {session.get('status')}")
+    await terminate_resumable_upload(session["upload_url"])
+    await supabase_service.update_upload_session(upload_id, status="aborted")
+    return {"success": True}
+
+
+_SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+
+def _check_hashes(hashes: list[str]) -> None:
+    if not all(_SHA256_HEX.fullmatch(value) for value in hashes):
+        raise HTTPException(status_code=400, detail="Chunk hashes must be lowercase hex sha256 digests")
+
+
+class ChunkLookupRequest(BaseModel):
+    hashes: list[str] = Field(max_length=10000)
+
+
+class ManifestCommitRequest(BaseModel):
+    filename: str
+    content_type: str | None = None
+    chunks: list[str] = Field(min_length=1, max_length=100000)
+
+
+@router.post("/chunks/missing")
+async def find_missing_chunks(payload: ChunkLookupRequest, user: AuthenticatedUser = Depends(require_auth)):
+    """
+    Which of these chunk hashes the server does not have yet.
+
+    Clients that split files with the same content-defined chunking as
+    ``chunk_store`` upload only the missing chunks (``PUT /chunks/{sha256}``)
+    and then commit a manifest, so refreshing a dataset only transfers the
+    chunks that changed.
+    """
+    _check_hashes(payload.hashes)
+    stored = await stored_chunks(user.user_id, payload.hashes)
+    return {"missing": [value for value in dict.fromkeys(payload.hashes) if value not in stored]}
+
+
+@router.put("/chunks/{sha256}")
+async def upload_chunk(sha256: str, request: Request, user: AuthenticatedUser = Depends(require_auth)):
+    """Store one chunk; the body must hash to ``sha256``."""
+    _check_hashes([sha256])
+    data = await _read_chunk(request, CDC_MAX_SIZE)
+    if hashlib.sha256(data).hexdigest() != sha256:
+        raise HTTPException(status_code=400, detail="Chunk does not match its hash")
+    await put_chunk(settings.supabase_datasets_bucket, user.user_id, sha256, data)
+    return {"sha256": sha256, "size": len(data)}
+
+
+@router.post("/{dataset_id}/manifest")
+async def commit_manifest(
+    dataset_id: str,
+    payload: ManifestCommitRequest,
+    user: AuthenticatedUser = Depends(require_auth),
+):
+    """
+    Create a dataset version from chunks already on the server, in order.
+    Responds 409 with the missing hashes if any chunk has not been uploaded.
+
+    Every chunk is already stored, so the version adds no stored bytes. Its
+    ``content_sha256`` stays null: the server never sees the file whole here,
+    and a client-supplied digest cannot be checked without downloading every
+    chunk, so it would let a client claim another file's content.
+    """
+    await _get_owned_dataset(dataset_id, user)
+    _check_hashes(payload.chunks)
+    file_type, compression = _detect_upload_type(payload.filename, payload.content_type)
+    stored = await stored_chunks(user.user_id, payload.chunks)
+    missing = [value for value in dict.fromkeys(payload.chunks) if value not in stored]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Chunks have not been uploaded", "missing": missing},
+        )
+
+    chunks = [{"sha256": value, "size": stored[value]} for value in payload.chunks]
+    size = sum(chunk["size"] for chunk in chunks)
+    bucket = settings.supabase_datasets_bucket
+    head = await asyncio.to_thread(supabase_service.download_file, bucket, chunk_storage_path(user.user_id, chunks[0]["sha256"]))
+    preliminary_schema = await asyncio.to_thread(sniff_head, head, file_type, size, compression)
+
+    storage_path = _storage_path(user, dataset_id, payload.filename)
+    await write_manifest(bucket, storage_path, build_manifest(chunks, size, None))
+    return await _register_version(
+        dataset_id,
+        user,
+        storage_path=storage_path,
+        filename=payload.filename,
+        file_type=file_type,
+        file_size=size,
+        compression=compression,
+        preliminary_schema=preliminary_schema,
+        chunk_count=len(chunks),
+        stored_bytes=0,
+    )
+
+
+@router.get("/versions/{version_id}/sheets")
+async def get_version_sheets(
+    version_id: str,
+    user: AuthenticatedUser | None = Depends(get_current_user),
+):
+    """Sheets of a workbook version; each can be loaded as its own view via ``sheet``."""
+    version_result = await supabase_service.get_dataset_version(version_id)
+    version = version_result.data
+    if not version:
+        raise HTTPException(status_code=404, detail="Dataset version not found")
+
+    dataset = version.get("dataset") or {}
+    project = dataset.get("project") or {}
+    if not project.get("is_demo"):
+        if not user or project.get("user_id") != user.user_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+    return {"sheets": await list_version_sheets(version)}
+
+
+async def _get_accessible_version(version_id: str, user: AuthenticatedUser | None) -> dict:
+    version_result = await supabase_service.get_dataset_version(version_id)
+    version = version_result.data
+    if not version:
+        raise HTTPException(status_code=404, detail="Dataset version not found")
+    _assert_dataset_access(version.get("dataset") or {}, user)
+    return version
+
+
+@router.get("/versions/{version_id}/diff/{other_version_id}")
+async def diff_versions(
+    version_id: str,
+    other_version_id: str,
+    key: list[str] | None = Query(None),
+    user: AuthenticatedUser | None = Depends(get_current_user),
+):
+    """
+    What changed from ``version_id`` (base) to ``other_version_id``: schema
+    changes, per-column stat deltas with PSI/KS distribution shift, and
+    added/removed rows. ``key`` (repeatable) names the columns identifying a
+    row; with it, edited rows are also counted as changed. Both versions must
+    belong to the same dataset.
+
+    Results are cached per version pair and key, and refreshed when either
+    version is re-profiled.
+    """
+    base = await _get_accessible_version(version_id, user)
+    target = await _get_accessible_version(other_version_id, user)
+    if base.get("dataset_id") != target.get("dataset_id"):
+        raise HTTPException(status_code=400, detail="Only versions of the same dataset can be compared")
+    key = sorted(set(key)) if key else None
+    key_columns = json.dumps(key) if key else ""
+
+    profiles_result = await supabase_service.get_profiles([version_id, other_version_id])
+    profiles = {profile["version_id"]: profile for profile in profiles_result.data or []}
+    base_profile, target_profile = profiles.get(version_id), profiles.get(other_version_id)
+    if base_profile is None or target_profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Both versions must finish profiling before they can be compared",
+        )
+
+    cached_result = await supabase_service.get_version_diff(version_id, other_version_id, key_columns)
+    cached = (cached_result.data or [None])[0]
+    if (
+        cached
+        and cached.get("diff_version") == DIFF_VERSION
+        and cached.get("base_profile_at") == base_profile.get("computed_at")
+        and cached.get("target_profile_at") == target_profile.get("computed_at")
+    ):
+        return {"diff": cached["result"], "cached": True}
+
+    try:
+        diff = await compute_version_diff(base, target, base_profile, target_profile, key)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    await supabase_service.save_version_diff(
+        base_version_id=version_id,
+        target_version_id=other_version_id,
+        key_columns=key_columns,
+        diff_version=DIFF_VERSION,
+        base_profile_at=base_profile.get("computed_at"),
+        target_profile_at=target_profile.get("computed_at"),
+        result=diff,
+    )
+    return {"diff": diff, "cached": False}
+
+
+class RowFilter(BaseModel):
+    column: str
+    op: Literal[FILTER_OPS]
+    value: Any = None
+
+
+class RowSort(BaseModel):
+    column: str
+    descending: bool = False
+
+
+class RowBrowseRequest(BaseModel):
+    columns: list[str] | None = None
+    filters: list[RowFilter] = Field(default_factory=list, max_length=50)
+    sort: list[RowSort] = Field(default_factory=list, max_length=10)
+    offset: int = Field(0, ge=0)
+    limit: int = Field(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+
+@router.post("/versions/{version_id}/rows")
+async def browse_version_rows(
+    version_id: str,
+    payload: RowBrowseRequest,
+    user: AuthenticatedUser | None = Depends(get_current_user),
+):
+    """
+    A page of a version's rows for the data grid, after ``filters`` (all must
+    match), ``sort`` and column projection. ``next_offset`` is None on the
+    last page.
+    """
+    version = await _get_accessible_version(version_id, user)
+    try:
+        return await browse_rows(
+            version,
+            columns=payload.columns,
+            filters=[item.model_dump() for item in payload.filters],
+            sort=[item.model_dump() for item in payload.sort],
+            offset=payload.offset,
+            limit=payload.limit,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+class ExportRequest(BaseModel):
+    format: Literal["csv", "parquet", "arrow"] = "csv"
+    columns: list[str] | None = None
+    filters: list[RowFilter] = Field(default_factory=list, max_length=50)
+
+
+def _attachment(filename: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+@router.post("/versions/{version_id}/export")
+async def export_version(
+    version_id: str,
+    payload: ExportRequest,
+    user: AuthenticatedUser | None = Depends(get_current_user),
+):
+    """
+    Download a version as CSV, Parquet or Arrow IPC, optionally filtered (same
+    filters as the row browser) and projected to ``columns``. The body is
+    streamed with chunked transfer encoding while the export is written.
+    """
+    version = await _get_accessible_version(version_id, user)
+    try:
+        stack, plan = await asyncio.to_thread(
+            open_export, version, payload.columns, [item.model_dump() for item in payload.filters]
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return StreamingResponse(
+        stream_export(stack, plan, payload.format),
+        media_type=EXPORT_FORMATS[payload.format][1],
+        headers=_attachment(export_filename(version, payload.format)),
+    )
+
+
+@router.post("/versions/{version_id}/export-jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    version_id: str,
+    payload: ExportRequest,
+    background_tasks: BackgroundTasks,
+    user: AuthenticatedUser = Depends(require_auth),
+):
+    """
+    Queue an export to storage for large versions; poll ``/api/jobs/{id}``
+    and fetch the file from ``/api/datasets/exports/{job_id}`` once it is done.
+    Identical pending exports are coalesced into one job.
+    """
+    version = await _get_accessible_version(version_id, user)
+    filters = [item.model_dump() for item in payload.filters]
+    job_result = await supabase_service.create_job(
+        user_id=user.user_id,
+        job_type="export",
+        payload={
+            "version_id": version_id,
+            "user_id": user.user_id,
+            "format": payload.format,
+            "columns": payload.columns,
+            "filters": filters,
+        },
+    )
+    if not job_result.data:
+        raise HTTPException(status_code=400, detail="Failed to create export job")
+    job = job_result.data[0]
+    if job.get("status") == "queued":
+        background_tasks.add_task(
+            run_export_job, job["id"], user.user_id, version, payload.format, payload.columns, filters
+        )
+    return {"job": job}
+
+
+@router.get("/exports/{job_id}")
+async def download_export(job_id: str, user: AuthenticatedUser = Depends(require_auth)):
+    """Stream the file written by a completed export job."""
+    job_result = await supabase_service.get_job(job_id)
+    job = job_result.data
+    if not job or job.get("job_type") != "export":
+        raise HTTPException(status_code=404, detail="Export not found")
+    if job.get("user_id") != user.user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    if job.get("status") != "completed":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Export is {job.get('status')}")
+    result = job.get("result") or {}
+    headers = _attachment(result.get("filename") or result["storage_path"].rsplit("/", 1)[-1])
+    if result.get("size") is not None:
+        headers["Content-Length"] = str(result["size"])
+    return StreamingResponse(
+        iter_object(settings.supabase_datasets_bucket, result["storage_path"]),
+        media_type=EXPORT_FORMATS[result["format"]][1],
+        headers=headers,
+    )
+
+
+class PipelineRequest(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)
+    steps: list[dict[str, Any]] = Field(default_factory=list)
+
+
+class PipelineUpdateRequest(BaseModel):
+    name: str | None = Field(None, min_length=1, max_length=200)
+    steps: list[dict[str, Any]] | None = None
+
+
+class PipelineRunRequest(BaseModel):
+    version_id: str | None = None
+
+
+class PipelinePreviewRequest(PipelineRunRequest):
+    limit: int = Field(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+
+def _checked_steps(steps: list[dict]) -> list[dict]:
+    try:
+        validate_steps(steps)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return steps
+
+
+def _pipeline_payload(pipeline: dict) -> dict:
+    return {**pipeline, "plan": describe_steps(pipeline.get("steps") or [])}
+
+
+async def _get_owned_pipeline(pipeline_id: str, user: AuthenticatedUser) -> tuple[dict, dict]:
+    pipeline_result = await supabase_service.get_pipeline(pipeline_id)
+    pipeline = pipeline_result.data
+    if not pipeline:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    dataset = await _get_owned_dataset(pipeline["dataset_id"], user)
+    return pipeline, dataset
+
+
+async def _pipeline_source(dataset: dict, version_id: str | None) -> dict:
+    """The requested version of the pipeline's dataset, or its latest one."""
+    if version_id is None:
+        versions = dataset.get("dataset_versions") or []
+        if not versions:
+            raise HTTPException(status_code=400, detail="Dataset has no versions")
+        version_id = max(versions, key=lambda item: item.get("version_number") or 0)["id"]
+    version_result = await supabase_service.get_dataset_version(version_id)
+    version = version_result.data
+    if not version or version.get("dataset_id") != dataset["id"]:
+        raise HTTPException(status_code=404, detail="Dataset version not found")
+    return version
+
+
+@router.get("/{dataset_id}/pipelines")
+async def list_pipelines(
+    dataset_id: str,
+    user: AuthenticatedUser | None = Depends(get_current_user),
+):
+    result = await supabase_service.get_dataset(dataset_id)
+    dataset = result.data
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    _assert_dataset_access(dataset, user)
+    pipelines = await supabase_service.get_pipelines(dataset_id)
+    return {"pipelines": [_pipeline_payload(pipeline) for pipeline in pipelines.data or []]}
+
+
+@router.post("/{dataset_id}/pipelines", status_code=status.HTTP_201_CREATED)
+async def create_pipeline(
+    dataset_id: str,
+    payload: PipelineRequest,
+    user: AuthenticatedUser = Depends(require_auth),
+):
+    """
+    Save a transformation plan: an ordered list of steps, each
+    ``{"op": ..., ...}`` with op one of filter, cast, impute, drop, rename,
+    derive or dedupe.
+    """
+    await _get_owned_dataset(dataset_id, user)
+    result = await supabase_service.create_pipeline(dataset_id, payload.name, _checked_steps(payload.steps))
+    if not result.data:
+        raise HTTPException(status_code=400, detail="Failed to create pipeline")
+    return {"pipeline": _pipeline_payload(result.data[0])}
+
+
+@router.put("/pipelines/{pipeline_id}")
+async def update_pipeline(
+    pipeline_id: str,
+    payload: PipelineUpdateRequest,
+    user: AuthenticatedUser = Depends(require_auth),
+):
+    """Rename a pipeline or replace its steps; unchanged leading steps keep their cached results."""
+    pipeline, _dataset = await _get_owned_pipeline(pipeline_id, user)
+    updates = {}
+    if payload.name is not None:
+        updates["name"] = payload.name
+    if payload.steps is not None:
+        updates["steps"] = _checked_steps(payload.steps)
+    if not updates:
+        return {"pipeline": _pipeline_payload(pipeline)}
+    result = await supabase_service.update_pipeline(pipeline_id, **updates)
+    return {"pipeline": _pipeline_payload(result.data[0] if result.data else {**pipeline, **updates})}
+
+
+@router.post("/pipelines/{pipeline_id}/preview")
+async def preview_pipeline_rows(
+    pipeline_id: str,
+    payload: PipelinePreviewRequest,
+    user: AuthenticatedUser = Depends(require_auth),
+):
+    """The first ``limit`` output rows of the pipeline, without storing anything."""
+    pipeline, dataset = await _get_owned_pipeline(pipeline_id, user)
+    version = await _pipeline_source(dataset, payload.version_id)
+    try:
+        frame = await asyncio.to_thread(preview_pipeline, version, pipeline.get("steps") or [], payload.limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {
+        "columns": [{"name": name, "dtype": str(dtype)} for name, dtype in frame.schema.items()],
+        "rows": finite_or_null(frame).to_dicts(),
+    }
+
+
+@router.post("/pipelines/{pipeline_id}/run", status_code=status.HTTP_202_ACCEPTED)
+async def run_pipeline(
+    pipeline_id: str,
+    payload: PipelineRunRequest,
+    background_tasks: BackgroundTasks,
+    user: AuthenticatedUser = Depends(require_auth),
+):
+    """
+    Queue a ``transform`` job that runs the pipeline over ``version_id`` (the
+    latest version by default) and stores the output as a new version of the
+    dataset. Poll ``/api/jobs/{id}``; the result names the new version.
+    """
+    pipeline, dataset = await _get_owned_pipeline(pipeline_id, user)
+    if normalize_file_type(dataset.get("file_type"), "") in ["xlsx", "xls"]:
+        raise HTTPException(status_code=400, detail="Pipelines are not supported for workbook datasets")
+    version = await _pipeline_source(dataset, payload.version_id)
+    job_result = await supabase_service.create_job(
+        user_id=user.user_id,
+        job_type="transform",
+        payload={
+            "pipeline_id": pipeline_id,
+            "version_id": version["id"],
+            "user_id": user.user_id,
+            "steps": pipeline.get("steps") or [],
+        },
+    )
+    if not job_result.data:
+        raise HTTPException(status_code=400, detail="Failed to create pipeline job")
+    job = job_result.data[0]
+    if job.get("status") == "queued":
+        background_tasks.add_task(run_pipeline_job, job["id"], user.user_id, pipeline, version)
+    return {"job": job}
 
 
 @router.get("/versions/{version_id}/profile")
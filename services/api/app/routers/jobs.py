@@ -25,3 +25,21 @@ async def get_job(job_id: str, user: AuthenticatedUser = Depends(require_auth)):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
     job["status"] = _map_job_status(job.get("status"))
     return {"job": job}
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str, user: AuthenticatedUser = Depends(require_auth)):
+    """Cancel a queued or running job; running workers stop at their next checkpoint."""
+    result = await supabase_service.get_job(job_id)
+    job = result.data
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.get("user_id") and job.get("user_id") != user.user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    if not await supabase_service.cancel_job(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is already {_map_job_status(job.get('status'))}",
+        )
+    job["status"] = "cancelled"
+    return {"job": job}
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 
 from app.middleware.auth import get_current_user, require_auth, AuthenticatedUser
-from app.models.schemas import ProjectCreate, ProjectUpdate, DatasetCreate
+from app.models.schemas import ProjectCreate, ProjectUpdate, DatasetCreate, SqlQueryRequest
+from app.services.dataset_reader import finite_or_null
+from app.services.sql_query import QueryTimeout, run_query, table_name
 from app.services.supabase import supabase_service
 
 
@@ -120,3 +122,72 @@ async def create_project_dataset(
     if not result.data:
         raise HTTPException(status_code=400, detail="Failed to create dataset")
     return {"dataset": result.data[0]}
+
+
+def _project_tables(datasets: list[dict], pins: dict[str, str]) -> dict[str, dict]:
+    """SQL table name -> dataset version (pinned, else the latest stored one)."""
+    tables, taken = {}, set()
+    unknown = set(pins) - {dataset["id"] for dataset in datasets}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Datasets not in this project: {', '.join(sorted(unknown))}")
+    for dataset in sorted(datasets, key=lambda item: item.get("created_at") or ""):
+        versions = [version for version in dataset.get("dataset_versions") or [] if version.get("storage_path")]
+        if dataset["id"] in pins:
+            versions = [version for version in versions if version["id"] == pins[dataset["id"]]]
+            if not versions:
+                raise HTTPException(status_code=400, detail=f"Version {pins[dataset['id']]} not found for dataset {dataset['id']}")
+        if not versions:
+            continue
+        version = max(versions, key=lambda item: item.get("version_number") or 0)
+        info = {key: value for key, value in dataset.items() if key != "dataset_versions"}
+        tables[table_name(dataset.get("name") or "", taken)] = {**version, "dataset": info}
+    return tables
+
+
+@router.post("/{project_id}/sql")
+async def query_project(
+    project_id: str,
+    payload: SqlQueryRequest,
+    user: AuthenticatedUser | None = Depends(get_current_user),
+):
+    """
+    Run a read-only SQL query over the project's datasets. Each dataset is a
+    table named after it (lowercased, non-alphanumerics as ``_``) holding its
+    latest version, or the one pinned in ``versions``. At most ``max_rows``
+    rows come back, as columnar JSON or (``format=arrow``) an Arrow IPC stream.
+    """
+    project_result = await supabase_service.get_project(project_id)
+    project = project_result.data
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    _assert_project_access(project, user)
+    datasets = await supabase_service.get_datasets(project_id)
+    tables = _project_tables(datasets.data or [], payload.versions)
+
+    try:
+        result = await run_query(payload.query, tables, max_rows=payload.max_rows)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except QueryTimeout as exc:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(exc)) from exc
+
+    frame = result["frame"]
+    if payload.format == "arrow":
+        return Response(
+            content=frame.write_ipc_stream(None).getvalue(),
+            media_type="application/vnd.apache.arrow.stream",
+            headers={
+                "X-Row-Count": str(frame.height),
+                "X-Truncated": str(result["truncated"]).lower(),
+                "X-Cached": str(result["cached"]).lower(),
+            },
+        )
+    return {
+        "tables": {name: {"dataset_id": version["dataset"]["id"], "version_id": version["id"]} for name, version in tables.items()},
+        "columns": [{"name": name, "dtype": str(dtype)} for name, dtype in frame.schema.items()],
+        "data": finite_or_null(frame).to_dict(as_series=False),
+        "row_count": frame.height,
+        "truncated": result["truncated"],
+        "cached": result["cached"],
+        "elapsed_ms": result["elapsed_ms"],
+    }
@@ -1,4 +1,3 @@
-import io
 from typing import Optional
 
 import numpy as np
@@ -6,9 +5,9 @@ import polars as pl
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 
-from app.config import settings
 from app.middleware.auth import get_current_user, require_auth, AuthenticatedUser
 from app.models.schemas import VisualizationCreate
+from app.services.dataset_reader import load_version_frame
 from app.services.supabase import supabase_service
 
 
@@ -19,6 +18,7 @@ class VisualRequest(BaseModel):
     kind: str
     seed: int = 42
     dataset_version_id: Optional[str] = None
+    sheet: Optional[str] = None
 
 
 def _assert_project_access(project: dict, user: AuthenticatedUser | None):
@@ -35,7 +35,7 @@ async def simulate_visual(request: VisualRequest, user: AuthenticatedUser | None
     df = None
 
     if request.dataset_version_id:
-        df = await _load_dataset(request.dataset_version_id, user)
+        df = await _load_dataset(request.dataset_version_id, user, request.sheet)
         if df is None:
             raise HTTPException(status_code=404, detail="Dataset version not found")
 
@@ -163,7 +163,11 @@ async def save_visualization(
     return {"visualization": result.data[0]}
 
 
-async def _load_dataset(version_id: str, user: AuthenticatedUser | None) -> pl.DataFrame | None:
+async def _load_dataset(
+    version_id: str,
+    user: AuthenticatedUser | None,
+    sheet: Optional[str] = None,
+) -> pl.DataFrame | None:
     version_result = await supabase_service.get_dataset_version(version_id)
     version = version_result.data
     if not version:
@@ -175,30 +179,7 @@ async def _load_dataset(version_id: str, user: AuthenticatedUser | None) -> pl.D
         if not user or project.get("user_id") != user.user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    file_path = version.get("storage_path")
-    if not file_path:
-        return None
-    file_type = (dataset.get("file_type") or "").lower()
-    file_bytes = supabase_service.download_file(settings.supabase_datasets_bucket, file_path)
-
-    buffer = io.BytesIO(file_bytes)
-    if "/" in file_type:
-        file_type = file_type.split("/")[-1]
-    if not file_type and "." in file_path:
-        file_type = file_path.rsplit(".", 1)[-1].lower()
-    if file_type in ["csv", "txt"]:
-        return pl.read_csv(buffer)
-    if file_type in ["tsv"]:
-        return pl.read_csv(buffer, separator="\t")
-    if file_type in ["json", "ndjson"]:
-        return pl.read_json(buffer)
-    if file_type in ["parquet"]:
-        return pl.read_parquet(buffer)
-    if file_type in ["xlsx", "xls"]:
-        import pandas as pd
-
-        return pl.from_pandas(pd.read_excel(buffer))
-    raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_type}")
+    return await load_version_frame(version, sheet)
 
 
 def _numeric_columns(df: pl.DataFrame) -> list[str]:
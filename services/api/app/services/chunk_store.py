@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import threading
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+from app.services.storage_reader import CHUNK_MANIFEST_CONTENT_TYPE, chunk_storage_path
+from app.services.storage_upload import upload_object
+from app.services.supabase import supabase_service
+
+# Content-defined chunking: a chunk ends wherever the rolling hash of the last
+# CDC_WINDOW bytes has its top CDC_BOUNDARY_BITS bits clear, so boundaries
+# move with the content and an edit only changes the chunks around it.
+# Chunks average about CDC_MIN_SIZE + 2**CDC_BOUNDARY_BITS bytes (~1.25 MiB).
+CDC_MIN_SIZE = 256 * 1024
+CDC_MAX_SIZE = 4 * 1024 * 1024
+CDC_BOUNDARY_BITS = 20
+CDC_WINDOW = 48
+
+UPLOAD_CONCURRENCY = 4
+# PostgREST ``in`` filters travel in the URL; look hashes up in batches.
+_LOOKUP_BATCH = 100
+_SCAN_BLOCK = 256 * 1024
+
+# Polynomial rolling hash over a gear table (one random 64-bit value per byte
+# value), all arithmetic mod 2**64. Derived from sha256 rather than a PRNG so
+# boundaries never change between numpy versions.
+_GEAR = np.array(
+    [int.from_bytes(hashlib.sha256(bytes([value])).digest()[:8], "little") for value in range(256)],
+    dtype=np.uint64,
+)
+_BASE = 0x9E3779B97F4A7C15
+_BASE_INVERSE = pow(_BASE, -1, 2**64)
+
+
+def _powers(base: int, count: int) -> np.ndarray:
+    powers = np.full(count, base, dtype=np.uint64)
+    powers[0] = 1
+    return np.cumprod(powers, dtype=np.uint64)
+
+
+_SCAN_LENGTH = _SCAN_BLOCK + CDC_WINDOW - 1
+_BASE_POWERS = _powers(_BASE, _SCAN_LENGTH)
+_INVERSE_POWERS = _powers(_BASE_INVERSE, _SCAN_LENGTH)
+_BOUNDARY_LIMIT = np.uint64(1 << (64 - CDC_BOUNDARY_BITS))
+
+
+def _boundaries(window: np.ndarray) -> np.ndarray:
+    """
+    Indices ``j >= CDC_WINDOW - 1`` of ``window`` after which a chunk may end.
+
+    The hash at ``j`` is ``sum(gear[b[t]] * BASE**(j - t))`` over the last
+    CDC_WINDOW bytes; with prefix sums of ``gear[b[t]] * BASE**-t`` every
+    position is computed in a few vectorised passes.
+    """
+    n = len(window)
+    weighted = np.take(_GEAR, window)
+    np.multiply(weighted, _INVERSE_POWERS[:n], out=weighted)
+    prefix = np.empty(n + 1, dtype=np.uint64)
+    prefix[0] = 0
+    np.cumsum(weighted, out=prefix[1:])
+    hashes = np.subtract(prefix[CDC_WINDOW:], prefix[: n + 1 - CDC_WINDOW])
+    np.multiply(hashes, _BASE_POWERS[CDC_WINDOW - 1 : n], out=hashes)
+    # Top CDC_BOUNDARY_BITS bits clear.
+    return np.flatnonzero(hashes < _BOUNDARY_LIMIT) + (CDC_WINDOW - 1)
+
+
+def _find_cut(buffer: bytearray) -> int:
+    """Length of the next chunk at the start of ``buffer``."""
+    limit = min(len(buffer), CDC_MAX_SIZE)
+    if limit <= CDC_MIN_SIZE:
+        return limit
+    data = np.frombuffer(buffer, dtype=np.uint8, count=limit)
+    # A cut after byte j gives a chunk of j + 1 bytes: start at CDC_MIN_SIZE - 1.
+    for start in range(CDC_MIN_SIZE - 1, limit, _SCAN_BLOCK):
+        end = min(start + _SCAN_BLOCK, limit)
+        hits = _boundaries(data[start - CDC_WINDOW + 1 : end])
+        if hits.size:
+            return start - CDC_WINDOW + 1 + int(hits[0]) + 1
+    return limit
+
+
+def iter_chunks(source: BinaryIO) -> Iterator[bytes]:
+    """Split a stream into content-defined chunks, holding at most two chunks in memory."""
+    buffer = bytearray()
+    eof = False
+    while True:
+        while not eof and len(buffer) < CDC_MAX_SIZE:
+            data = source.read(CDC_MAX_SIZE)
+            eof = not data
+            buffer.extend(data)
+        if not buffer:
+            return
+        cut = _find_cut(buffer)
+        yield bytes(buffer[:cut])
+        del buffer[:cut]
+
+
+def chunk_file(source: BinaryIO) -> tuple[list[dict], str, int]:
+    """
+    Chunk and hash a seekable file. Returns the chunk list
+    (``{"sha256", "size", "offset"}``), the whole-file sha256 and its size.
+    """
+    source.seek(0)
+    chunks = []
+    digest = hashlib.sha256()
+    offset = 0
+    for chunk in iter_chunks(source):
+        digest.update(chunk)
+        chunks.append({"sha256": hashlib.sha256(chunk).hexdigest(), "size": len(chunk), "offset": offset})
+        offset += len(chunk)
+    return chunks, digest.hexdigest(), offset
+
+
+def build_manifest(chunks: list[dict], size: int, sha256: str | None) -> bytes:
+    """
+    The manifest listing a file's chunks in order. ``sha256`` is the
+    whole-file digest when the server hashed the file itself, else None
+    (manifests committed from client-uploaded chunks).
+    """
+    return json.dumps({
+        "version": 1,
+        "size": size,
+        "sha256": sha256,
+        "chunks": [{"sha256": chunk["sha256"], "size": chunk["size"]} for chunk in chunks],
+    }).encode("utf-8")
+
+
+async def stored_chunks(user_id: str, hashes: list[str]) -> dict[str, int]:
+    """Size of each of ``hashes`` already stored in ``user_id``'s chunk folder."""
+    unique = list(dict.fromkeys(hashes))
+    stored: dict[str, int] = {}
+    for i in range(0, len(unique), _LOOKUP_BATCH):
+        result = await supabase_service.get_dataset_chunks(user_id, unique[i : i + _LOOKUP_BATCH])
+        stored.update((row["sha256"], row["size"]) for row in result.data or [])
+    return stored
+
+
+async def put_chunk(bucket: str, user_id: str, sha256: str, data: bytes) -> None:
+    """Store one chunk (idempotent: chunks are content-addressed) and record it."""
+    await upload_object(bucket, chunk_storage_path(user_id, sha256), data, "application/octet-stream", upsert=True)
+    await supabase_service.record_dataset_chunks(user_id, [{"sha256": sha256, "size": len(data)}])
+
+
+def _read_at(source: BinaryIO, lock: threading.Lock, offset: int, size: int) -> bytes:
+    # Spooled uploads may be in memory (no fileno for os.pread), so the
+    # shared handle's seek and read are paired under a lock instead.
+    with lock:
+        source.seek(offset)
+        return source.read(size)
+
+
+async def write_manifest(bucket: str, storage_path: str, manifest: bytes) -> None:
+    await upload_object(bucket, storage_path, manifest, CHUNK_MANIFEST_CONTENT_TYPE)
+
+
+async def store_chunked(bucket: str, user_id: str, storage_path: str, source: BinaryIO) -> dict:
+    """
+    Store a seekable file as deduplicated chunks plus a manifest at
+    ``storage_path``. Only chunks the user has not stored before are
+    uploaded. Returns ``size``, ``sha256``, ``chunk_count`` and
+    ``stored_bytes`` (bytes actually written to storage).
+    """
+    chunks, sha256, size = await asyncio.to_thread(chunk_file, source)
+    stored = await stored_chunks(user_id, [chunk["sha256"] for chunk in chunks])
+
+    pending = {}
+    for chunk in chunks:
+        if chunk["sha256"] not in stored:
+            pending.setdefault(chunk["sha256"], chunk)
+
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    lock = threading.Lock()
+
+    async def upload(chunk: dict):
+        async with semaphore:
+            data = await asyncio.to_thread(_read_at, source, lock, chunk["offset"], chunk["size"])
+            await upload_object(bucket, chunk_storage_path(user_id, chunk["sha256"]), data, "application/octet-stream", upsert=True)
+
+    await asyncio.gather(*(upload(chunk) for chunk in pending.values()))
+    if pending:
+        await supabase_service.record_dataset_chunks(
+            user_id, [{"sha256": chunk["sha256"], "size": chunk["size"]} for chunk in pending.values()]
+        )
+    # The manifest goes last, so a version never references a missing chunk.
+    await write_manifest(bucket, storage_path, build_manifest(chunks, size, sha256))
+    return {
+        "size": size,
+        "sha256": sha256,
+        "chunk_count": len(chunks),
+        "stored_bytes": sum(chunk["size"] for chunk in pending.values()),
+    }
@@ -0,0 +1,152 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterator, Optional
+
+from app.config import get_settings
+
+
+class DatasetCache:
+    """
+    Size-bounded on-disk LRU cache for dataset objects.
+
+    Entries are keyed by ``(bucket, storage_path)``, which never change for a
+    given dataset version, so cached files never go stale. The directory can be
+    shared by several processes and services:
+
+    - entries are written to a temp file and published with ``os.replace``;
+    - a per-entry ``flock`` serialises downloads of the same object and is held
+      shared while a reader uses the file, so eviction never removes a file that
+      is in use;
+    - recency is the file mtime, refreshed on every hit.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries = os.path.join(root, "entries")
+        self._locks = os.path.join(root, "locks")
+        self._tmp = os.path.join(root, "tmp")
+        for directory in (self._entries, self._locks, self._tmp):
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key_for(bucket: str, storage_path: str) -> str:
+        return hashlib.sha256(f"{bucket}/{storage_path}".encode("utf-8")).hexdigest()
+
+    def entry_path(self, key: str, suffix: str = "") -> str:
+        return os.path.join(self._entries, key + suffix)
+
+    @contextmanager
+    def open(
+        self,
+        bucket: str,
+        storage_path: str,
+        download: Callable[[str], object],
+        suffix: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Yield a local path for the object, calling ``download(dest)`` on a miss.
+
+        ``suffix`` is the entry's file extension (default: the object's). The
+        file must be treated as read-only and is only guaranteed to exist
+        until the context exits.
+        """
+        key = self.key_for(bucket, storage_path)
+        if suffix is None:
+            suffix = os.path.splitext(storage_path)[1]
+        with self.open_key(key, download, suffix=suffix) as path:
+            yield path
+
+    @contextmanager
+    def open_key(self, key: str, produce: Callable[[str], object], suffix: str = "") -> Iterator[str]:
+        """Like :meth:`open` for an arbitrary key; ``produce(dest)`` fills a miss."""
+        final_path = self.entry_path(key, suffix)
+        lock_fd = os.open(os.path.join(self._locks, key + ".lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_SH)
+            if os.path.exists(final_path):
+                os.utime(final_path)
+            else:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                # Another process may have filled the entry while we waited.
+                if not os.path.exists(final_path):
+                    self._fill(final_path, produce)
+                fcntl.flock(lock_fd, fcntl.LOCK_SH)
+                self.evict()
+            yield final_path
+        finally:
+            os.close(lock_fd)
+
+    def _fill(self, final_path: str, produce: Callable[[str], object]):
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        os.close(fd)
+        try:
+            produce(tmp_path)
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        evict_fd = os.open(os.path.join(self.root, ".evict.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            try:
+                fcntl.flock(evict_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # another process is already evicting
+
+            entries = []
+            total = 0
+            with os.scandir(self._entries) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.name))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _mtime, size, name in entries:
+                if total <= self.max_bytes:
+                    break
+                if self._evict_entry(name):
+                    total -= size
+        finally:
+            os.close(evict_fd)
+
+    def _evict_entry(self, name: str) -> bool:
+        key = name.split(".", 1)[0]
+        lock_fd = os.open(os.path.join(self._locks, key + ".lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False  # in use
+            try:
+                os.unlink(os.path.join(self._entries, name))
+            except FileNotFoundError:
+                return False
+            return True
+        finally:
+            os.close(lock_fd)
+
+
+@lru_cache()
+def get_dataset_cache() -> Optional[DatasetCache]:
+    """Process-wide cache instance, or None when caching is disabled."""
+    settings = get_settings()
+    if settings.dataset_cache_max_mb <= 0:
+        return None
+    root = settings.dataset_cache_dir or os.path.join(tempfile.gettempdir(), "datacanvas-dataset-cache")
+    return DatasetCache(root, settings.dataset_cache_max_mb * 1024 * 1024)
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import re
+import tempfile
+from contextlib import ExitStack
+from typing import AsyncIterator
+
+import polars as pl
+
+from app.config import settings
+from app.services.dataset_reader import scan_dataset_file, version_source
+from app.services.job_lease import JobLease, LeaseLost
+from app.services.row_browser import filter_expression
+from app.services.storage_reader import CHUNK_SIZE, open_dataset_file, remove_temp
+from app.services.storage_upload import file_chunks, upload_stream
+from app.services.supabase import supabase_service
+
+logger = logging.getLogger(__name__)
+
+# Format -> (file extension, content type)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+}
+_TAIL_POLL_SECONDS = 0.05
+
+
+def export_filename(version: dict, file_format: str) -> str:
+    dataset = version.get("dataset") or {}
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", dataset.get("name") or "dataset").strip("_") or "dataset"
+    return f"{name}-v{version.get('version_number') or 1}{EXPORT_FORMATS[file_format][0]}"
+
+
+def export_storage_path(user_id: str, job_id: str, file_format: str) -> str:
+    return f"{user_id}/exports/{job_id}{EXPORT_FORMATS[file_format][0]}"
+
+
+def open_export(
+    version: dict,
+    columns: list[str] | None = None,
+    filters: list[dict] | None = None,
+) -> tuple[ExitStack, pl.LazyFrame]:
+    """
+    Fetch the version's file (the canonical Parquet copy when there is one)
+    and plan the filtered, projected export over a lazy scan of it. The
+    returned stack keeps the file available until it is closed. Raises
+    ValueError for unknown columns or invalid filters.
+    """
+    source = version_source(version)
+    if source is None:
+        raise ValueError("Version has no stored file")
+    path, file_type = source
+    stack = ExitStack()
+    try:
+        local_path = stack.enter_context(open_dataset_file(settings.supabase_datasets_bucket, path))
+        plan = scan_dataset_file(local_path, file_type)
+        schema = plan.schema
+        predicate = filter_expression(filters or [], schema)
+        if predicate is not None:
+            plan = plan.filter(predicate)
+        if columns:
+            missing = [column for column in columns if column not in schema]
+            if missing:
+                raise ValueError(f"Unknown columns: {', '.join(missing)}")
+            plan = plan.select(columns)
+    except BaseException:
+        stack.close()
+        raise
+    return stack, plan
+
+
+def write_export(plan: pl.LazyFrame, file_format: str, destination: str):
+    """
+    Write ``plan`` with the streaming engine's sinks, which hold a batch at a
+    time rather than the whole result. Each sink only appends to
+    ``destination``, so the file can be read while it is being written.
+
+    A plan the streaming engine cannot run is materialised instead, but only
+    if the sink wrote nothing: a reader tailing ``destination`` may already
+    have forwarded a failed sink's bytes, so rewriting the file would splice
+    two outputs together. That case raises the sink's error.
+    """
+    try:
+        if file_format == "csv":
+            plan.sink_csv(destination)
+        elif file_format == "parquet":
+            plan.sink_parquet(destination)
+        else:
+            plan.sink_ipc(destination, compression=None)
+    except pl.InvalidOperationError:
+        if os.path.getsize(destination) > 0:
+            raise
+        frame = plan.collect()
+        if file_format == "csv":
+            frame.write_csv(destination)
+        elif file_format == "parquet":
+            frame.write_parquet(destination)
+        else:
+            frame.write_ipc(destination, compression="uncompressed")
+
+
+def _release(stack: ExitStack, writer: asyncio.Task):
+    def done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Abandoned export failed: {task.exception()}")
+        stack.close()
+
+    writer.add_done_callback(done)
+
+
+async def stream_export(stack: ExitStack, plan: pl.LazyFrame, file_format: str) -> AsyncIterator[bytes]:
+    """
+    Yield the export while it is written: the sink fills a temp file in a
+    worker thread and its bytes are forwarded as they land, so the first
+    bytes go out before the last rows are read. Closes ``stack`` when done.
+    """
+    fd, path = tempfile.mkstemp(prefix="datacanvas-export-", suffix=EXPORT_FORMATS[file_format][0])
+    # Opened before the sink truncates the same file, so no write is missed.
+    handle = os.fdopen(fd, "rb")
+    writer = asyncio.create_task(asyncio.to_thread(write_export, plan, file_format, path))
+    try:
+        while True:
+            finished = writer.done()
+            chunk = await asyncio.to_thread(handle.read, CHUNK_SIZE)
+            if chunk:
+                yield chunk
+            elif finished:
+                writer.result()
+                return
+            else:
+                await asyncio.sleep(_TAIL_POLL_SECONDS)
+    finally:
+        handle.close()
+        remove_temp(path)
+        if writer.done():
+            stack.close()
+        else:
+            # The client went away: the sink cannot be interrupted, so the
+            # source file stays pinned until it finishes.
+            _release(stack, writer)
+
+
+async def run_export_job(
+    job_id: str,
+    user_id: str,
+    version: dict,
+    file_format: str,
+    columns: list[str] | None = None,
+    filters: list[dict] | None = None,
+):
+    """
+    Claim and run an ``export`` job: write the export to a temp file, stream
+    it to ``{user}/exports/{job}`` in the datasets bucket and record where it
+    went in the job result. Does nothing if the job was claimed elsewhere; the
+    job is held under a lease while it runs, so one cancelled (or failed as
+    orphaned) meanwhile keeps its status and is not uploaded.
+    """
+    claimed = await supabase_service.claim_job(job_id)
+    if not claimed.data:
+        return
+    extension, content_type = EXPORT_FORMATS[file_format]
+    fd, local_path = tempfile.mkstemp(prefix="datacanvas-export-", suffix=extension)
+    os.close(fd)
+    try:
+        async with JobLease(job_id) as lease:
+            stack, plan = await asyncio.to_thread(open_export, version, columns, filters)
+            with stack:
+                await asyncio.to_thread(write_export, plan, file_format, local_path)
+            size = os.path.getsize(local_path)
+            storage_path = export_storage_path(user_id, job_id, file_format)
+            lease.check()
+            await upload_stream(settings.supabase_datasets_bucket, storage_path, file_chunks(local_path), size, content_type)
+            await supabase_service.finish_job(job_id, status="completed", result={
+                "storage_path": storage_path,
+                "format": file_format,
+                "size": size,
+                "filename": export_filename(version, file_format),
+            })
+        logger.info(f"Export job {job_id} wrote {size} bytes to {storage_path}")
+    except LeaseLost as e:
+        logger.warning(f"Export job {job_id} stopped: {e}")
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {e}")
+        await supabase_service.finish_job(job_id, status="failed", error_message=str(e))
+    finally:
+        remove_temp(local_path)
@@ -0,0 +1,126 @@
+import asyncio
+
+import polars as pl
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.excel_reader import read_excel_sheet, sheet_names
+from app.services.json_reader import read_json_file
+from app.services.schema_sniffer import CSV_READ_OPTIONS
+from app.services.storage_reader import open_dataset_file, split_compression
+
+# Errors from planning or running a user-defined query or transformation:
+# the user's input is at fault, so they are reported as bad requests.
+QUERY_ERRORS = (
+    pl.ColumnNotFoundError,
+    pl.ComputeError,
+    pl.DuplicateError,
+    pl.InvalidOperationError,
+    pl.SchemaError,
+    pl.SchemaFieldNotFoundError,
+    pl.ShapeError,
+)
+
+
+def normalize_file_type(file_type: str | None, storage_path: str) -> str:
+    cleaned = (file_type or "").lower()
+    if "/" in cleaned:
+        cleaned = cleaned.split("/")[-1]
+    if not cleaned:
+        storage_path = split_compression(storage_path)[0]
+        if "." in storage_path:
+            cleaned = storage_path.rsplit(".", 1)[-1].lower()
+    return cleaned
+
+
+def read_dataset_file(path: str, file_type: str, sheet: str | None = None) -> pl.DataFrame:
+    """
+    Parse a local dataset file with path-based (memory-mapped) readers,
+    typed like :func:`scan_dataset_file`. ``sheet`` selects a workbook sheet (default: the first).
+    """
+    if file_type in ["csv", "txt"]:
+        return pl.read_csv(path, **CSV_READ_OPTIONS)
+    if file_type in ["tsv"]:
+        return pl.read_csv(path, separator="\t", **CSV_READ_OPTIONS)
+    if file_type in ["json", "ndjson", "jsonl"]:
+        return read_json_file(path)
+    if file_type in ["parquet"]:
+        return pl.read_parquet(path, memory_map=True)
+    if file_type in ["xlsx", "xls"]:
+        try:
+            return read_excel_sheet(path, sheet)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_type}")
+
+
+def scan_dataset_file(path: str, file_type: str) -> pl.LazyFrame:
+    """
+    Lazily scan a local dataset file, typed like the canonical Parquet copy.
+    Formats without a lazy reader (JSON, workbooks) are read eagerly.
+    """
+    if file_type in ["csv", "txt"]:
+        return pl.scan_csv(path, **CSV_READ_OPTIONS)
+    if file_type in ["tsv"]:
+        return pl.scan_csv(path, separator="\t", **CSV_READ_OPTIONS)
+    if file_type in ["parquet"]:
+        return pl.scan_parquet(path)
+    return read_dataset_file(path, file_type).lazy()
+
+
+def version_source(version: dict) -> tuple[str, str] | None:
+    """Storage path and file type to read a version's default view from."""
+    parquet_path = version.get("parquet_path")
+    if parquet_path:
+        return parquet_path, "parquet"
+    storage_path = version.get("storage_path")
+    if not storage_path:
+        return None
+    dataset = version.get("dataset") or {}
+    return storage_path, normalize_file_type(dataset.get("file_type"), storage_path)
+
+
+def finite_or_null(frame: pl.DataFrame) -> pl.DataFrame:
+    """Replace NaN/inf (invalid in JSON) in float columns with null."""
+    floats = [name for name, dtype in frame.schema.items() if dtype in (pl.Float32, pl.Float64)]
+    if not floats:
+        return frame
+    return frame.with_columns(pl.when(pl.col(name).is_finite()).then(pl.col(name)).alias(name) for name in floats)
+
+
+def _load_version_frame(storage_path: str, file_type: str, sheet: str | None = None) -> pl.DataFrame:
+    with open_dataset_file(settings.supabase_datasets_bucket, storage_path) as local_path:
+        return read_dataset_file(local_path, file_type, sheet)
+
+
+async def load_version_frame(version: dict, sheet: str | None = None) -> pl.DataFrame | None:
+    """
+    Stream a dataset version from storage and parse it off the event loop.
+    The canonical Parquet copy (see ``parquet_path``) is used when there is one;
+    for workbooks it holds the first sheet.
+    """
+    if sheet is None:
+        source = version_source(version)
+        return await asyncio.to_thread(_load_version_frame, *source) if source else None
+    storage_path = version.get("storage_path")
+    if not storage_path:
+        return None
+    dataset = version.get("dataset") or {}
+    file_type = normalize_file_type(dataset.get("file_type"), storage_path)
+    return await asyncio.to_thread(_load_version_frame, storage_path, file_type, sheet)
+
+
+def _list_version_sheets(storage_path: str) -> list[str]:
+    with open_dataset_file(settings.supabase_datasets_bucket, storage_path) as local_path:
+        return sheet_names(local_path)
+
+
+async def list_version_sheets(version: dict) -> list[str]:
+    """Sheet names of a workbook version (empty for single-table formats)."""
+    storage_path = version.get("storage_path")
+    if not storage_path:
+        return []
+    dataset = version.get("dataset") or {}
+    if normalize_file_type(dataset.get("file_type"), storage_path) not in ["xlsx", "xls"]:
+        return []
+    return await asyncio.to_thread(_list_version_sheets, storage_path)
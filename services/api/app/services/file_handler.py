@@ -1,15 +1,46 @@
 from __future__ import annotations
 
-from typing import Optional
+import zipfile
+from typing import BinaryIO, Optional
+
+# Must match the storage readers' COMPRESSION_EXTENSIONS.
+COMPRESSION_EXTENSIONS = {"gz": "gzip", "gzip": "gzip", "zst": "zstd", "zstd": "zstd", "zip": "zip"}
+
+
+def infer_compression(filename: str | None) -> Optional[str]:
+    """Compression codec named by the filename's last extension (``sales.csv.gz`` -> ``gzip``)."""
+    if not filename or "." not in filename:
+        return None
+    return COMPRESSION_EXTENSIONS.get(filename.rsplit(".", 1)[-1].lower())
+
+
+def zip_member_name(archive_file: BinaryIO) -> Optional[str]:
+    """Name of the single dataset file inside a (seekable) zip archive, if there is exactly one."""
+    try:
+        with zipfile.ZipFile(archive_file) as archive:
+            names = [
+                info.filename for info in archive.infolist()
+                if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+            ]
+    except zipfile.BadZipFile:
+        return None
+    return names[0] if len(names) == 1 else None
 
 
 def infer_file_type(filename: str | None, content_type: str | None) -> Optional[str]:
+    if filename and infer_compression(filename):
+        # Type the dataset inside: "sales.csv.gz" is a CSV. The content type
+        # describes the archive, so it is no help.
+        filename = filename.rsplit(".", 1)[0]
+        content_type = None
     if filename:
         ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
         if ext in {"csv", "json", "parquet", "tsv", "xlsx"}:
             return ext
         if ext in {"xls"}:
             return "xlsx"
+        if ext in {"ndjson", "jsonl"}:
+            return "json"
     if content_type:
         lowered = content_type.lower()
         if "csv" in lowered:
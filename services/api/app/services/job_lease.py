@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+from app.config import settings
+from app.services.supabase import supabase_service
+
+logger = logging.getLogger(__name__)
+
+# Job types the API runs itself, as background tasks, rather than a worker.
+API_JOB_TYPES = ["export", "transform"]
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class JobLease:
+    """
+    Keeps a claimed job's lease (023_api_job_leases.sql) alive while the
+    ``async with`` body runs, with a heartbeat every third of
+    ``job_lease_seconds``. Once the job is cancelled, or failed as orphaned,
+    the heartbeat stops and :meth:`check` raises LeaseLost; ``finish_job``
+    leaves such a job alone either way.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.lost = False
+        self._task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "JobLease":
+        self._task = asyncio.create_task(self._heartbeat())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+
+    def check(self):
+        """Raise LeaseLost if the job is no longer ours; call before side effects."""
+        if self.lost:
+            raise LeaseLost(f"Job {self.job_id} is no longer leased to this process")
+
+    async def _heartbeat(self):
+        interval = max(1.0, settings.job_lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                result = await supabase_service.heartbeat_job(self.job_id)
+            except Exception as e:
+                # Keep trying; the lease outlives a few missed beats.
+                logger.warning(f"Heartbeat for job {self.job_id} failed: {e}")
+                continue
+            if not result.data:
+                logger.warning(f"Job {self.job_id} is no longer leased to this process")
+                self.lost = True
+                return
+
+
+async def sweep_orphaned_jobs():
+    """
+    Fail API jobs stranded by a stopped process, at startup and then once per
+    lease period, so restarts of any replica are cleaned up.
+    """
+    while True:
+        try:
+            result = await supabase_service.fail_orphaned_jobs(API_JOB_TYPES)
+            if result.data:
+                logger.info(f"Failed {result.data} orphaned jobs")
+        except Exception as e:
+            logger.warning(f"Sweeping orphaned jobs failed: {e}")
+        await asyncio.sleep(settings.job_lease_seconds)
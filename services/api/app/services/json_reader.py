@@ -0,0 +1,94 @@
+import json
+from typing import Any, Iterator, Optional
+
+import polars as pl
+
+SNIFF_BYTES = 1024 * 1024
+ARRAY_CHUNK_CHARS = 1024 * 1024
+
+
+def sniff_json_format(path: str) -> str:
+    """
+    Classify a JSON dataset file without reading it all.
+
+    Returns ``"ndjson"`` when the first line is a complete JSON object (one
+    record per line), ``"array"`` for a top-level ``[...]`` and ``"document"``
+    for anything else (e.g. a pretty-printed object).
+    """
+    with open(path, "rb") as handle:
+        head = handle.read(SNIFF_BYTES)
+    head = head.lstrip(b"\xef\xbb\xbf").lstrip()
+    if head.startswith(b"["):
+        return "array"
+    if head.startswith(b"{"):
+        try:
+            record = json.loads(head.split(b"\n", 1)[0])
+        except ValueError:
+            return "document"
+        if isinstance(record, dict):
+            return "ndjson"
+    return "document"
+
+
+def read_json_file(path: str, n_rows: Optional[int] = None) -> pl.DataFrame:
+    """
+    Read a JSON or NDJSON dataset, detecting the layout from the content.
+
+    NDJSON goes through polars' native line reader (``scan_ndjson``), which
+    stops after ``n_rows``. The head of a large JSON array is decoded
+    incrementally instead of loading the array.
+    """
+    layout = sniff_json_format(path)
+    if layout == "ndjson":
+        return pl.scan_ndjson(path, n_rows=n_rows, infer_schema_length=1000).collect()
+    if layout == "array" and n_rows is not None:
+        return _records_frame(_iter_json_array(path), n_rows)
+    df = pl.read_json(path)
+    return df.head(n_rows) if n_rows is not None else df
+
+
+def _iter_json_array(path: str, chunk_chars: int = ARRAY_CHUNK_CHARS) -> Iterator[Any]:
+    """Decode the elements of a top-level JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8-sig") as handle:
+        buffer = handle.read(chunk_chars).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError("Expected a JSON array")
+        pos = 1
+        eof = False
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            if pos < len(buffer):
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # A value that runs to the end of the buffer may be cut off.
+                    if end < len(buffer) or eof:
+                        yield value
+                        pos = end
+                        continue
+            elif eof:
+                raise ValueError("Unterminated JSON array")
+
+            chunk = handle.read(chunk_chars)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def _records_frame(records: Iterator[Any], n_rows: int) -> pl.DataFrame:
+    rows = []
+    for record in records:
+        rows.append(record)
+        if len(rows) >= n_rows:
+            break
+    if not rows:
+        return pl.DataFrame()
+    return pl.from_dicts(rows, infer_schema_length=1000)
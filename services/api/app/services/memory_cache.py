@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class MemoryLRU:
+    """
+    Thread-safe in-process LRU bounded by the total ``weigh(value)`` of its
+    entries (by default, the number of entries). A value heavier than the
+    whole capacity is not cached.
+    """
+
+    def __init__(self, capacity: int, weigh: Callable[[Any], int] = lambda value: 1):
+        self.capacity = capacity
+        self.weigh = weigh
+        self._entries: OrderedDict[Any, tuple[Any, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        weight = self.weigh(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            if weight > self.capacity:
+                return
+            self._entries[key] = (value, weight)
+            self._size += weight
+            while self._size > self.capacity:
+                _key, (_value, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
@@ -0,0 +1,352 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import uuid
+from contextlib import ExitStack
+from typing import Any, Callable
+
+import polars as pl
+
+from app.config import settings
+from app.services.dataset_cache import get_dataset_cache
+from app.services.dataset_export import write_export
+from app.services.dataset_reader import QUERY_ERRORS, scan_dataset_file, version_source
+from app.services.job_lease import JobLease, LeaseLost
+from app.services.row_browser import filter_expression
+from app.services.storage_reader import open_dataset_file, remove_temp
+from app.services.storage_upload import file_chunks, upload_stream
+from app.services.supabase import JOB_PRIORITY_DEFAULT, supabase_service
+
+logger = logging.getLogger(__name__)
+
+# Bump when a step's semantics change, so cached intermediates are recomputed.
+PIPELINE_VERSION = 1
+MAX_STEPS = 100
+
+CAST_TYPES = {
+    "int": pl.Int64,
+    "float": pl.Float64,
+    "string": pl.Utf8,
+    "bool": pl.Boolean,
+    "date": pl.Date,
+    "datetime": pl.Datetime,
+}
+IMPUTE_STRATEGIES = ("mean", "median", "mode", "zero", "value", "forward")
+DEDUPE_KEEP = ("first", "last", "any")
+_NUMERIC_TYPES = (
+    pl.Int8, pl.Int16, pl.Int32, pl.Int64, pl.UInt8, pl.UInt16, pl.UInt32, pl.UInt64, pl.Float32, pl.Float64,
+)
+
+
+def _columns_of(step: dict, key: str = "columns") -> list[str]:
+    columns = step.get(key)
+    if not isinstance(columns, list) or not columns or not all(isinstance(column, str) for column in columns):
+        raise ValueError(f"{step['op']} needs a non-empty list of column names in '{key}'")
+    return columns
+
+
+def _mapping_of(step: dict) -> dict[str, str]:
+    mapping = step.get("columns")
+    if not isinstance(mapping, dict) or not mapping or not all(isinstance(value, str) for value in mapping.values()):
+        raise ValueError(f"{step['op']} needs a non-empty {{column: value}} mapping in 'columns'")
+    return mapping
+
+
+def _require(schema: dict, columns) -> None:
+    missing = [column for column in columns if column not in schema]
+    if missing:
+        raise ValueError(f"Unknown columns: {', '.join(missing)}")
+
+
+def _filter(frame: pl.LazyFrame, step: dict) -> pl.LazyFrame:
+    predicate = filter_expression(step.get("filters") or [], frame.schema)
+    return frame if predicate is None else frame.filter(predicate)
+
+
+def _cast(frame: pl.LazyFrame, step: dict) -> pl.LazyFrame:
+    mapping = _mapping_of(step)
+    schema = frame.schema
+    _require(schema, mapping)
+    exprs = []
+    for column, type_name in mapping.items():
+        if type_name not in CAST_TYPES:
+            raise ValueError(f"Unknown type '{type_name}'; use one of {', '.join(CAST_TYPES)}")
+        dtype = CAST_TYPES[type_name]
+        expr = pl.col(column)
+        # Values that do not convert become null rather than failing the run.
+        if schema[column] == pl.Utf8 and dtype == pl.Date:
+            exprs.append(expr.str.to_date(strict=False))
+        elif schema[column] == pl.Utf8 and dtype == pl.Datetime:
+            exprs.append(expr.str.to_datetime(strict=False))
+        else:
+            exprs.append(expr.cast(dtype, strict=False))
+    return frame.with_columns(exprs)
+
+
+def _impute(frame: pl.LazyFrame, step: dict) -> pl.LazyFrame:
+    columns = _columns_of(step)
+    schema = frame.schema
+    _require(schema, columns)
+    strategy = step.get("strategy")
+    if strategy not in IMPUTE_STRATEGIES:
+        raise ValueError(f"Unknown impute strategy '{strategy}'; use one of {', '.join(IMPUTE_STRATEGIES)}")
+    if strategy in ("mean", "median", "zero"):
+        not_numeric = [column for column in columns if schema[column] not in _NUMERIC_TYPES]
+        if not_numeric:
+            raise ValueError(f"{strategy} imputation needs numeric columns: {', '.join(not_numeric)}")
+    if strategy == "value" and step.get("value") is None:
+        raise ValueError("value imputation needs a 'value'")
+
+    exprs = []
+    for column in columns:
+        expr = pl.col(column)
+        if strategy == "mean":
+            exprs.append(expr.fill_null(expr.mean()))
+        elif strategy == "median":
+            exprs.append(expr.fill_null(expr.median()))
+        elif strategy == "mode":
+            exprs.append(expr.fill_null(expr.drop_nulls().mode().first()))
+        elif strategy == "zero":
+            exprs.append(expr.fill_null(0))
+        elif strategy == "forward":
+            exprs.append(expr.fill_null(strategy="forward"))
+        else:
+            exprs.append(expr.fill_null(pl.lit(step["value"]).cast(schema[column], strict=False)))
+    return frame.with_columns(exprs)
+
+
+def _drop(frame: pl.LazyFrame, step: dict) -> pl.LazyFrame:
+    columns = _columns_of(step)
+    _require(frame.schema, columns)
+    return frame.drop(columns)
+
+
+def _rename(frame: pl.LazyFrame, step: dict) -> pl.LazyFrame:
+    mapping = _mapping_of(step)
+    _require(frame.schema, mapping)
+    return frame.rename(mapping)
+
+
+def _derive(frame: pl.LazyFrame, step: dict) -> pl.LazyFrame:
+    name, expression = step.get("name"), step.get("expression")
+    if not isinstance(name, str) or not name or not isinstance(expression, str) or not expression:
+        raise ValueError("derive needs a column 'name' and a SQL 'expression'")
+    return frame.with_columns(pl.sql_expr(expression).alias(name))
+
+
+def _dedupe(frame: pl.LazyFrame, step: dict) -> pl.LazyFrame:
+    subset = _columns_of(step) if step.get("columns") is not None else None
+    if subset:
+        _require(frame.schema, subset)
+    keep = step.get("keep", "first")
+    if keep not in DEDUPE_KEEP:
+        raise ValueError(f"Unknown keep '{keep}'; use one of {', '.join(DEDUPE_KEEP)}")
+    return frame.unique(subset=subset, keep=keep, maintain_order=True)
+
+
+OPERATIONS: dict[str, Callable[[pl.LazyFrame, dict], pl.LazyFrame]] = {
+    "filter": _filter,
+    "cast": _cast,
+    "impute": _impute,
+    "drop": _drop,
+    "rename": _rename,
+    "derive": _derive,
+    "dedupe": _dedupe,
+}
+# Steps that need the whole input before emitting a row (global statistics,
+# seen-before sets). Their results are cached; runs of row-local steps
+# between them are cheap to replay and stay fused in one query.
+_BARRIER_STRATEGIES = ("mean", "median", "mode")
+
+
+def _is_barrier(step: dict) -> bool:
+    return step["op"] == "dedupe" or (step["op"] == "impute" and step.get("strategy") in _BARRIER_STRATEGIES)
+
+
+def validate_steps(steps: list[dict]) -> None:
+    """Check the shape of a plan (not its columns, which depend on the data)."""
+    if len(steps) > MAX_STEPS:
+        raise ValueError(f"A pipeline has at most {MAX_STEPS} steps")
+    for number, step in enumerate(steps, start=1):
+        if not isinstance(step, dict) or step.get("op") not in OPERATIONS:
+            raise ValueError(f"Step {number}: op must be one of {', '.join(OPERATIONS)}")
+
+
+def apply_steps(frame: pl.LazyFrame, steps: list[dict], first_step: int = 1) -> pl.LazyFrame:
+    """
+    Append ``steps`` to the lazy query ``frame``. The schema is resolved after
+    each step, so a step that does not fit its input fails here, naming the
+    step, rather than halfway through a run.
+    """
+    for number, step in enumerate(steps, start=first_step):
+        try:
+            frame = OPERATIONS[step["op"]](frame, step)
+            frame.schema
+        except (ValueError, *QUERY_ERRORS) as exc:
+            # Polars appends the failing plan after a blank line; keep the message.
+            message = str(exc).split("\n\n")[0]
+            if isinstance(exc, pl.ColumnNotFoundError):
+                message = f"Unknown column: {message}"
+            raise ValueError(f"Step {number} ({step['op']}): {message}") from exc
+    return frame
+
+
+def fingerprints(source_path: str, steps: list[dict]) -> list[str]:
+    """
+    Fingerprint of every prefix of the plan: element ``i`` identifies the
+    source file and steps ``0..i``, so editing a step changes the
+    fingerprints from that step on and leaves earlier ones (and their cached
+    results) intact.
+    """
+    digest = hashlib.sha256(f"pipeline/{PIPELINE_VERSION}/{source_path}".encode("utf-8")).hexdigest()
+    prints = []
+    for step in steps:
+        canonical = json.dumps(step, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha256(f"{digest}/{canonical}".encode("utf-8")).hexdigest()
+        prints.append(digest)
+    return prints
+
+
+def segments(steps: list[dict]) -> list[tuple[int, int]]:
+    """Split the plan into ``[start, end)`` ranges that each end at a barrier or at the last step."""
+    bounds, start = [], 0
+    for index, step in enumerate(steps):
+        if _is_barrier(step) or index == len(steps) - 1:
+            bounds.append((start, index + 1))
+            start = index + 1
+    return bounds
+
+
+def run_pipeline(source_path: str, file_type: str, steps: list[dict], destination: str) -> dict:
+    """
+    Run ``steps`` over a stored dataset file and write the result to
+    ``destination`` as Parquet.
+
+    Each segment (see :func:`segments`) is compiled to one lazy query and
+    sunk with the streaming engine. With the dataset cache enabled, each
+    segment's result is cached under its fingerprint and a run starts from
+    the last segment whose result is still cached, so after an edit only the
+    segments from the edited step on are recomputed. Returns the fingerprint
+    of the plan and the numbers of recomputed and reused steps.
+    """
+    prints = fingerprints(source_path, steps)
+    cache = get_dataset_cache()
+    stats = {"fingerprint": prints[-1] if prints else None, "recomputed_steps": 0, "reused_steps": 0}
+
+    with ExitStack() as stack:
+        def source() -> pl.LazyFrame:
+            local_path = stack.enter_context(open_dataset_file(settings.supabase_datasets_bucket, source_path))
+            return scan_dataset_file(local_path, file_type)
+
+        if cache is None or not steps:
+            stats["recomputed_steps"] = len(steps)
+            write_export(apply_steps(source(), steps), "parquet", destination)
+            return stats
+
+        def result_of(segment: int) -> pl.LazyFrame:
+            """The plan's output after ``segment``, from the cache when it is there."""
+            if segment < 0:
+                return source()
+            start, end = bounds[segment]
+
+            def produce(cached_path: str):
+                upstream = result_of(segment - 1)
+                write_export(apply_steps(upstream, steps[start:end], first_step=start + 1), "parquet", cached_path)
+                stats["recomputed_steps"] += end - start
+
+            cached_path = stack.enter_context(cache.open_key(prints[end - 1], produce, suffix=".parquet"))
+            return pl.scan_parquet(cached_path)
+
+        bounds = segments(steps)
+        result_of(len(bounds) - 1).sink_parquet(destination)
+        stats["reused_steps"] = len(steps) - stats["recomputed_steps"]
+    return stats
+
+
+def pipeline_output_path(user_id: str, dataset_id: str, pipeline: dict) -> str:
+    name = pipeline.get("name") or "pipeline"
+    safe = "".join(char if char.isalnum() or char in "-_" else "_" for char in name).strip("_") or "pipeline"
+    return f"{user_id}/{dataset_id}/{uuid.uuid4()}/{safe}.parquet"
+
+
+async def run_pipeline_job(job_id: str, user_id: str, pipeline: dict, source_version: dict):
+    """
+    Claim and run a ``transform`` job: run the pipeline over
+    ``source_version``, store the result as a new version of the dataset
+    (Parquet, so it is also its own canonical copy) and queue its profile.
+    The job is held under a lease while it runs; one cancelled (or failed as
+    orphaned) meanwhile creates no version.
+    """
+    claimed = await supabase_service.claim_job(job_id)
+    if not claimed.data:
+        return
+    fd, local_path = tempfile.mkstemp(prefix="datacanvas-pipeline-", suffix=".parquet")
+    os.close(fd)
+    try:
+        async with JobLease(job_id) as lease:
+            source = version_source(source_version)
+            if source is None:
+                raise ValueError("Source version has no stored file")
+            stats = await asyncio.to_thread(run_pipeline, *source, pipeline.get("steps") or [], local_path)
+
+            dataset_id = pipeline["dataset_id"]
+            storage_path = pipeline_output_path(user_id, dataset_id, pipeline)
+            size = os.path.getsize(local_path)
+            lease.check()
+            await upload_stream(
+                settings.supabase_datasets_bucket, storage_path, file_chunks(local_path), size, "application/vnd.apache.parquet"
+            )
+            lease.check()
+            version_result = await supabase_service.create_dataset_version(
+                dataset_id=dataset_id,
+                storage_path=storage_path,
+                parquet_path=storage_path,
+                file_size_bytes=size,
+                pipeline_id=pipeline["id"],
+                source_version_id=source_version["id"],
+                pipeline_fingerprint=stats["fingerprint"],
+                status="uploaded",
+            )
+            version_id = version_result.data[0]["id"]
+            await supabase_service.create_job(
+                user_id=user_id,
+                job_type="profile",
+                payload={"version_id": version_id, "storage_path": storage_path},
+                priority=JOB_PRIORITY_DEFAULT,
+            )
+            await supabase_service.update_dataset_version(version_id, status="profiling")
+            await supabase_service.finish_job(job_id, status="completed", result={"dataset_version_id": version_id, **stats})
+        logger.info(
+            f"Pipeline job {job_id} wrote version {version_id} "
+            f"({stats['recomputed_steps']} steps recomputed, {stats['reused_steps']} reused)"
+        )
+    except LeaseLost as e:
+        logger.warning(f"Pipeline job {job_id} stopped: {e}")
+    except Exception as e:
+        logger.error(f"Pipeline job {job_id} failed: {e}")
+        await supabase_service.finish_job(job_id, status="failed", error_message=str(e))
+    finally:
+        remove_temp(local_path)
+
+
+def preview_pipeline(version: dict, steps: list[dict], limit: int) -> pl.DataFrame:
+    """The first ``limit`` rows of the plan's output, computed lazily (no caching)."""
+    source = version_source(version)
+    if source is None:
+        raise ValueError("Version has no stored file")
+    path, file_type = source
+    with open_dataset_file(settings.supabase_datasets_bucket, path) as local_path:
+        frame = apply_steps(scan_dataset_file(local_path, file_type), steps)
+        try:
+            return frame.head(limit).collect(streaming=True, comm_subplan_elim=False)
+        except QUERY_ERRORS as exc:
+            raise ValueError(str(exc)) from exc
+
+
+def describe_steps(steps: list[dict]) -> list[dict[str, Any]]:
+    """Per step: its position, op and whether its result is cached as a checkpoint."""
+    checkpoints = {end - 1 for _start, end in segments(steps)}
+    return [{"index": index, "op": step["op"], "checkpoint": index in checkpoints} for index, step in enumerate(steps)]
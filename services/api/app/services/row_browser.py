@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any
+
+import polars as pl
+
+from app.config import settings
+from app.services.dataset_cache import DatasetCache, get_dataset_cache
+from app.services.dataset_reader import finite_or_null, scan_dataset_file, version_source
+from app.services.memory_cache import MemoryLRU
+from app.services.storage_reader import open_dataset_file
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Memory-mapped versions held open per process.
+FRAME_CACHE_ENTRIES = 8
+
+COMPARISON_OPS = {
+    "eq": lambda column, value: column == value,
+    "ne": lambda column, value: column != value,
+    "gt": lambda column, value: column > value,
+    "ge": lambda column, value: column >= value,
+    "lt": lambda column, value: column < value,
+    "le": lambda column, value: column <= value,
+}
+FILTER_OPS = (*COMPARISON_OPS, "in", "contains", "starts_with", "is_null", "not_null")
+_ROW = "__row"
+
+_frames = MemoryLRU(FRAME_CACHE_ENTRIES)
+_orders = MemoryLRU(settings.row_browser_cache_mb * 1024 * 1024, weigh=lambda order: order.estimated_size())
+
+
+def _write_ipc(path: str, file_type: str, destination: str):
+    # Uncompressed, so the copy is memory-mappable. The sink holds a batch at
+    # a time; the memory-mapped reader takes its record batches as they are.
+    with open_dataset_file(settings.supabase_datasets_bucket, path) as local_path:
+        plan = scan_dataset_file(local_path, file_type)
+        try:
+            plan.sink_ipc(destination, compression=None)
+        except pl.InvalidOperationError:
+            # Not every plan can stream; fall back to materialising it.
+            plan.collect().write_ipc(destination, compression="uncompressed")
+
+
+def _open_frame(version: dict) -> pl.DataFrame:
+    """
+    The version's default view as a memory-mapped Arrow IPC copy. The copy
+    lives in the dataset cache; the mapping stays valid if the entry is
+    evicted, and its space is released when the frame leaves ``_frames``.
+    """
+    frame = _frames.get(version["id"])
+    if frame is not None:
+        return frame
+    source = version_source(version)
+    if source is None:
+        raise ValueError("Version has no stored file")
+    path, file_type = source
+
+    cache = get_dataset_cache()
+    if cache is None:
+        fd, ipc_path = tempfile.mkstemp(suffix=".arrow")
+        os.close(fd)
+        try:
+            _write_ipc(path, file_type, ipc_path)
+            frame = pl.read_ipc(ipc_path, memory_map=True, rechunk=False)
+        finally:
+            os.unlink(ipc_path)
+    else:
+        key = hashlib.sha256(
+            f"rows-ipc/{DatasetCache.key_for(settings.supabase_datasets_bucket, path)}".encode("utf-8")
+        ).hexdigest()
+        with cache.open_key(key, lambda destination: _write_ipc(path, file_type, destination), suffix=".arrow") as ipc_path:
+            frame = pl.read_ipc(ipc_path, memory_map=True, rechunk=False)
+    _frames.put(version["id"], frame)
+    return frame
+
+
+def _require_column(schema: dict, column: str):
+    if column not in schema:
+        raise ValueError(f"Unknown column: {column}")
+
+
+def _literal(value: Any, dtype: pl.DataType, column: str) -> pl.Series:
+    values = value if isinstance(value, list) else [value]
+    try:
+        return pl.Series(values).cast(dtype)
+    except (pl.ComputeError, pl.InvalidOperationError, TypeError, ValueError) as exc:
+        raise ValueError(f"Cannot compare {column} ({dtype}) with {value!r}") from exc
+
+
+def filter_expression(filters: list[dict], schema: dict) -> pl.Expr | None:
+    """AND of ``{"column", "op", "value"}`` filters, with values cast to the column's type."""
+    predicates = []
+    for item in filters:
+        column, op, value = item["column"], item["op"], item.get("value")
+        _require_column(schema, column)
+        expr = pl.col(column)
+        if op == "is_null":
+            predicates.append(expr.is_null())
+        elif op == "not_null":
+            predicates.append(expr.is_not_null())
+        elif op in ("contains", "starts_with"):
+            if not isinstance(value, str):
+                raise ValueError(f"{op} needs a text value")
+            text = expr.cast(pl.Utf8)
+            predicates.append(text.str.contains(value, literal=True) if op == "contains" else text.str.starts_with(value))
+        elif op == "in":
+            if not isinstance(value, list):
+                raise ValueError("in needs a list of values")
+            predicates.append(expr.is_in(_literal(value, schema[column], column)))
+        elif op in COMPARISON_OPS:
+            if value is None:
+                raise ValueError(f"{op} needs a value; use is_null to match missing values")
+            predicates.append(COMPARISON_OPS[op](expr, _literal(value, schema[column], column)[0]))
+        else:
+            raise ValueError(f"Unknown filter operator: {op}")
+    if not predicates:
+        return None
+    return pl.all_horizontal(predicates)
+
+
+def _row_order(version_id: str, frame: pl.DataFrame, filters: list[dict], sort: list[dict]) -> pl.Series | None:
+    """
+    Indices of the matching rows in display order, cached per version, filters
+    and sort so later pages are a gather. None means every row in file order.
+    """
+    if not filters and not sort:
+        return None
+    key = (version_id, json.dumps(filters, sort_keys=True, default=str), json.dumps(sort, sort_keys=True))
+    order = _orders.get(key)
+    if order is not None:
+        return order
+
+    schema = frame.schema
+    lazy = frame.lazy().with_row_count(_ROW)
+    predicate = filter_expression(filters, schema)
+    if predicate is not None:
+        lazy = lazy.filter(predicate)
+    if sort:
+        for item in sort:
+            _require_column(schema, item["column"])
+        # Stable, so ties keep file order and the order is deterministic.
+        lazy = lazy.sort(
+            [item["column"] for item in sort],
+            descending=[bool(item.get("descending")) for item in sort],
+            nulls_last=True,
+            maintain_order=True,
+        )
+    order = lazy.select(_ROW).collect()[_ROW]
+    _orders.put(key, order)
+    return order
+
+
+def _gather(frame: pl.DataFrame, indices: pl.Series) -> pl.DataFrame:
+    # Indexing a multi-batch frame costs O(rows) per call in polars (~35 ms
+    # for 3M rows in 20 batches, against 0.05 ms for one batch); one-row
+    # slices cost O(page) whatever the batching (~0.2 ms per 100 rows).
+    if indices.is_empty():
+        return frame.clear()
+    return pl.concat([frame.slice(index, 1) for index in indices.to_list()])
+
+
+def _browse(
+    version: dict,
+    columns: list[str] | None,
+    filters: list[dict],
+    sort: list[dict],
+    offset: int,
+    limit: int,
+) -> dict:
+    frame = _open_frame(version)
+    if columns:
+        for column in columns:
+            _require_column(frame.schema, column)
+    order = _row_order(version["id"], frame, filters, sort)
+    projected = frame.select(columns) if columns else frame
+    if order is None:
+        total = frame.height
+        page = projected.slice(offset, limit)
+    else:
+        total = len(order)
+        page = _gather(projected, order.slice(offset, limit))
+    next_offset = offset + page.height
+    return {
+        "columns": [{"name": name, "dtype": str(dtype)} for name, dtype in page.schema.items()],
+        "rows": finite_or_null(page).to_dicts(),
+        "total": total,
+        "offset": offset,
+        "next_offset": next_offset if next_offset < total else None,
+    }
+
+
+async def browse_rows(
+    version: dict,
+    columns: list[str] | None = None,
+    filters: list[dict] | None = None,
+    sort: list[dict] | None = None,
+    offset: int = 0,
+    limit: int = PAGE_SIZE,
+) -> dict:
+    """
+    One page of a version's rows after filtering, sorting and projecting.
+
+    The first request for a (filters, sort) pair computes the matching row
+    indices in order; any page of it is then a gather over a memory-mapped
+    Arrow copy of the version. Raises ValueError for unknown columns or
+    operators and for values that do not fit a column's type.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return await asyncio.to_thread(_browse, version, columns, filters or [], sort or [], max(0, offset), limit)
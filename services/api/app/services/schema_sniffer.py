@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import logging
+import shutil
+import tempfile
+import zipfile
+import zlib
+from itertools import islice
+from typing import Any, BinaryIO, Optional
+
+import polars as pl
+
+try:
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover
+    pq = None
+
+try:
+    import zstandard
+except Exception:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 1024 * 1024
+SNIFF_EXCEL_ROWS = 1000
+DELIMITERS = ",;\t|"
+# Same options the profiler (and the canonical Parquet copy) read CSV with,
+# so the preliminary dtypes match the final profile.
+CSV_READ_OPTIONS = {"infer_schema_length": 1000, "try_parse_dates": True, "ignore_errors": True}
+
+
+def sniff_schema(source: BinaryIO, file_type: str, size: int, compression: Optional[str] = None) -> Optional[dict]:
+    """
+    Infer a preliminary schema from the start of an upload (or a Parquet
+    footer) without parsing the whole file.
+
+    Returns ``{"format", "columns": [{"name", "dtype", "inferred_type"}],
+    "estimated_row_count", "row_count_exact", "sampled_rows"}`` plus
+    ``"delimiter"`` for delimited text, or None when nothing could be inferred.
+    ``source`` must be seekable. Never raises: a sniff is best-effort and the
+    profile job remains the source of truth.
+    """
+    try:
+        if file_type == "parquet" and compression is None:
+            return _sniff_parquet(source)
+        if file_type == "xlsx" and compression is None:
+            return _sniff_excel(source)
+        if file_type == "xlsx" and compression == "zip":
+            return _sniff_zipped_excel(source)
+        head, total = _read_head(source, size, compression)
+        return _sniff_text(head, total, file_type)
+    except Exception as exc:
+        logger.warning("Schema sniff failed for %s upload: %s", file_type, exc)
+    return None
+
+
+def sniff_head(head: bytes, file_type: str, size: int, compression: Optional[str] = None) -> Optional[dict]:
+    """
+    Like :func:`sniff_schema`, from only the first chunk of an upload stream
+    (e.g. a resumable upload). Formats whose schema lives at the end of the
+    file (Parquet, Excel, zip archives) return None.
+    """
+    if file_type not in ["csv", "tsv", "json"] or compression == "zip":
+        return None
+    try:
+        if compression is None:
+            return _sniff_text(head[:SNIFF_BYTES], size, file_type)
+        if compression == "gzip":
+            inflater = zlib.decompressobj(zlib.MAX_WBITS | 32)
+            data = inflater.decompress(head, SNIFF_BYTES)
+            consumed = len(head) - len(inflater.unconsumed_tail) - len(inflater.unused_data)
+            # Scale by the compression ratio seen so far.
+            total = len(data) if inflater.eof and consumed >= size else int(len(data) * size / max(consumed, 1))
+            return _sniff_text(data, total, file_type)
+        if compression == "zstd":
+            if zstandard is None:
+                return None
+            total = zstandard.frame_content_size(head[:18])
+            data = _read_up_to(zstandard.ZstdDecompressor().stream_reader(io.BytesIO(head)), SNIFF_BYTES)
+            return _sniff_text(data, total if total >= 0 else None, file_type)
+    except Exception as exc:
+        logger.warning("Schema sniff failed for %s upload: %s", file_type, exc)
+    return None
+
+
+def _sniff_text(head: bytes, total: Optional[int], file_type: str) -> Optional[dict]:
+    if file_type in ["csv", "tsv"]:
+        return _sniff_delimited(head, total, "\t" if file_type == "tsv" else None)
+    if file_type == "json":
+        return _sniff_json(head, total)
+    return None
+
+
+def _read_up_to(reader: BinaryIO, limit: int) -> bytes:
+    chunks = []
+    remaining = limit
+    while remaining > 0:
+        chunk = reader.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _read_head(source: BinaryIO, size: int, compression: Optional[str]) -> tuple[bytes, Optional[int]]:
+    """First ``SNIFF_BYTES`` of the (decompressed) content and its total size, if known."""
+    source.seek(0)
+    if compression is None:
+        return source.read(SNIFF_BYTES), size
+    if compression == "gzip":
+        head = gzip.GzipFile(fileobj=source).read(SNIFF_BYTES)
+        # The gzip trailer holds the uncompressed size mod 2**32 (last member only).
+        source.seek(-4, io.SEEK_END)
+        total = int.from_bytes(source.read(4), "little")
+        return head, total if total >= len(head) else None
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstandard is not installed")
+        total = zstandard.frame_content_size(source.read(18))
+        source.seek(0)
+        head = _read_up_to(zstandard.ZstdDecompressor().stream_reader(source), SNIFF_BYTES)
+        return head, total if total >= 0 else None
+    if compression == "zip":
+        with zipfile.ZipFile(source) as archive:
+            info = _zip_member(archive)
+            with archive.open(info) as member:
+                return member.read(SNIFF_BYTES), info.file_size
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _zip_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+    ]
+    if len(members) != 1:
+        raise ValueError("Zip archives must contain exactly one dataset file")
+    return members[0]
+
+
+def _sniff_zipped_excel(source: BinaryIO) -> Optional[dict]:
+    # Workbooks are zip files themselves and openpyxl needs random access, so
+    # the member is spooled to disk rather than read into memory.
+    source.seek(0)
+    with zipfile.ZipFile(source) as archive, tempfile.TemporaryFile() as spool:
+        with archive.open(_zip_member(archive)) as member:
+            shutil.copyfileobj(member, spool)
+        return _sniff_excel(spool)
+
+
+def _sniff_parquet(source: BinaryIO) -> dict:
+    source.seek(0)
+    if pq is not None:
+        metadata = pq.ParquetFile(source).metadata
+        schema = pl.from_arrow(metadata.schema.to_arrow_schema().empty_table()).schema
+        row_count = metadata.num_rows
+    else:
+        schema = pl.read_parquet_schema(source)
+        row_count = None
+    return _result("parquet", schema, row_count, row_count is not None, 0)
+
+
+def _sniff_delimited(head: bytes, total: Optional[int], delimiter: Optional[str]) -> Optional[dict]:
+    complete = total is not None and len(head) >= total
+    if not complete:
+        # Drop the partial last line.
+        head = head[: head.rfind(b"\n") + 1]
+    if not head.strip():
+        return None
+    text = head.decode("utf-8", errors="replace")
+    if delimiter is None:
+        try:
+            delimiter = csv.Sniffer().sniff("".join(islice(io.StringIO(text), 50)), delimiters=DELIMITERS).delimiter
+        except csv.Error:
+            delimiter = ","
+    df = pl.read_csv(io.BytesIO(head), separator=delimiter, **CSV_READ_OPTIONS)
+    result = _result("csv" if delimiter != "\t" else "tsv", df.schema, _estimate(df.height, len(head), total, complete), complete, df.height)
+    result["delimiter"] = delimiter
+    return result
+
+
+def _sniff_json(head: bytes, total: Optional[int]) -> Optional[dict]:
+    complete = total is not None and len(head) >= total
+    text = head.decode("utf-8", errors="replace").lstrip("\ufeff").lstrip()
+    records: list[Any] = []
+    consumed = 0
+    if text.startswith("["):
+        decoder = json.JSONDecoder()
+        pos = 1
+        while True:
+            while pos < len(text) and text[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(text) or text[pos] == "]":
+                break
+            try:
+                value, pos = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                break  # cut off by the sniff window
+            records.append(value)
+            consumed = pos
+        layout = "json"
+    else:
+        lines = text.splitlines(keepends=True)
+        if not complete:
+            lines = lines[:-1]
+        for line in lines:
+            consumed += len(line.encode("utf-8"))
+            if line.strip():
+                records.append(json.loads(line))
+        layout = "ndjson"
+    records = [record for record in records if isinstance(record, dict)]
+    if not records:
+        return None
+    df = pl.from_dicts(records, infer_schema_length=1000)
+    return _result(layout, df.schema, _estimate(len(records), consumed, total, complete), complete, len(records))
+
+
+def _sniff_excel(source: BinaryIO) -> Optional[dict]:
+    import openpyxl
+
+    source.seek(0)
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = list(islice(sheet.iter_rows(values_only=True), SNIFF_EXCEL_ROWS + 1))
+        max_row = sheet.max_row
+    finally:
+        workbook.close()
+    if not rows:
+        return None
+    columns = []
+    seen = set()
+    for i, value in enumerate(rows[0]):
+        name = str(value) if value is not None else f"column_{i + 1}"
+        if name in seen:
+            name = f"{name}_{i + 1}"
+        seen.add(name)
+        values = [row[i] if i < len(row) else None for row in rows[1:]]
+        columns.append(pl.Series(name, values, strict=False))
+    df = pl.DataFrame(columns)
+    complete = len(rows) <= SNIFF_EXCEL_ROWS
+    estimated = df.height if complete else (max_row - 1 if max_row else None)
+    return _result("xlsx", df.schema, estimated, complete, df.height)
+
+
+def _estimate(rows: int, sampled_bytes: int, total: Optional[int], complete: bool) -> Optional[int]:
+    if complete:
+        return rows
+    if total is None or not sampled_bytes:
+        return None
+    return int(rows * total / sampled_bytes)
+
+
+def _result(
+    layout: str,
+    schema: dict[str, Any],
+    estimated_row_count: Optional[int],
+    exact: bool,
+    sampled_rows: int,
+) -> dict:
+    return {
+        "format": layout,
+        "columns": [
+            {"name": name, "dtype": str(dtype), "inferred_type": _inferred_type(dtype)}
+            for name, dtype in schema.items()
+        ],
+        "estimated_row_count": estimated_row_count,
+        "row_count_exact": exact,
+        "sampled_rows": sampled_rows,
+    }
+
+
+def _inferred_type(dtype: Any) -> str:
+    if dtype == pl.Boolean:
+        return "boolean"
+    if dtype.is_numeric():
+        return "numeric"
+    if dtype.is_temporal():
+        return "datetime"
+    return "text"
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from contextlib import ExitStack
+
+import polars as pl
+
+from app.config import settings
+from app.services.dataset_reader import QUERY_ERRORS, scan_dataset_file, version_source
+from app.services.memory_cache import MemoryLRU
+from app.services.storage_reader import open_dataset_file
+
+DEFAULT_MAX_ROWS = 10_000
+_POLL_SECONDS = 0.02
+
+# String literals, quoted identifiers and comments, matched leftmost-first
+# so a quote inside a comment (or "--" inside a string) is not misread.
+_LEXEME = re.compile(r"""('(?:[^']|'')*')|("(?:[^"]|"")*")|(--[^\n]*|/\*.*?\*/)""", re.DOTALL)
+_LEADING_KEYWORD = re.compile(r"^\s*(\w+)")
+# Table functions such as read_csv('/path') would read arbitrary local files.
+_TABLE_FUNCTION = re.compile(r"\bread_\w*\s*\(", re.IGNORECASE)
+
+_abandoned: set[asyncio.Task] = set()
+_results = MemoryLRU(settings.sql_cache_mb * 1024 * 1024, weigh=lambda entry: entry[0].estimated_size())
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+def normalize_query(query: str) -> str:
+    """
+    Collapse whitespace, drop comments and trailing semicolons, leaving quoted
+    text as written, so formatting differences share a cache entry. Raises
+    ValueError for anything but a single read-only SELECT (or WITH ... SELECT).
+    """
+    return _parse_query(query)[0]
+
+
+def _parse_query(query: str) -> tuple[str, str]:
+    """The normalised query, and the same with literals blanked and identifiers unquoted."""
+    pieces, code = [], []
+    pending = ""  # unquoted text since the last literal or identifier
+    position = 0
+    for match in _LEXEME.finditer(query):
+        literal, identifier, _comment = match.groups()
+        pending += query[position:match.start()]
+        position = match.end()
+        if literal is None and identifier is None:
+            pending += " "
+            continue
+        between = re.sub(r"\s+", " ", pending)
+        pending = ""
+        if literal is not None:
+            pieces += [between, literal]
+            code += [between, "''"]
+        else:
+            # Unquoted for the checks: "read_csv"(...) is still a function call.
+            pieces += [between, identifier]
+            code += [between, identifier[1:-1]]
+    tail = re.sub(r"\s+", " ", pending + query[position:])
+    normalized = "".join(pieces + [tail]).strip().rstrip("; ")
+    checked = "".join(code + [tail]).strip().rstrip("; ")
+
+    keyword = _LEADING_KEYWORD.match(checked)
+    if not keyword or keyword.group(1).upper() not in ("SELECT", "WITH"):
+        raise ValueError("Only SELECT queries are allowed")
+    if ";" in checked:
+        raise ValueError("Only one statement is allowed")
+    if _TABLE_FUNCTION.search(checked):
+        raise ValueError("Table functions are not allowed; query the project's tables by name")
+    return normalized, checked
+
+
+def referenced_tables(checked: str, tables: dict[str, dict]) -> dict[str, dict]:
+    """
+    The tables whose names appear in the query as a word, outside string
+    literals. A column or alias sharing a table's name over-matches, which
+    only costs opening a file the plan never reads.
+    """
+    words = {word.lower() for word in re.findall(r"\w+", checked)}
+    return {name: version for name, version in tables.items() if name.lower() in words}
+
+
+def table_name(name: str, taken: set[str]) -> str:
+    """A SQL-friendly, unique table name for a dataset name."""
+    base = re.sub(r"[^0-9a-z_]+", "_", name.lower()).strip("_") or "dataset"
+    if base[0].isdigit():
+        base = f"t_{base}"
+    candidate, suffix = base, 2
+    while candidate in taken:
+        candidate, suffix = f"{base}_{suffix}", suffix + 1
+    taken.add(candidate)
+    return candidate
+
+
+def _release_when_done(running, stack: ExitStack):
+    """
+    Keep a cancelled query referenced, and its files open, until its worker
+    stops: dropping an unfinished background query aborts the process.
+    """
+    def wait():
+        try:
+            running.fetch_blocking()
+        except QUERY_ERRORS:
+            pass
+        finally:
+            stack.close()
+
+    task = asyncio.get_running_loop().create_task(asyncio.to_thread(wait))
+    _abandoned.add(task)
+    task.add_done_callback(_abandoned.discard)
+
+
+def _cache_key(query: str, tables: dict[str, dict], max_rows: int) -> str:
+    payload = {
+        "query": query,
+        "tables": {name: version["id"] for name, version in sorted(tables.items())},
+        "max_rows": max_rows,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _open_tables(stack: ExitStack, tables: dict[str, dict]) -> pl.SQLContext:
+    frames = {}
+    for name, version in tables.items():
+        source = version_source(version)
+        if source is None:
+            continue
+        path, file_type = source
+        local_path = stack.enter_context(open_dataset_file(settings.supabase_datasets_bucket, path))
+        frames[name] = scan_dataset_file(local_path, file_type)
+    return pl.SQLContext(frames=frames)
+
+
+async def run_query(
+    query: str,
+    tables: dict[str, dict],
+    max_rows: int = DEFAULT_MAX_ROWS,
+    timeout: float | None = None,
+) -> dict:
+    """
+    Run read-only SQL over dataset versions registered as lazy tables
+    (``{table name: version}``). Only the tables the query names are opened
+    and registered. The plan runs on the streaming engine in the
+    background and is cancelled after ``timeout`` seconds (QueryTimeout).
+    Returns ``frame`` (at most ``max_rows`` rows), ``truncated``, ``cached``
+    and ``elapsed_ms``. Results are cached per normalised query, version ids
+    and row limit; versions are immutable, so entries never go stale.
+    """
+    normalized, checked = _parse_query(query)
+    tables = referenced_tables(checked, tables)
+    if timeout is None:
+        timeout = settings.sql_timeout_seconds
+    key = _cache_key(normalized, tables, max_rows)
+    entry = _results.get(key)
+    if entry is not None:
+        frame, truncated = entry
+        return {"frame": frame, "truncated": truncated, "cached": True, "elapsed_ms": 0}
+
+    started = time.monotonic()
+    stack = ExitStack()
+    running = None
+    frame = None
+    try:
+        context = await asyncio.to_thread(_open_tables, stack, tables)
+        try:
+            lazy = context.execute(normalized, eager=False)
+        except QUERY_ERRORS as exc:
+            raise ValueError(str(exc)) from exc
+        # One extra row tells a complete result from a truncated one.
+        running = lazy.limit(max_rows + 1).collect(streaming=True, comm_subplan_elim=False, background=True)
+        deadline = started + timeout
+        while frame is None:
+            try:
+                frame = running.fetch()
+            except QUERY_ERRORS as exc:
+                running = None
+                raise ValueError(str(exc)) from exc
+            if frame is None:
+                if time.monotonic() > deadline:
+                    raise QueryTimeout(f"Query exceeded {timeout:g}s")
+                await asyncio.sleep(_POLL_SECONDS)
+    finally:
+        if running is not None and frame is None:
+            # Timed out, or the request went away.
+            running.cancel()
+            _release_when_done(running, stack)
+        else:
+            stack.close()
+
+    truncated = frame.height > max_rows
+    if truncated:
+        frame = frame.head(max_rows)
+    _results.put(key, (frame, truncated))
+    return {
+        "frame": frame,
+        "truncated": truncated,
+        "cached": False,
+        "elapsed_ms": round((time.monotonic() - started) * 1000),
+    }
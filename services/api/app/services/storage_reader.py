@@ -0,0 +1,280 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+import zlib
+from contextlib import contextmanager
+from functools import partial
+from typing import BinaryIO, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from app.config import get_settings
+from app.services.dataset_cache import get_dataset_cache
+
+try:
+    import zstandard
+except Exception:  # pragma: no cover
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024
+
+# Storage path extension -> compression codec. Compressed datasets keep the
+# inner extension, e.g. ``sales.csv.gz``.
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd", ".zip": "zip"}
+
+# A dataset stored as deduplicated, content-addressed chunks is a small JSON
+# manifest object with this content type; readers reassemble it.
+CHUNK_MANIFEST_CONTENT_TYPE = "application/vnd.datacanvas.chunk-manifest+json"
+
+_SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+
+def split_compression(path: str) -> Tuple[str, Optional[str]]:
+    """Split ``"a/b.csv.gz"`` into ``("a/b.csv", "gzip")``; uncompressed paths get ``None``."""
+    root, ext = os.path.splitext(path)
+    compression = COMPRESSION_EXTENSIONS.get(ext.lower())
+    return (root, compression) if compression else (path, None)
+
+
+def chunk_storage_path(owner: str, sha256: str) -> str:
+    """Storage path of a content-addressed chunk in ``owner``'s folder."""
+    return f"{owner}/chunks/{sha256[:2]}/{sha256}"
+
+
+def dataset_suffix(path: str) -> str:
+    """File extension of the dataset itself, ignoring any compression extension."""
+    return os.path.splitext(split_compression(path)[0])[1]
+
+
+class _GzipWriter:
+    """Inflate gzip/zlib data into ``handle`` without holding more than one chunk of output."""
+
+    def __init__(self, handle: BinaryIO):
+        self._handle = handle
+        self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        self._partial = False
+
+    def write(self, data: bytes):
+        while data:
+            try:
+                self._handle.write(self._inflater.decompress(data, CHUNK_SIZE))
+            except zlib.error as exc:
+                raise ValueError(f"Invalid gzip data: {exc}") from exc
+            self._partial = not self._inflater.eof
+            if self._inflater.eof:
+                # Concatenated gzip members (e.g. from pigz or appended logs).
+                data = self._inflater.unused_data
+                self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 32)
+            else:
+                data = self._inflater.unconsumed_tail
+
+    def flush(self):
+        self._handle.write(self._inflater.flush())
+        if self._partial:
+            raise ValueError("Truncated gzip data")
+
+
+def _decompressing_writer(handle: BinaryIO, compression: str):
+    if compression == "gzip":
+        return _GzipWriter(handle)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Reading .zst datasets requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_writer(handle, write_size=CHUNK_SIZE, closefd=False)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _zip_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+    ]
+    if len(members) != 1:
+        raise ValueError("Zip archives must contain exactly one dataset file")
+    return members[0]
+
+
+def decompress_stream(source: BinaryIO, destination: BinaryIO, compression: str) -> None:
+    """
+    Decompress ``source`` into ``destination`` chunk by chunk. Zip archives are
+    read through their central directory, so ``source`` must be seekable.
+    """
+    if compression == "zip":
+        try:
+            with zipfile.ZipFile(source) as archive, archive.open(_zip_member(archive)) as member:
+                shutil.copyfileobj(member, destination, CHUNK_SIZE)
+        except zipfile.BadZipFile as exc:
+            raise ValueError(f"Invalid zip archive: {exc}") from exc
+        return
+    writer = _decompressing_writer(destination, compression)
+    for chunk in iter(partial(source.read, CHUNK_SIZE), b""):
+        writer.write(chunk)
+    writer.flush()
+
+
+def _object_url(bucket: str, path: str) -> str:
+    settings = get_settings()
+    return f"{settings.supabase_url.rstrip('/')}/storage/v1/object/{bucket}/{quote(path)}"
+
+
+def _iter_object(
+    url: str,
+    headers: Optional[dict],
+    chunk_size: int,
+    bucket: Optional[str] = None,
+    path: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Yield the bytes of the object at ``url``. When ``bucket``/``path`` name a
+    storage object that is a chunk manifest, yield the reassembled dataset:
+    chunks are read from the manifest owner's folder (never from anywhere the
+    manifest could point) and each is checked against its hash.
+    """
+    timeout = httpx.Timeout(30.0, read=300.0)
+    with httpx.stream("GET", url, headers=headers, timeout=timeout) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "")
+        if bucket is None or not content_type.startswith(CHUNK_MANIFEST_CONTENT_TYPE):
+            yield from response.iter_bytes(chunk_size)
+            return
+        manifest = json.loads(response.read())
+
+    owner = path.split("/", 1)[0]
+    for entry in manifest["chunks"]:
+        sha256 = entry["sha256"]
+        if not _SHA256_HEX.fullmatch(sha256):
+            raise ValueError(f"Invalid chunk manifest: {path}")
+        digest = hashlib.sha256()
+        with httpx.stream("GET", _object_url(bucket, chunk_storage_path(owner, sha256)), headers=headers, timeout=timeout) as response:
+            response.raise_for_status()
+            for data in response.iter_bytes(chunk_size):
+                digest.update(data)
+                yield data
+        if digest.hexdigest() != sha256:
+            raise ValueError(f"Chunk {sha256} of {path} is corrupt")
+
+
+def _stream_to_file(
+    url: str,
+    destination: str,
+    headers: Optional[dict] = None,
+    chunk_size: int = CHUNK_SIZE,
+    compression: Optional[str] = None,
+    bucket: Optional[str] = None,
+    path: Optional[str] = None,
+) -> int:
+    if compression == "zip":
+        # The zip index sits at the end of the archive: spool it, then extract.
+        archive_path = destination + ".zip"
+        try:
+            written = _stream_to_file(url, archive_path, headers, chunk_size, bucket=bucket, path=path)
+            with open(archive_path, "rb") as source, open(destination, "wb") as handle:
+                decompress_stream(source, handle, compression)
+            return written
+        finally:
+            remove_temp(archive_path)
+
+    written = 0
+    with open(destination, "wb") as handle:
+        writer = _decompressing_writer(handle, compression) if compression else handle
+        for chunk in _iter_object(url, headers, chunk_size, bucket, path):
+            writer.write(chunk)
+            written += len(chunk)
+        if compression:
+            writer.flush()
+    return written
+
+
+def _auth_headers() -> dict:
+    settings = get_settings()
+    return {
+        "Authorization": f"Bearer {settings.supabase_service_role_key}",
+        "apikey": settings.supabase_service_role_key,
+    }
+
+
+def download_to_file(
+    bucket: str,
+    path: str,
+    destination: str,
+    chunk_size: int = CHUNK_SIZE,
+    compression: Optional[str] = None,
+) -> int:
+    """
+    Stream a storage object to ``destination`` chunk by chunk, decompressing
+    it on the fly when ``compression`` is given. Chunked (deduplicated)
+    objects are reassembled from their manifest. Returns bytes transferred.
+    """
+    return _stream_to_file(
+        _object_url(bucket, path),
+        destination,
+        _auth_headers(),
+        chunk_size,
+        compression=compression,
+        bucket=bucket,
+        path=path,
+    )
+
+
+def iter_object(bucket: str, path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a storage object's bytes as stored (chunked objects reassembled, nothing decompressed)."""
+    return _iter_object(_object_url(bucket, path), _auth_headers(), chunk_size, bucket, path)
+
+
+def download_to_temp(bucket: str, path: str) -> str:
+    """
+    Stream a storage object into a new temporary file, decompressed; the
+    caller removes it.
+    """
+    fd, local_path = tempfile.mkstemp(prefix="datacanvas-", suffix=dataset_suffix(path))
+    os.close(fd)
+    try:
+        download_to_file(bucket, path, local_path, compression=split_compression(path)[1])
+    except BaseException:
+        remove_temp(local_path)
+        raise
+    return local_path
+
+
+def remove_temp(local_path: str) -> None:
+    try:
+        os.unlink(local_path)
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def open_dataset_file(bucket: str, path: str) -> Iterator[str]:
+    """
+    Yield a local path for a storage object.
+
+    Reads go through the shared on-disk dataset cache when it is enabled, so a
+    hot dataset is downloaded once per host. Otherwise the object is streamed
+    into a temporary file that is removed when the context exits. Either way
+    memory use is bounded by ``CHUNK_SIZE`` and parsers can memory-map the file.
+    Compressed objects (``.gz``, ``.zst``, ``.zip``) are decompressed while
+    they stream in, so the yielded file is always the plain dataset.
+    The yielded file must not be modified.
+    """
+    cache = get_dataset_cache()
+    if cache is not None:
+        compression = split_compression(path)[1]
+        with cache.open(
+            bucket,
+            path,
+            lambda destination: download_to_file(bucket, path, destination, compression=compression),
+            suffix=dataset_suffix(path),
+        ) as local_path:
+            yield local_path
+        return
+
+    local_path = download_to_temp(bucket, path)
+    try:
+        yield local_path
+    finally:
+        remove_temp(local_path)
@@ -0,0 +1,119 @@
+import asyncio
+import base64
+from typing import AsyncIterator, Optional
+from urllib.parse import quote
+
+import httpx
+
+from app.config import get_settings
+
+CHUNK_SIZE = 1024 * 1024
+TUS_VERSION = "1.0.0"
+# Supabase Storage's TUS endpoint requires every chunk except the last to be
+# exactly 6 MiB.
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+
+_TIMEOUT = httpx.Timeout(30.0, write=300.0)
+
+
+class UploadConflict(Exception):
+    """The storage server's upload offset differs from the one the chunk assumed."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+def _headers(**extra: str) -> dict:
+    settings = get_settings()
+    return {
+        "Authorization": f"Bearer {settings.supabase_service_role_key}",
+        "apikey": settings.supabase_service_role_key,
+        **extra,
+    }
+
+
+def _storage_url(suffix: str) -> str:
+    return f"{get_settings().supabase_url.rstrip('/')}/storage/v1/{suffix}"
+
+
+async def upload_stream(
+    bucket: str,
+    path: str,
+    chunks: AsyncIterator[bytes],
+    size: Optional[int],
+    content_type: str,
+) -> None:
+    """
+    Send an object to storage as one streamed request body, so only the chunk
+    in flight is held in memory. Without ``size`` the body is sent chunked.
+    """
+    headers = _headers(**{"Content-Type": content_type, "x-upsert": "false"})
+    if size is not None:
+        headers["Content-Length"] = str(size)
+    async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
+        response = await client.post(_storage_url(f"object/{bucket}/{quote(path)}"), content=chunks, headers=headers)
+        response.raise_for_status()
+
+
+async def file_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Read a local file as an async stream of chunks, for :func:`upload_stream`."""
+    with open(path, "rb") as handle:
+        while chunk := await asyncio.to_thread(handle.read, chunk_size):
+            yield chunk
+
+
+async def upload_object(bucket: str, path: str, data: bytes, content_type: str, upsert: bool = False) -> None:
+    """Store a small object (a dedup chunk or manifest) in one request."""
+    headers = _headers(**{"Content-Type": content_type, "x-upsert": "true" if upsert else "false"})
+    async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
+        response = await client.post(_storage_url(f"object/{bucket}/{quote(path)}"), content=data, headers=headers)
+        response.raise_for_status()
+
+
+def _tus_metadata(**values: str) -> str:
+    return ",".join(f"{key} {base64.b64encode(value.encode('utf-8')).decode('ascii')}" for key, value in values.items())
+
+
+async def create_resumable_upload(bucket: str, path: str, size: int, content_type: str) -> str:
+    """Open a TUS upload of ``size`` bytes; returns its upload URL."""
+    headers = _headers(**{
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Length": str(size),
+        "Upload-Metadata": _tus_metadata(bucketName=bucket, objectName=path, contentType=content_type),
+        "x-upsert": "false",
+    })
+    async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
+        response = await client.post(_storage_url("upload/resumable"), headers=headers)
+        response.raise_for_status()
+    return str(response.url.join(response.headers["Location"]))
+
+
+async def resumable_offset(upload_url: str) -> int:
+    """Bytes the storage server has durably received for a TUS upload."""
+    async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
+        response = await client.head(upload_url, headers=_headers(**{"Tus-Resumable": TUS_VERSION}))
+        response.raise_for_status()
+    return int(response.headers["Upload-Offset"])
+
+
+async def append_resumable_chunk(upload_url: str, offset: int, chunk: bytes) -> int:
+    """Append ``chunk`` at ``offset``; returns the new offset."""
+    headers = _headers(**{
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(offset),
+        "Content-Type": "application/offset+octet-stream",
+    })
+    async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
+        response = await client.patch(upload_url, content=chunk, headers=headers)
+    if response.status_code == 409:
+        raise UploadConflict(await resumable_offset(upload_url))
+    response.raise_for_status()
+    return int(response.headers["Upload-Offset"])
+
+
+async def terminate_resumable_upload(upload_url: str) -> None:
+    async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
+        response = await client.delete(upload_url, headers=_headers(**{"Tus-Resumable": TUS_VERSION}))
+    if response.status_code not in (204, 404, 410):
+        response.raise_for_status()
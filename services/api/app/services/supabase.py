@@ -1,11 +1,21 @@
 import logging
 import os
+import socket
+from datetime import datetime, timezone
 from supabase import Client, create_client
 from app.config import settings
 
 
 logger = logging.getLogger(__name__)
 
+# Job priorities: higher values are dispatched first (see 007_job_priority.sql).
+JOB_PRIORITY_INTERACTIVE = 80
+JOB_PRIORITY_DEFAULT = 50
+JOB_PRIORITY_BULK = 10
+
+# Lease owner for jobs this process runs itself (see 023_api_job_leases.sql).
+API_WORKER_ID = settings.worker_id or f"api-{socket.gethostname()}-{os.getpid()}"
+
 
 class SupabaseService:
     def __init__(self):
@@ -90,23 +100,122 @@ class SupabaseService:
     async def get_profile(self, version_id: str):
         return self.client.table("dataset_profiles").select("*").eq("version_id", version_id).single().execute()
 
+    async def get_profiles(self, version_ids: list[str]):
+        return self.client.table("dataset_profiles").select(
+            "version_id, statistics, column_stats, computed_at"
+        ).in_("version_id", version_ids).execute()
+
+    # Version diffs (cached per version pair and key)
+    async def get_version_diff(self, base_version_id: str, target_version_id: str, key_columns: str):
+        return self.client.table("dataset_version_diffs").select("*").eq(
+            "base_version_id", base_version_id
+        ).eq("target_version_id", target_version_id).eq("key_columns", key_columns).limit(1).execute()
+
+    async def save_version_diff(self, **kwargs):
+        return self.client.table("dataset_version_diffs").upsert(
+            kwargs, on_conflict="base_version_id,target_version_id,key_columns"
+        ).execute()
+
     async def create_profile(self, version_id: str, **kwargs):
         return self.client.table("dataset_profiles").insert({
             "version_id": version_id,
             **kwargs,
         }).execute()
 
+    # Pipelines
+    async def get_pipelines(self, dataset_id: str):
+        return self.client.table("dataset_pipelines").select("*").eq("dataset_id", dataset_id).order("created_at").execute()
+
+    async def create_pipeline(self, dataset_id: str, name: str, steps: list[dict]):
+        return self.client.table("dataset_pipelines").insert({
+            "dataset_id": dataset_id,
+            "name": name,
+            "steps": steps,
+        }).execute()
+
+    async def get_pipeline(self, pipeline_id: str):
+        return self.client.table("dataset_pipelines").select("*").eq("id", pipeline_id).single().execute()
+
+    async def update_pipeline(self, pipeline_id: str, **kwargs):
+        return self.client.table("dataset_pipelines").update(kwargs).eq("id", pipeline_id).execute()
+
     # Jobs
-    async def create_job(self, user_id: str | None, job_type: str, payload: dict):
-        return self.client.table("jobs").insert({
-            "user_id": user_id,
-            "job_type": job_type,
-            "payload": payload,
+    async def create_job(self, user_id: str | None, job_type: str, payload: dict, priority: int = JOB_PRIORITY_DEFAULT):
+        """
+        Enqueue a job. Identical pending work (same type and payload) is coalesced:
+        the existing queued/running job is returned instead of a new one.
+        """
+        return self.client.rpc("enqueue_job", {
+            "p_user_id": user_id,
+            "p_job_type": job_type,
+            "p_payload": payload,
+            "p_priority": priority,
         }).execute()
 
+    # Upload sessions (resumable uploads)
+    async def create_upload_session(self, **kwargs):
+        return self.client.table("upload_sessions").insert(kwargs).execute()
+
+    async def get_upload_session(self, upload_id: str):
+        return self.client.table("upload_sessions").select("*").eq("id", upload_id).single().execute()
+
+    async def update_upload_session(self, upload_id: str, **kwargs):
+        return self.client.table("upload_sessions").update(kwargs).eq("id", upload_id).execute()
+
+    # Content-addressed dataset chunks (deduplicated version storage)
+    async def get_dataset_chunks(self, user_id: str, hashes: list[str]):
+        return self.client.table("dataset_chunks").select("sha256, size").eq("user_id", user_id).in_("sha256", hashes).execute()
+
+    async def record_dataset_chunks(self, user_id: str, chunks: list[dict]):
+        rows = [{"user_id": user_id, **chunk} for chunk in chunks]
+        return self.client.table("dataset_chunks").upsert(rows, on_conflict="user_id,sha256", ignore_duplicates=True).execute()
+
     async def get_job(self, job_id: str):
         return self.client.table("jobs").select("*").eq("id", job_id).single().execute()
 
+    async def cancel_job(self, job_id: str) -> bool:
+        result = self.client.rpc("cancel_job", {"p_job_id": job_id}).execute()
+        return bool(result.data)
+
+    async def claim_job(self, job_id: str):
+        """
+        Mark a queued job running under a lease held by this process; ``data``
+        is false if it was claimed or cancelled already.
+        """
+        return self.client.rpc("start_job", {
+            "p_job_id": job_id,
+            "p_worker_id": API_WORKER_ID,
+            "p_lease_seconds": settings.job_lease_seconds,
+        }).execute()
+
+    async def heartbeat_job(self, job_id: str):
+        """Renew this process's lease on a running job; ``data`` is false once it is lost."""
+        return self.client.rpc("heartbeat_job", {
+            "p_job_id": job_id,
+            "p_worker_id": API_WORKER_ID,
+            "p_lease_seconds": settings.job_lease_seconds,
+        }).execute()
+
+    async def finish_job(self, job_id: str, **kwargs):
+        """
+        Record a running job's outcome; a job cancelled or failed as orphaned
+        meanwhile is left alone.
+        """
+        return self.client.table("jobs").update({
+            "progress": 100,
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+            "lease_owner": None,
+            "lease_expires_at": None,
+            **kwargs,
+        }).eq("id", job_id).eq("status", "running").eq("lease_owner", API_WORKER_ID).execute()
+
+    async def fail_orphaned_jobs(self, job_types: list[str]):
+        """Fail jobs of ``job_types`` left queued or running by a stopped process."""
+        return self.client.rpc("fail_orphaned_jobs", {
+            "p_job_types": job_types,
+            "p_queued_grace_seconds": settings.job_queued_grace_seconds,
+        }).execute()
+
     async def update_job(self, job_id: str, **kwargs):
         return self.client.table("jobs").update(kwargs).eq("id", job_id).execute()
 
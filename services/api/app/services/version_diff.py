@@ -0,0 +1,254 @@
+import asyncio
+import math
+from contextlib import ExitStack
+from typing import Any
+
+import numpy as np
+import polars as pl
+
+from app.config import settings
+from app.services.dataset_reader import scan_dataset_file, version_source
+from app.services.storage_reader import open_dataset_file
+
+# Bump when the diff output changes; cached diffs with another version are recomputed.
+DIFF_VERSION = 1
+
+STAT_FIELDS = (
+    "count", "missing_percentage", "unique_count", "unique_percentage",
+    "mean", "std", "min", "max", "median", "q1", "q3", "p5", "p95",
+)
+# Conventional PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 major shift.
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+PSI_BINS = 10
+_EPSILON = 1e-4
+_HASH_SEED = 0x5EED
+
+
+def diff_schema(base: dict[str, Any], target: dict[str, Any]) -> dict:
+    """Added, removed and retyped columns between two ``{name: dtype}`` schemas."""
+    return {
+        "added": [{"name": name, "dtype": str(dtype)} for name, dtype in target.items() if name not in base],
+        "removed": [{"name": name, "dtype": str(dtype)} for name, dtype in base.items() if name not in target],
+        "type_changed": [
+            {"name": name, "from": str(base[name]), "to": str(dtype)}
+            for name, dtype in target.items()
+            if name in base and str(base[name]) != str(dtype)
+        ],
+        "reordered": [name for name in base if name in target] != [name for name in target if name in base],
+    }
+
+
+def _shift(psi: float | None) -> str | None:
+    if psi is None:
+        return None
+    if psi >= PSI_MAJOR:
+        return "major"
+    if psi >= PSI_MODERATE:
+        return "moderate"
+    return "none"
+
+
+def _psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    expected = np.clip(expected, _EPSILON, None)
+    actual = np.clip(actual, _EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _histogram_cdf(histogram: dict) -> tuple[np.ndarray, np.ndarray] | None:
+    edges = np.asarray(histogram.get("bins") or [], dtype=float)
+    counts = np.asarray(histogram.get("counts") or [], dtype=float)
+    if len(edges) != len(counts) + 1 or counts.sum() <= 0:
+        return None
+    return edges, np.concatenate([[0.0], np.cumsum(counts) / counts.sum()])
+
+
+def histogram_drift(base: dict, target: dict) -> dict | None:
+    """
+    PSI and KS between two stored histograms with different bin edges. Mass is
+    taken as uniform within each bin, so each CDF is piecewise linear: PSI uses
+    deciles of the base distribution, and KS is exact at the union of the edges.
+    """
+    base_cdf = _histogram_cdf(base)
+    target_cdf = _histogram_cdf(target)
+    if base_cdf is None or target_cdf is None:
+        return None
+    base_edges, base_mass = base_cdf
+    target_edges, target_mass = target_cdf
+
+    knots = np.union1d(base_edges, target_edges)
+    ks = np.max(np.abs(
+        np.interp(knots, base_edges, base_mass, left=0.0, right=1.0)
+        - np.interp(knots, target_edges, target_mass, left=0.0, right=1.0)
+    ))
+
+    # Interior decile edges of the base distribution; the outer bins are open-ended.
+    cuts = np.interp(np.linspace(0, 1, PSI_BINS + 1)[1:-1], base_mass, base_edges)
+    base_bins = np.diff(np.concatenate([[0.0], np.interp(cuts, base_edges, base_mass, left=0.0, right=1.0), [1.0]]))
+    target_bins = np.diff(np.concatenate([[0.0], np.interp(cuts, target_edges, target_mass, left=0.0, right=1.0), [1.0]]))
+    psi = _psi(base_bins, target_bins)
+    return {"basis": "histogram", "psi": psi, "ks": float(ks), "shift": _shift(psi)}
+
+
+def top_values_drift(base: list[dict], target: list[dict]) -> dict | None:
+    """PSI over the union of two top-value lists, with everything else pooled as one category."""
+    if not base or not target:
+        return None
+    base_share = {item["value"]: item["percentage"] / 100 for item in base}
+    target_share = {item["value"]: item["percentage"] / 100 for item in target}
+    values = list(dict.fromkeys([*base_share, *target_share]))
+    expected = np.array([base_share.get(value, 0.0) for value in values])
+    actual = np.array([target_share.get(value, 0.0) for value in values])
+    expected = np.append(expected, max(0.0, 1 - expected.sum()))
+    actual = np.append(actual, max(0.0, 1 - actual.sum()))
+    psi = _psi(expected, actual)
+    return {"basis": "top_values", "psi": psi, "ks": None, "shift": _shift(psi)}
+
+
+def diff_column_stats(base_columns: list[dict], target_columns: list[dict]) -> list[dict]:
+    """Per-column stat deltas and distribution shift for columns in both profiles."""
+    base_by_name = {column["name"]: column for column in base_columns}
+    diffs = []
+    for target in target_columns:
+        base = base_by_name.get(target["name"])
+        if base is None:
+            continue
+        deltas = {}
+        for field in STAT_FIELDS:
+            before, after = base.get(field), target.get(field)
+            if before is None and after is None:
+                continue
+            delta = None
+            if isinstance(before, (int, float)) and isinstance(after, (int, float)):
+                delta = after - before
+                if not math.isfinite(delta):
+                    delta = None
+            deltas[field] = {"base": before, "target": after, "delta": delta}
+        drift = None
+        if base.get("histogram") and target.get("histogram"):
+            drift = histogram_drift(base["histogram"], target["histogram"])
+        elif base.get("top_values") and target.get("top_values"):
+            drift = top_values_drift(base["top_values"], target["top_values"])
+        diffs.append({
+            "name": target["name"],
+            "inferred_type": {"base": base.get("inferred_type"), "target": target.get("inferred_type")},
+            "deltas": deltas,
+            "drift": drift,
+        })
+    return diffs
+
+
+def _row_hashes(frame: pl.LazyFrame, columns: dict[str, pl.Expr], key: list[str] | None) -> pl.LazyFrame:
+    exprs = [pl.struct(list(columns.values())).hash(_HASH_SEED).alias("row_hash")]
+    if key:
+        exprs.append(pl.struct([columns[name] for name in key]).hash(_HASH_SEED).alias("key_hash"))
+    return frame.select(exprs)
+
+
+def diff_rows(base: pl.LazyFrame, target: pl.LazyFrame, key: list[str] | None = None) -> dict:
+    """
+    Count added, removed and (with ``key``) changed rows.
+
+    Rows are compared over the columns both versions share, as 64-bit hashes
+    computed while the files stream through: only the hash columns are
+    aggregated and joined, never the rows. Without a key the versions are
+    compared as multisets of rows, so an edited row shows up as one removed
+    and one added. Columns whose type changed are compared as text.
+    """
+    base_schema, target_schema = base.schema, target.schema
+    common = [name for name in target_schema if name in base_schema]
+    missing_key = [name for name in key or [] if name not in common]
+    if missing_key:
+        raise ValueError(f"Key columns missing from one of the versions: {', '.join(missing_key)}")
+
+    def columns() -> dict[str, pl.Expr]:
+        return {
+            name: pl.col(name).cast(pl.Utf8) if base_schema[name] != target_schema[name] else pl.col(name)
+            for name in common
+        }
+
+    if not common:
+        counts = pl.collect_all(
+            [base.select(pl.count()), target.select(pl.count())], streaming=True, comm_subplan_elim=False
+        )
+        removed, added = (frame.item() for frame in counts)
+        return {"compared_columns": [], "key": key, "added": added, "removed": removed, "changed": None, "unchanged": 0}
+
+    base_hashes = _row_hashes(base, columns(), key)
+    target_hashes = _row_hashes(target, columns(), key)
+    if not key:
+        joined = base_hashes.group_by("row_hash").agg(pl.count().cast(pl.Int64).alias("base")).join(
+            target_hashes.group_by("row_hash").agg(pl.count().cast(pl.Int64).alias("target")),
+            on="row_hash",
+            how="outer_coalesce",
+        ).select(pl.col("base").fill_null(0), pl.col("target").fill_null(0))
+        summary = joined.select(
+            (pl.col("target") - pl.col("base")).clip_min(0).sum().alias("added"),
+            (pl.col("base") - pl.col("target")).clip_min(0).sum().alias("removed"),
+            pl.min_horizontal("base", "target").sum().alias("unchanged"),
+        ).collect(streaming=True, comm_subplan_elim=False).row(0, named=True)
+        return {"compared_columns": common, "key": None, **summary, "changed": None}
+
+    def per_key(frame: pl.LazyFrame, side: str) -> pl.LazyFrame:
+        # A (wrapping) sum of row hashes fingerprints every row under a key,
+        # whatever their order.
+        return frame.group_by("key_hash").agg(
+            pl.count().cast(pl.Int64).alias(f"{side}_rows"),
+            pl.col("row_hash").sum().alias(f"{side}_fingerprint"),
+        )
+
+    joined = per_key(base_hashes, "base").join(per_key(target_hashes, "target"), on="key_hash", how="outer_coalesce")
+    matched = pl.col("base_rows").is_not_null() & pl.col("target_rows").is_not_null()
+    same = pl.col("base_fingerprint") == pl.col("target_fingerprint")
+    summary = joined.select(
+        pl.col("target_rows").filter(pl.col("base_rows").is_null()).sum().alias("added"),
+        pl.col("base_rows").filter(pl.col("target_rows").is_null()).sum().alias("removed"),
+        (matched & ~same).sum().alias("changed"),
+        (matched & same).sum().alias("unchanged"),
+        ((pl.col("base_rows") > 1) | (pl.col("target_rows") > 1)).sum().alias("duplicate_keys"),
+    ).collect(streaming=True, comm_subplan_elim=False).row(0, named=True)
+    return {"compared_columns": common, "key": key, **summary}
+
+
+def _diff_files(base_version: dict, target_version: dict, key: list[str] | None) -> tuple[dict, dict]:
+    sources = [version_source(base_version), version_source(target_version)]
+    if None in sources:
+        raise ValueError("Version has no stored file")
+    with ExitStack() as stack:
+        frames = [
+            scan_dataset_file(stack.enter_context(open_dataset_file(settings.supabase_datasets_bucket, path)), file_type)
+            for path, file_type in sources
+        ]
+        schema = diff_schema(frames[0].schema, frames[1].schema)
+        return schema, diff_rows(frames[0], frames[1], key)
+
+
+async def compute_version_diff(
+    base_version: dict,
+    target_version: dict,
+    base_profile: dict,
+    target_profile: dict,
+    key: list[str] | None = None,
+) -> dict:
+    """
+    Diff two profiled versions: schema and row counts from the files (the
+    canonical Parquet copies when they exist), column deltas and PSI/KS from
+    the stored profile statistics.
+    """
+    schema, rows = await asyncio.to_thread(_diff_files, base_version, target_version, key)
+    base_columns = base_profile.get("column_stats")
+    target_columns = target_profile.get("column_stats")
+    return {
+        "base_version_id": base_version["id"],
+        "target_version_id": target_version["id"],
+        "row_count": {"base": base_version.get("row_count"), "target": target_version.get("row_count")},
+        "schema": schema,
+        "rows": rows,
+        # None until both profiles carry column statistics (profiler version 2+).
+        "columns": (
+            diff_column_stats(base_columns, target_columns)
+            if base_columns is not None and target_columns is not None
+            else None
+        ),
+        "diff_version": DIFF_VERSION,
+    }
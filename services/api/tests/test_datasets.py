@@ -1,3 +1,11 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import random
+
+
 class DummyResult:
     def __init__(self, data):
         self.data = data
@@ -23,3 +31,645 @@ def test_list_versions_maps_fields(client, monkeypatch):
     payload = response.json()
     assert payload["versions"][0]["row_count_est"] == 10
     assert payload["versions"][0]["column_count_est"] == 2
+
+
+def test_infer_file_type_sees_through_compression():
+    from app.services.file_handler import infer_compression, infer_file_type
+
+    assert infer_compression("sales.csv.gz") == "gzip"
+    assert infer_compression("sales.csv") is None
+    assert infer_file_type("sales.csv.gz", "application/gzip") == "csv"
+    assert infer_file_type("events.jsonl.zst", None) == "json"
+    assert infer_file_type("archive.zip", "application/zip") is None
+
+
+def test_eager_and_lazy_reads_type_csv_alike(client, tmp_path):
+    from app.services.dataset_reader import read_dataset_file, scan_dataset_file
+
+    path = tmp_path / "orders.csv"
+    path.write_text("id,ordered_on,amount\n1,2024-01-05,9.5\n2,2024-02-11,oops\n3,2024-03-20,4.0\n")
+
+    eager = read_dataset_file(str(path), "csv")
+    lazy = scan_dataset_file(str(path), "csv").collect()
+
+    assert eager.schema == lazy.schema
+    assert str(eager.schema["ordered_on"]) == "Date"
+    assert eager["amount"].to_list() == lazy["amount"].to_list()
+
+
+def test_upload_returns_preliminary_schema(client, monkeypatch):
+    from app.main import app
+    from app.middleware.auth import AuthenticatedUser, require_auth
+    from app.services.supabase import supabase_service
+
+    class FakeTable:
+        def update(self, values):
+            return self
+
+        def eq(self, column, value):
+            return self
+
+        def execute(self):
+            return DummyResult([])
+
+    class FakeClient:
+        def table(self, name):
+            return FakeTable()
+
+    created = {}
+
+    async def fake_get_dataset(dataset_id):
+        return DummyResult({"id": dataset_id, "project": {"user_id": "user-1"}})
+
+    async def fake_create_dataset_version(dataset_id, storage_path, **kwargs):
+        created.update(kwargs)
+        return DummyResult([{"id": "v1"}])
+
+    async def fake_create_job(**kwargs):
+        return DummyResult([{"id": "job-1"}])
+
+    async def fake_update_dataset_version(version_id, **kwargs):
+        return DummyResult([])
+
+    monkeypatch.setattr(supabase_service, "client", FakeClient())
+    monkeypatch.setattr(supabase_service, "get_dataset", fake_get_dataset)
+    from app.routers import datasets as datasets_router
+
+    uploaded = []
+
+    async def fake_upload_stream(bucket, path, chunks, size, content_type):
+        uploaded.append(b"".join([chunk async for chunk in chunks]))
+
+    monkeypatch.setattr(datasets_router, "upload_stream", fake_upload_stream)
+    monkeypatch.setattr(datasets_router.settings, "chunked_storage_enabled", False)
+    monkeypatch.setattr(supabase_service, "create_dataset_version", fake_create_dataset_version)
+    monkeypatch.setattr(supabase_service, "create_job", fake_create_job)
+    monkeypatch.setattr(supabase_service, "update_dataset_version", fake_update_dataset_version)
+    app.dependency_overrides[require_auth] = lambda: AuthenticatedUser("user-1")
+    try:
+        content = "id;price;day\n1;2.5;2024-01-01\n2;3.0;2024-01-02\n"
+        response = client.post(
+            "/api/datasets/dataset-1/upload",
+            files={"file": ("prices.csv", content, "text/csv")},
+        )
+    finally:
+        app.dependency_overrides.pop(require_auth, None)
+
+    assert response.status_code == 200
+    schema = response.json()["preliminary_schema"]
+    assert schema["delimiter"] == ";"
+    assert [(c["name"], c["inferred_type"]) for c in schema["columns"]] == [
+        ("id", "numeric"),
+        ("price", "numeric"),
+        ("day", "datetime"),
+    ]
+    assert schema["estimated_row_count"] == 2
+    assert created["preliminary_schema"] == schema
+    assert uploaded == [content.encode()]
+    assert created["content_sha256"] == hashlib.sha256(content.encode()).hexdigest()
+    assert created["file_size_bytes"] == len(content)
+
+
+def test_resumable_upload_resumes_and_completes(client, monkeypatch):
+    from app.main import app
+    from app.middleware.auth import AuthenticatedUser, require_auth
+    from app.routers import datasets as datasets_router
+    from app.services.supabase import supabase_service
+
+    content = b"a,b\n1,2\n3,4\n5,6\n"
+    stored = bytearray()
+    sessions = {}
+
+    class FakeTable:
+        def update(self, values):
+            return self
+
+        def eq(self, column, value):
+            return self
+
+        def execute(self):
+            return DummyResult([])
+
+    class FakeClient:
+        def table(self, name):
+            return FakeTable()
+
+    async def fake_get_dataset(dataset_id):
+        return DummyResult({"id": dataset_id, "project": {"user_id": "user-1"}})
+
+    async def fake_create_session(**kwargs):
+        sessions["u1"] = {"id": "u1", "received_bytes": 0, "preliminary_schema": None, **kwargs}
+        return DummyResult([sessions["u1"]])
+
+    async def fake_get_session(upload_id):
+        return DummyResult(dict(sessions[upload_id]))
+
+    async def fake_update_session(upload_id, **kwargs):
+        sessions[upload_id].update(kwargs)
+        return DummyResult([])
+
+    async def fake_create_upload(bucket, path, size, content_type):
+        return "https://storage.example/upload/resumable/abc"
+
+    async def fake_offset(upload_url):
+        return len(stored)
+
+    async def fake_append(upload_url, offset, chunk):
+        assert offset == len(stored)
+        stored.extend(chunk)
+        return len(stored)
+
+    versions = []
+
+    async def fake_create_dataset_version(dataset_id, storage_path, **kwargs):
+        versions.append({"dataset_id": dataset_id, "storage_path": storage_path, **kwargs})
+        return DummyResult([{"id": "v1"}])
+
+    async def fake_create_job(**kwargs):
+        return DummyResult([{"id": "job-1"}])
+
+    async def fake_update_dataset_version(version_id, **kwargs):
+        return DummyResult([])
+
+    monkeypatch.setattr(datasets_router, "RESUMABLE_CHUNK_SIZE", 8)
+    monkeypatch.setattr(datasets_router, "create_resumable_upload", fake_create_upload)
+    monkeypatch.setattr(datasets_router, "resumable_offset", fake_offset)
+    monkeypatch.setattr(datasets_router, "append_resumable_chunk", fake_append)
+    monkeypatch.setattr(supabase_service, "client", FakeClient())
+    monkeypatch.setattr(supabase_service, "get_dataset", fake_get_dataset)
+    monkeypatch.setattr(supabase_service, "create_upload_session", fake_create_session)
+    monkeypatch.setattr(supabase_service, "get_upload_session", fake_get_session)
+    monkeypatch.setattr(supabase_service, "update_upload_session", fake_update_session)
+    monkeypatch.setattr(supabase_service, "create_dataset_version", fake_create_dataset_version)
+    monkeypatch.setattr(supabase_service, "create_job", fake_create_job)
+    monkeypatch.setattr(supabase_service, "update_dataset_version", fake_update_dataset_version)
+    app.dependency_overrides[require_auth] = lambda: AuthenticatedUser("user-1")
+    try:
+        created = client.post(
+            "/api/datasets/dataset-1/uploads",
+            json={"filename": "pairs.csv", "size": len(content), "content_type": "text/csv"},
+        )
+        assert created.status_code == 201
+        assert created.json()["chunk_size"] == 8
+
+        first = client.patch("/api/datasets/uploads/u1", content=content[:8], headers={"Upload-Offset": "0"})
+        assert first.json() == {"offset": 8, "complete": False}
+
+        # The client lost track of progress: a stale offset is rejected, HEAD reports where to resume.
+        stale = client.patch("/api/datasets/uploads/u1", content=content[:8], headers={"Upload-Offset": "0"})
+        assert stale.status_code == 409
+        head = client.head("/api/datasets/uploads/u1")
+        resume_at = int(head.headers["Upload-Offset"])
+        assert resume_at == 8
+
+        done = None
+        while resume_at < len(content):
+            chunk = content[resume_at:resume_at + 8]
+            digest = base64.b64encode(hashlib.sha256(chunk).digest()).decode()
+            done = client.patch(
+                "/api/datasets/uploads/u1",
+                content=chunk,
+                headers={"Upload-Offset": str(resume_at), "Upload-Checksum": f"sha256 {digest}"},
+            )
+            resume_at = done.json()["offset"]
+    finally:
+        app.dependency_overrides.pop(require_auth, None)
+
+    assert bytes(stored) == content
+    assert done.json()["complete"] is True
+    assert done.json()["dataset_version_id"] == "v1"
+    assert sessions["u1"]["status"] == "completed"
+    assert [c["name"] for c in sessions["u1"]["preliminary_schema"]["columns"]] == ["a", "b"]
+    # Registered once, when the last chunk lands, from the session's stored object.
+    assert len(versions) == 1
+    assert versions[0]["dataset_id"] == "dataset-1"
+    assert versions[0]["storage_path"] == sessions["u1"]["storage_path"]
+    assert versions[0]["file_size_bytes"] == len(content)
+    assert versions[0]["content_sha256"] is None
+    assert versions[0]["chunk_count"] is None
+
+
+def test_chunked_storage_only_uploads_changed_chunks(monkeypatch):
+    from app.services import chunk_store
+    from app.services.storage_reader import chunk_storage_path
+    from app.services.supabase import supabase_service
+
+    objects = {}
+    recorded = {}
+
+    async def fake_upload_object(bucket, path, data, content_type, upsert=False):
+        objects[path] = data
+
+    async def fake_get_dataset_chunks(user_id, hashes):
+        return DummyResult([{"sha256": h, "size": recorded[h]} for h in hashes if h in recorded])
+
+    async def fake_record_dataset_chunks(user_id, chunks):
+        recorded.update((chunk["sha256"], chunk["size"]) for chunk in chunks)
+        return DummyResult([])
+
+    monkeypatch.setattr(chunk_store, "upload_object", fake_upload_object)
+    monkeypatch.setattr(supabase_service, "get_dataset_chunks", fake_get_dataset_chunks)
+    monkeypatch.setattr(supabase_service, "record_dataset_chunks", fake_record_dataset_chunks)
+
+    rng = random.Random(7)
+    original = "".join(f"{i},{rng.random()}\n" for i in range(200_000)).encode()
+    # One row inserted in the middle of the file.
+    middle = original.index(b"\n", len(original) // 2) + 1
+    refreshed = original[:middle] + b"-1,0.5\n" + original[middle:]
+
+    first = asyncio.run(chunk_store.store_chunked("datasets", "user-1", "user-1/d/v1/a.csv", io.BytesIO(original)))
+    second = asyncio.run(chunk_store.store_chunked("datasets", "user-1", "user-1/d/v2/a.csv", io.BytesIO(refreshed)))
+
+    assert first["chunk_count"] > 2
+    assert first["stored_bytes"] == len(original)
+    assert second["size"] == len(refreshed)
+    assert 0 < second["stored_bytes"] < len(refreshed) / 2
+
+    manifest = json.loads(objects["user-1/d/v2/a.csv"])
+    rebuilt = b"".join(objects[chunk_storage_path("user-1", chunk["sha256"])] for chunk in manifest["chunks"])
+    assert rebuilt == refreshed
+    assert manifest["sha256"] == hashlib.sha256(refreshed).hexdigest()
+
+
+def test_version_diff_counts_rows_and_caches(client, monkeypatch, tmp_path):
+    from contextlib import contextmanager
+
+    import polars as pl
+
+    from app.services import version_diff
+    from app.services.supabase import supabase_service
+
+    base = pl.DataFrame({"id": [1, 2, 3, 4], "price": [1.0, 2.0, 3.0, 4.0]})
+    target = pl.DataFrame({"id": [2, 3, 4, 5], "price": [2.0, 30.0, 4.0, 5.0], "note": ["a", "b", "c", "d"]})
+    base.write_parquet(tmp_path / "v1.parquet")
+    target.write_csv(tmp_path / "v2.csv")
+
+    @contextmanager
+    def fake_open_dataset_file(bucket, path):
+        yield str(tmp_path / path)
+
+    versions = {
+        "v1": {
+            "id": "v1",
+            "dataset_id": "d1",
+            "parquet_path": "v1.parquet",
+            "row_count": 4,
+            "dataset": {"project": {"is_demo": True}},
+        },
+        "v2": {
+            "id": "v2",
+            "dataset_id": "d1",
+            "storage_path": "v2.csv",
+            "row_count": 4,
+            "dataset": {"file_type": "csv", "project": {"is_demo": True}},
+        },
+        "other": {"id": "other", "dataset_id": "d2", "parquet_path": "v1.parquet", "dataset": {"project": {"is_demo": True}}},
+    }
+    histogram = {"bins": [0.0, 1.0, 2.0], "counts": [5, 5]}
+    profiles = [
+        {"version_id": "v1", "computed_at": "t1", "column_stats": [{"name": "price", "mean": 2.5, "histogram": histogram}]},
+        {"version_id": "v2", "computed_at": "t2", "column_stats": [{"name": "price", "mean": 10.25, "histogram": histogram}]},
+    ]
+    saved = []
+
+    async def fake_get_dataset_version(version_id):
+        return DummyResult(versions[version_id])
+
+    async def fake_get_profiles(version_ids):
+        return DummyResult(profiles)
+
+    async def fake_get_version_diff(base_version_id, target_version_id, key_columns):
+        return DummyResult(saved[-1:])
+
+    async def fake_save_version_diff(**row):
+        saved.append(row)
+        return DummyResult([row])
+
+    monkeypatch.setattr(version_diff, "open_dataset_file", fake_open_dataset_file)
+    monkeypatch.setattr(supabase_service, "get_dataset_version", fake_get_dataset_version)
+    monkeypatch.setattr(supabase_service, "get_profiles", fake_get_profiles)
+    monkeypatch.setattr(supabase_service, "get_version_diff", fake_get_version_diff)
+    monkeypatch.setattr(supabase_service, "save_version_diff", fake_save_version_diff)
+
+    response = client.get("/api/datasets/versions/v1/diff/v2", params={"key": "id"})
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["cached"] is False
+    diff = payload["diff"]
+    assert diff["schema"]["added"] == [{"name": "note", "dtype": "String"}]
+    assert diff["rows"]["compared_columns"] == ["id", "price"]
+    assert {k: diff["rows"][k] for k in ["added", "removed", "changed", "unchanged"]} == {
+        "added": 1,
+        "removed": 1,
+        "changed": 1,
+        "unchanged": 2,
+    }
+    assert diff["columns"][0]["deltas"]["mean"]["delta"] == 7.75
+    assert diff["columns"][0]["drift"]["psi"] == 0
+    assert saved[0]["key_columns"] == '["id"]'
+
+    again = client.get("/api/datasets/versions/v1/diff/v2", params={"key": "id"})
+    assert again.json() == {"diff": diff, "cached": True}
+
+    unrelated = client.get("/api/datasets/versions/v1/diff/other")
+    assert unrelated.status_code == 400
+    assert len(saved) == 1
+
+
+def test_browse_rows_filters_sorts_and_pages(client, monkeypatch, tmp_path):
+    from contextlib import contextmanager
+
+    import polars as pl
+
+    from app.services import row_browser
+    from app.services.supabase import supabase_service
+
+    pl.DataFrame({
+        "city": ["Oslo", "Lima", "Pune", "Kyiv", "Lima", None],
+        "sales": [5.0, 3.0, float("nan"), 9.0, 7.0, 1.0],
+    }).write_csv(tmp_path / "rows.csv")
+
+    @contextmanager
+    def fake_open_dataset_file(bucket, path):
+        yield str(tmp_path / path)
+
+    async def fake_get_dataset_version(version_id):
+        return DummyResult({
+            "id": version_id,
+            "storage_path": "rows.csv",
+            "dataset": {"file_type": "csv", "project": {"is_demo": True}},
+        })
+
+    monkeypatch.setattr(row_browser, "open_dataset_file", fake_open_dataset_file)
+    monkeypatch.setattr(row_browser, "get_dataset_cache", lambda: None)
+    monkeypatch.setattr(supabase_service, "get_dataset_version", fake_get_dataset_version)
+
+    query = {
+        "filters": [{"column": "city", "op": "not_null"}],
+        "sort": [{"column": "sales", "descending": True}],
+        "columns": ["city", "sales"],
+        "limit": 2,
+    }
+    first = client.post("/api/datasets/versions/browse-v1/rows", json=query)
+    assert first.status_code == 200
+    page = first.json()
+    assert page["total"] == 5
+    assert page["rows"] == [{"city": "Pune", "sales": None}, {"city": "Kyiv", "sales": 9.0}]
+    assert page["next_offset"] == 2
+
+    last = client.post("/api/datasets/versions/browse-v1/rows", json={**query, "offset": 4}).json()
+    assert last["rows"] == [{"city": "Lima", "sales": 3.0}]
+    assert last["next_offset"] is None
+
+    lima = client.post(
+        "/api/datasets/versions/browse-v1/rows",
+        json={"filters": [{"column": "city", "op": "in", "value": ["Lima"]}, {"column": "sales", "op": "gt", "value": 4}]},
+    ).json()
+    assert lima["rows"] == [{"city": "Lima", "sales": 7.0}]
+
+    unknown = client.post("/api/datasets/versions/browse-v1/rows", json={"sort": [{"column": "nope"}]})
+    assert unknown.status_code == 400
+
+
+def test_export_streams_filtered_projection_and_runs_jobs(client, monkeypatch, tmp_path):
+    from contextlib import contextmanager
+
+    import polars as pl
+
+    from app.middleware.auth import AuthenticatedUser, require_auth
+    from app.main import app
+    from app.routers import datasets as datasets_router
+    from app.services import dataset_export
+    from app.services.supabase import supabase_service
+
+    pl.DataFrame({"id": list(range(1000)), "group": ["a", "b"] * 500, "value": [i * 0.5 for i in range(1000)]}).write_parquet(
+        tmp_path / "export.parquet"
+    )
+    version = {
+        "id": "export-v1",
+        "version_number": 3,
+        "parquet_path": "export.parquet",
+        "dataset": {"name": "Sales data", "project": {"is_demo": True}},
+    }
+
+    @contextmanager
+    def fake_open_dataset_file(bucket, path):
+        yield str(tmp_path / path)
+
+    async def fake_get_dataset_version(version_id):
+        return DummyResult(version)
+
+    monkeypatch.setattr(dataset_export, "open_dataset_file", fake_open_dataset_file)
+    monkeypatch.setattr(supabase_service, "get_dataset_version", fake_get_dataset_version)
+
+    body = {"format": "parquet", "columns": ["id", "value"], "filters": [{"column": "group", "op": "eq", "value": "b"}]}
+    response = client.post("/api/datasets/versions/export-v1/export", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="Sales_data-v3.parquet"'
+    exported = pl.read_parquet(io.BytesIO(response.content))
+    assert exported.columns == ["id", "value"]
+    assert exported.height == 500 and exported["id"][0] == 1
+
+    csv = client.post("/api/datasets/versions/export-v1/export", json={"columns": ["id"], "filters": [{"column": "id", "op": "lt", "value": 3}]})
+    assert csv.text.splitlines() == ["id", "0", "1", "2"]
+
+    bad = client.post("/api/datasets/versions/export-v1/export", json={"columns": ["nope"]})
+    assert bad.status_code == 400
+
+    jobs = {}
+    uploads = {}
+
+    async def fake_create_job(user_id, job_type, payload, priority=50):
+        jobs["export-job"] = {"id": "export-job", "user_id": user_id, "job_type": job_type, "status": "queued", "payload": payload}
+        return DummyResult([dict(jobs["export-job"])])
+
+    async def fake_claim_job(job_id):
+        jobs[job_id]["status"] = "running"
+        return DummyResult([jobs[job_id]])
+
+    async def fake_finish_job(job_id, **kwargs):
+        jobs[job_id].update(kwargs)
+        return DummyResult([jobs[job_id]])
+
+    async def fake_get_job(job_id):
+        return DummyResult(jobs.get(job_id))
+
+    async def fake_upload_stream(bucket, path, chunks, size, content_type):
+        uploads[path] = b"".join([chunk async for chunk in chunks])
+        assert len(uploads[path]) == size
+
+    monkeypatch.setattr(supabase_service, "create_job", fake_create_job)
+    monkeypatch.setattr(supabase_service, "claim_job", fake_claim_job)
+    monkeypatch.setattr(supabase_service, "finish_job", fake_finish_job)
+    monkeypatch.setattr(supabase_service, "get_job", fake_get_job)
+    monkeypatch.setattr(dataset_export, "upload_stream", fake_upload_stream)
+    monkeypatch.setattr(datasets_router, "iter_object", lambda bucket, path: iter([uploads[path]]))
+    app.dependency_overrides[require_auth] = lambda: AuthenticatedUser(user_id="user-1", email=None, role="authenticated")
+    try:
+        created = client.post("/api/datasets/versions/export-v1/export-jobs", json={**body, "format": "arrow"})
+        assert created.status_code == 202
+        job = jobs["export-job"]
+        assert job["status"] == "completed"
+        assert job["result"]["storage_path"] == "user-1/exports/export-job.arrow"
+
+        download = client.get("/api/datasets/exports/export-job")
+        assert download.status_code == 200
+        assert pl.read_ipc(io.BytesIO(download.content)).equals(exported)
+    finally:
+        app.dependency_overrides.pop(require_auth, None)
+
+
+def test_export_falls_back_only_before_the_sink_writes(client, monkeypatch, tmp_path):
+    import polars as pl
+    import pytest
+
+    from app.services.dataset_export import write_export
+
+    plan = pl.LazyFrame({"id": [1, 2, 3]})
+    partial = []
+
+    def failing_sink(self, path, *args, **kwargs):
+        with open(path, "ab") as handle:
+            handle.write(b"id\n1\n" if partial else b"")
+        raise pl.InvalidOperationError("sink_csv not supported for this plan")
+
+    monkeypatch.setattr(pl.LazyFrame, "sink_csv", failing_sink)
+
+    unstarted = tmp_path / "unstarted.csv"
+    unstarted.write_bytes(b"")
+    write_export(plan, "csv", str(unstarted))
+    assert pl.read_csv(unstarted)["id"].to_list() == [1, 2, 3]
+
+    partial.append(True)
+    started = tmp_path / "started.csv"
+    started.write_bytes(b"")
+    with pytest.raises(pl.InvalidOperationError):
+        write_export(plan, "csv", str(started))
+    assert started.read_bytes() == b"id\n1\n"
+
+
+def test_pipeline_runs_create_versions_and_reuse_cached_steps(client, monkeypatch, tmp_path):
+    from contextlib import contextmanager
+
+    import polars as pl
+
+    from app.middleware.auth import AuthenticatedUser, require_auth
+    from app.main import app
+    from app.services import pipeline as pipeline_service
+    from app.services.dataset_cache import DatasetCache
+    from app.services.supabase import supabase_service
+
+    (tmp_path / "raw.csv").write_text("id,score,name\n1,10,a\n2,,b\n2,,b\n3,30,c\n4,40,\n")
+    dataset = {
+        "id": "ds-1",
+        "file_type": "csv",
+        "project": {"user_id": "user-1"},
+        "dataset_versions": [{"id": "raw-v1", "version_number": 1}],
+    }
+    versions = {"raw-v1": {"id": "raw-v1", "dataset_id": "ds-1", "storage_path": "raw.csv", "dataset": dataset}}
+    pipelines, jobs, uploads = {}, {}, {}
+    cache = DatasetCache(str(tmp_path / "cache"), 1 << 30)
+
+    @contextmanager
+    def fake_open_dataset_file(bucket, path):
+        yield str(tmp_path / path)
+
+    async def fake_get_dataset(dataset_id):
+        return DummyResult(dataset if dataset_id == "ds-1" else None)
+
+    async def fake_get_dataset_version(version_id):
+        return DummyResult(versions.get(version_id))
+
+    async def fake_create_pipeline(dataset_id, name, steps):
+        pipelines["pipe-1"] = {"id": "pipe-1", "dataset_id": dataset_id, "name": name, "steps": steps}
+        return DummyResult([pipelines["pipe-1"]])
+
+    async def fake_get_pipeline(pipeline_id):
+        return DummyResult(pipelines.get(pipeline_id))
+
+    async def fake_update_pipeline(pipeline_id, **kwargs):
+        pipelines[pipeline_id].update(kwargs)
+        return DummyResult([pipelines[pipeline_id]])
+
+    async def fake_create_job(user_id, job_type, payload, priority=50):
+        job_id = f"job-{len(jobs) + 1}"
+        jobs[job_id] = {"id": job_id, "job_type": job_type, "status": "queued", "payload": payload}
+        return DummyResult([dict(jobs[job_id])])
+
+    async def fake_claim_job(job_id):
+        jobs[job_id]["status"] = "running"
+        return DummyResult([jobs[job_id]])
+
+    async def fake_finish_job(job_id, **kwargs):
+        jobs[job_id].update(kwargs)
+        return DummyResult([jobs[job_id]])
+
+    async def fake_create_dataset_version(dataset_id, storage_path, **kwargs):
+        version_id = f"derived-v{len(versions) + 1}"
+        versions[version_id] = {"id": version_id, "dataset_id": dataset_id, "storage_path": storage_path, **kwargs}
+        return DummyResult([versions[version_id]])
+
+    async def fake_update_dataset_version(version_id, **kwargs):
+        versions[version_id].update(kwargs)
+        return DummyResult([versions[version_id]])
+
+    async def fake_upload_stream(bucket, path, chunks, size, content_type):
+        uploads[path] = b"".join([chunk async for chunk in chunks])
+
+    monkeypatch.setattr(pipeline_service, "open_dataset_file", fake_open_dataset_file)
+    monkeypatch.setattr(pipeline_service, "get_dataset_cache", lambda: cache)
+    monkeypatch.setattr(pipeline_service, "upload_stream", fake_upload_stream)
+    monkeypatch.setattr(supabase_service, "get_dataset", fake_get_dataset)
+    monkeypatch.setattr(supabase_service, "get_dataset_version", fake_get_dataset_version)
+    monkeypatch.setattr(supabase_service, "create_pipeline", fake_create_pipeline)
+    monkeypatch.setattr(supabase_service, "get_pipeline", fake_get_pipeline)
+    monkeypatch.setattr(supabase_service, "update_pipeline", fake_update_pipeline)
+    monkeypatch.setattr(supabase_service, "create_job", fake_create_job)
+    monkeypatch.setattr(supabase_service, "claim_job", fake_claim_job)
+    monkeypatch.setattr(supabase_service, "finish_job", fake_finish_job)
+    monkeypatch.setattr(supabase_service, "create_dataset_version", fake_create_dataset_version)
+    monkeypatch.setattr(supabase_service, "update_dataset_version", fake_update_dataset_version)
+    app.dependency_overrides[require_auth] = lambda: AuthenticatedUser(user_id="user-1", email=None, role="authenticated")
+    try:
+        bad = client.post("/api/datasets/ds-1/pipelines", json={"name": "clean", "steps": [{"op": "explode"}]})
+        assert bad.status_code == 400
+
+        steps = [
+            {"op": "dedupe"},
+            {"op": "impute", "columns": ["score"], "strategy": "value", "value": 0},
+            {"op": "derive", "name": "double", "expression": "score * 2"},
+            {"op": "filter", "filters": [{"column": "name", "op": "not_null"}]},
+        ]
+        created = client.post("/api/datasets/ds-1/pipelines", json={"name": "clean", "steps": steps})
+        assert created.status_code == 201
+        assert [step["checkpoint"] for step in created.json()["pipeline"]["plan"]] == [True, False, False, True]
+
+        preview = client.post("/api/datasets/pipelines/pipe-1/preview", json={"limit": 2})
+        assert preview.json()["rows"] == [
+            {"id": 1, "score": 10, "name": "a", "double": 20},
+            {"id": 2, "score": 0, "name": "b", "double": 0},
+        ]
+
+        run = client.post("/api/datasets/pipelines/pipe-1/run", json={})
+        assert run.status_code == 202
+        result = jobs["job-1"]["result"]
+        assert (result["recomputed_steps"], result["reused_steps"]) == (4, 0)
+        derived = versions[result["dataset_version_id"]]
+        assert derived["pipeline_id"] == "pipe-1" and derived["source_version_id"] == "raw-v1"
+        assert derived["parquet_path"] == derived["storage_path"] and derived["status"] == "profiling"
+        assert pl.read_parquet(io.BytesIO(uploads[derived["storage_path"]]))["id"].to_list() == [1, 2, 3]
+        assert [job["job_type"] for job in jobs.values()] == ["transform", "profile"]
+
+        steps[-1] = {"op": "filter", "filters": [{"column": "score", "op": "ge", "value": 30}]}
+        assert client.put("/api/datasets/pipelines/pipe-1", json={"steps": steps}).status_code == 200
+        client.post("/api/datasets/pipelines/pipe-1/run", json={"version_id": "raw-v1"})
+        result = jobs["job-3"]["result"]
+        assert (result["recomputed_steps"], result["reused_steps"]) == (3, 1)
+        derived = versions[result["dataset_version_id"]]
+        assert pl.read_parquet(io.BytesIO(uploads[derived["storage_path"]]))["id"].to_list() == [3, 4]
+
+        pipelines["pipe-1"]["steps"] = [{"op": "drop", "columns": ["missing"]}]
+        broken = client.post("/api/datasets/pipelines/pipe-1/preview", json={})
+        assert broken.status_code == 400 and "Step 1 (drop)" in broken.json()["detail"]
+    finally:
+        app.dependency_overrides.pop(require_auth, None)
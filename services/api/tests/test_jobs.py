@@ -0,0 +1,49 @@
+class DummyResult:
+    def __init__(self, data):
+        self.data = data
+
+
+def test_cancel_job_marks_job_cancelled(client, monkeypatch):
+    from app.main import app
+    from app.middleware.auth import AuthenticatedUser, require_auth
+    from app.services.supabase import supabase_service
+
+    async def fake_get_job(job_id):
+        return DummyResult({"id": job_id, "user_id": "user-1", "status": "running"})
+
+    cancelled = []
+
+    async def fake_cancel_job(job_id):
+        cancelled.append(job_id)
+        return True
+
+    monkeypatch.setattr(supabase_service, "get_job", fake_get_job)
+    monkeypatch.setattr(supabase_service, "cancel_job", fake_cancel_job)
+    app.dependency_overrides[require_auth] = lambda: AuthenticatedUser("user-1")
+    try:
+        response = client.post("/api/jobs/job-1/cancel")
+    finally:
+        app.dependency_overrides.pop(require_auth, None)
+
+    assert response.status_code == 200
+    assert response.json()["job"]["status"] == "cancelled"
+    assert cancelled == ["job-1"]
+
+
+def test_startup_fails_orphaned_api_jobs(client, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services.supabase import supabase_service
+
+    swept = []
+
+    async def fake_fail_orphaned_jobs(job_types):
+        swept.append(job_types)
+        return DummyResult(0)
+
+    monkeypatch.setattr(supabase_service, "fail_orphaned_jobs", fake_fail_orphaned_jobs)
+    with TestClient(app) as started:
+        assert started.get("/health").status_code == 200
+
+    assert swept == [["export", "transform"]]
@@ -15,3 +15,70 @@ def test_list_projects_returns_payload(client, monkeypatch):
     response = client.get("/api/projects")
     assert response.status_code == 200
     assert "projects" in response.json()
+
+
+def test_project_sql_joins_datasets_and_caches(client, monkeypatch, tmp_path):
+    from contextlib import contextmanager
+
+    import polars as pl
+
+    from app.services import sql_query
+    from app.services.supabase import supabase_service
+
+    pl.DataFrame({"id": [1, 2, 3], "region": ["north", "south", "north"]}).write_parquet(tmp_path / "stores.parquet")
+    pl.DataFrame({"store_id": [1, 1, 2, 3, 3, 3], "amount": [10.0, 5.0, 7.0, 1.0, 2.0, 3.0]}).write_csv(tmp_path / "sales.csv")
+
+    opened = []
+
+    @contextmanager
+    def fake_open_dataset_file(bucket, path):
+        opened.append(path)
+        yield str(tmp_path / path)
+
+    async def fake_get_project(project_id):
+        return DummyResult({"id": project_id, "is_demo": True})
+
+    async def fake_get_datasets(project_id):
+        return DummyResult([
+            {
+                "id": "d1",
+                "name": "Stores",
+                "file_type": "parquet",
+                "dataset_versions": [{"id": "sql-v1", "version_number": 1, "storage_path": "stores.parquet"}],
+            },
+            {
+                "id": "d2",
+                "name": "Sales 2024",
+                "file_type": "csv",
+                "dataset_versions": [{"id": "sql-v2", "version_number": 1, "storage_path": "sales.csv"}],
+            },
+        ])
+
+    monkeypatch.setattr(sql_query, "open_dataset_file", fake_open_dataset_file)
+    monkeypatch.setattr(supabase_service, "get_project", fake_get_project)
+    monkeypatch.setattr(supabase_service, "get_datasets", fake_get_datasets)
+
+    query = """
+        SELECT s.region, SUM(t.amount) AS total
+        FROM sales_2024 t JOIN stores s ON t.store_id = s.id
+        GROUP BY s.region ORDER BY s.region
+    """
+    response = client.post("/api/projects/p1/sql", json={"query": query})
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["tables"]["sales_2024"] == {"dataset_id": "d2", "version_id": "sql-v2"}
+    assert payload["data"] == {"region": ["north", "south"], "total": [21.0, 7.0]}
+    assert payload["cached"] is False
+    assert sorted(opened) == ["sales.csv", "stores.parquet"]
+
+    again = client.post("/api/projects/p1/sql", json={"query": " ".join(query.split()) + ";"})
+    assert again.json()["cached"] is True
+
+    opened.clear()
+    limited = client.post("/api/projects/p1/sql", json={"query": "SELECT * FROM sales_2024", "max_rows": 4, "format": "arrow"})
+    assert limited.headers["x-truncated"] == "true"
+    assert opened == ["sales.csv"]
+    assert pl.read_ipc_stream(limited.content).height == 4
+
+    for forbidden in ["DROP TABLE stores", "SELECT * FROM read_csv('/etc/passwd')"]:
+        assert client.post("/api/projects/p1/sql", json={"query": forbidden}).status_code == 400
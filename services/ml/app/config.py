@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -15,6 +16,10 @@ class Settings(BaseSettings):
     pytorch_min_features: int = 200
     pytorch_default_epochs: int = 20
 
+    # Shared on-disk dataset cache
+    dataset_cache_dir: Optional[str] = None
+    dataset_cache_max_mb: int = 2048  # 0 disables the cache
+
     class Config:
         env_file = ".env"
         case_sensitive = False
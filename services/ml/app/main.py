@@ -1,14 +1,55 @@
-from typing import Any, Dict, List, Optional, Literal
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Literal
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
 
+from app.services.metrics import metrics, queue_stats_samples
+from app.services.supabase_client import get_supabase_client
 from app.services.trainer import TrainRequest, train_model
 from app.services.inference import predict
 
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="DataCanvas ML Service", version="1.0.0")
 
+metrics.counter("datacanvas_worker_busy_seconds_total", "Seconds this worker has spent running jobs.")
+
+
+class _JobTracker:
+    """
+    Counts a kind of ML request for the worker metrics without changing how it
+    runs. Training and inference block the event loop, so a scrape during one
+    cannot see it in flight; ``rate()`` of the busy-seconds counter gives the
+    worker's utilisation regardless.
+    """
+
+    def __init__(self, job_type: str):
+        self.job_type = job_type
+        self.in_flight = 0
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        self.in_flight += 1
+        started = time.monotonic()
+        outcome = "failed"
+        try:
+            yield
+            outcome = "completed"
+        finally:
+            self.in_flight -= 1
+            elapsed = time.monotonic() - started
+            metrics.inc("datacanvas_jobs_processed_total", job_type=self.job_type, outcome=outcome)
+            metrics.observe("datacanvas_job_duration_seconds", elapsed, job_type=self.job_type)
+            metrics.inc("datacanvas_worker_busy_seconds_total", elapsed, job_type=self.job_type)
+
+
+_trackers = {"train": _JobTracker("train"), "predict": _JobTracker("predict")}
+
 
 class TrainRequestModel(BaseModel):
     dataset_version_id: str
@@ -38,10 +79,30 @@ async def health_check() -> Dict[str, str]:
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    """
+    Prometheus text-format metrics: cluster-wide queue depth per job type plus
+    this worker's in-flight requests, busy time and throughput.
+    """
+    extra = []
+    supabase = get_supabase_client()
+    try:
+        result = await asyncio.to_thread(lambda: supabase.rpc("job_queue_stats", {}).execute())
+        extra.extend(queue_stats_samples(result.data or []))
+    except Exception as exc:
+        logger.warning(f"Queue stats unavailable: {exc}")
+
+    for job_type, tracker in _trackers.items():
+        metrics.set("datacanvas_worker_inflight_jobs", tracker.in_flight, job_type=job_type)
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/train")
 async def train_endpoint(payload: TrainRequestModel) -> Dict[str, Any]:
     try:
-        return train_model(payload.to_internal())
+        with _trackers["train"].track():
+            return train_model(payload.to_internal())
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:
@@ -51,11 +112,12 @@ async def train_endpoint(payload: TrainRequestModel) -> Dict[str, Any]:
 @app.post("/predict")
 async def predict_endpoint(payload: PredictRequestModel) -> Dict[str, Any]:
     try:
-        return predict(
-            model_id=payload.model_id,
-            rows=payload.rows,
-            return_probabilities=payload.return_probabilities,
-        )
+        with _trackers["predict"].track():
+            return predict(
+                model_id=payload.model_id,
+                rows=payload.rows,
+                return_probabilities=payload.return_probabilities,
+            )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:
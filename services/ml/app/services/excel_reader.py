@@ -0,0 +1,98 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import ipc
+
+from app.services.dataset_cache import get_dataset_cache
+
+try:
+    import fastexcel
+except Exception:  # pragma: no cover
+    fastexcel = None
+
+MAX_SHEET_WORKERS = 4
+
+
+def sheet_names(path: str) -> List[str]:
+    """Sheet names of a workbook, in workbook order."""
+    if fastexcel is not None:
+        return list(fastexcel.read_excel(path).sheet_names)
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def read_excel_sheet(path: str, sheet: Optional[str] = None) -> pd.DataFrame:
+    """Read one sheet (the first by default). See :func:`read_excel_sheets`."""
+    names = sheet_names(path)
+    if not names:
+        raise ValueError("Workbook has no sheets")
+    name = sheet if sheet is not None else names[0]
+    if name not in names:
+        raise ValueError(f"Unknown sheet: {name}")
+    return _load_sheet(path, name).to_pandas()
+
+
+def read_excel_sheets(path: str, sheets: Optional[Sequence[str]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Read several sheets (all by default) in parallel, one frame per sheet.
+
+    Sheets are parsed with calamine via ``fastexcel`` when it is installed and
+    with pandas/openpyxl otherwise. Each sheet is converted to Arrow once and
+    kept as an IPC file in the shared dataset cache, keyed by workbook content
+    (the same entries the profiler and API write), so later reads skip Excel
+    parsing.
+    """
+    names = list(sheets) if sheets is not None else sheet_names(path)
+    if not names:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(MAX_SHEET_WORKERS, len(names))) as pool:
+        tables = list(pool.map(lambda name: _load_sheet(path, name), names))
+    return {name: table.to_pandas() for name, table in zip(names, tables)}
+
+
+def sheet_cache_key(path: str, sheet: str) -> str:
+    return hashlib.sha256(f"excel-sheet/{_workbook_digest(path)}/{sheet}".encode("utf-8")).hexdigest()
+
+
+def _load_sheet(path: str, sheet: str) -> pa.Table:
+    cache = get_dataset_cache()
+    if cache is None:
+        return _parse_sheet(path, sheet)
+
+    def produce(destination: str):
+        table = _parse_sheet(path, sheet)
+        with ipc.new_file(destination, table.schema) as writer:
+            writer.write_table(table)
+
+    with cache.open_key(sheet_cache_key(path, sheet), produce, suffix=".arrow") as ipc_path:
+        with pa.memory_map(ipc_path) as source:
+            return ipc.open_file(source).read_all()
+
+
+def _parse_sheet(path: str, sheet: str) -> pa.Table:
+    if fastexcel is not None:
+        batch = fastexcel.read_excel(path).load_sheet_by_name(sheet).to_arrow()
+        return pa.Table.from_batches([batch])
+    return pa.Table.from_pandas(pd.read_excel(path, sheet_name=sheet), preserve_index=False)
+
+
+def _workbook_digest(path: str) -> str:
+    stat = os.stat(path)
+    return _file_digest(path, stat.st_size, stat.st_ino)
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path: str, size: int, inode: int) -> str:
+    # size/inode are part of the cache key so a replaced file is re-hashed.
+    with open(path, "rb") as handle:
+        return hashlib.file_digest(handle, "sha256").hexdigest()
@@ -0,0 +1,50 @@
+import json
+
+import pandas as pd
+
+SNIFF_BYTES = 1024 * 1024
+NDJSON_CHUNK_ROWS = 100000
+
+
+def sniff_json_format(path: str) -> str:
+    """
+    Classify a JSON dataset file without reading it all.
+
+    Returns ``"ndjson"`` when the first line is a complete JSON object (one
+    record per line), ``"array"`` for a top-level ``[...]`` and ``"document"``
+    for anything else (e.g. a pretty-printed object).
+    """
+    with open(path, "rb") as handle:
+        head = handle.read(SNIFF_BYTES)
+    head = head.lstrip(b"\xef\xbb\xbf").lstrip()
+    if head.startswith(b"["):
+        return "array"
+    if head.startswith(b"{"):
+        try:
+            record = json.loads(head.split(b"\n", 1)[0])
+        except ValueError:
+            return "document"
+        if isinstance(record, dict):
+            return "ndjson"
+    return "document"
+
+
+def read_json_file(path: str) -> pd.DataFrame:
+    """
+    Read a JSON or NDJSON dataset, detecting the layout from the content.
+
+    NDJSON is parsed by pyarrow's native, multi-threaded line reader; if its
+    strict typing rejects the file, pandas reads it in chunks of lines so the
+    raw text is never held in memory at once.
+    """
+    if sniff_json_format(path) != "ndjson":
+        return pd.read_json(path)
+
+    from pyarrow import ArrowInvalid
+    from pyarrow import json as pa_json
+
+    try:
+        return pa_json.read_json(path).to_pandas()
+    except ArrowInvalid:
+        with pd.read_json(path, lines=True, chunksize=NDJSON_CHUNK_ROWS) as reader:
+            return pd.concat(reader, ignore_index=True)
@@ -0,0 +1,150 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Job durations span sub-second inline work to multi-minute files.
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text
+    exposition format, so ``GET /metrics`` can be scraped by Prometheus or by a
+    simple autoscaler without extra dependencies.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._values: Dict[str, Dict[LabelKey, float]] = {}
+        # Histogram name -> upper bounds, and per label set: bucket counts, sum, count
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+
+    def counter(self, name: str, help_text: str):
+        self._register(name, "counter", help_text)
+
+    def gauge(self, name: str, help_text: str):
+        self._register(name, "gauge", help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = DURATION_BUCKETS):
+        with self._lock:
+            self._meta.setdefault(name, ("histogram", help_text))
+            self._buckets.setdefault(name, tuple(sorted(buckets)))
+            self._histograms.setdefault(name, {})
+
+    def observe(self, name: str, value: float, **labels: str):
+        bounds = self._buckets[name]
+        key = _label_key(labels)
+        with self._lock:
+            state = self._histograms[name].setdefault(key, [0.0] * (len(bounds) + 2))
+            # Buckets are cumulative, as the exposition format expects: an
+            # observation counts in every bucket whose bound it fits.
+            for index, bound in enumerate(bounds):
+                if value <= bound:
+                    state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def inc(self, name: str, value: float = 1.0, **labels: str):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: str):
+        with self._lock:
+            self._values[name][_label_key(labels)] = float(value)
+
+    def render(self, extra: Optional[Iterable["Sample"]] = None) -> str:
+        """Render all registered series, plus ``extra`` samples computed at scrape time."""
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text) in self._meta.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    lines.extend(self._histogram_lines(name))
+                    continue
+                for key, value in sorted(self._values[name].items()):
+                    lines.append(_format_sample(name, key, value))
+        for sample in extra or []:
+            lines.extend(sample.lines())
+        return "\n".join(lines) + "\n"
+
+    def _histogram_lines(self, name: str) -> List[str]:
+        bounds = self._buckets[name]
+        lines = []
+        for key, state in sorted(self._histograms[name].items()):
+            for bound, count in zip(bounds, state):
+                lines.append(_format_sample(f"{name}_bucket", key + (("le", f"{bound:g}"),), count))
+            lines.append(_format_sample(f"{name}_bucket", key + (("le", "+Inf"),), state[-1]))
+            lines.append(_format_sample(f"{name}_sum", key, state[-2]))
+            lines.append(_format_sample(f"{name}_count", key, state[-1]))
+        return lines
+
+    def _register(self, name: str, kind: str, help_text: str):
+        with self._lock:
+            self._meta.setdefault(name, (kind, help_text))
+            self._values.setdefault(name, {})
+
+
+class Sample:
+    """A gauge family computed on demand (e.g. from a database query)."""
+
+    def __init__(self, name: str, help_text: str, values: Dict[LabelKey, float]):
+        self.name = name
+        self.help_text = help_text
+        self.values = values
+
+    def lines(self) -> List[str]:
+        result = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        result.extend(_format_sample(self.name, key, value) for key, value in sorted(self.values.items()))
+        return result
+
+
+# job_queue_stats() column -> (metric name, help)
+QUEUE_STATS = {
+    "queued": ("datacanvas_jobs_queued", "Queued jobs, by job type."),
+    "queued_ready": ("datacanvas_jobs_queued_ready", "Queued jobs whose retry backoff has elapsed."),
+    "running": ("datacanvas_jobs_running", "Running jobs across all workers, by job type."),
+    "oldest_queued_seconds": ("datacanvas_jobs_oldest_queued_seconds", "Age of the oldest queued job."),
+    "completed_recent": ("datacanvas_jobs_completed_recent", "Jobs completed in the stats window (cluster-wide)."),
+    "failed_recent": ("datacanvas_jobs_failed_recent", "Jobs failed in the stats window (cluster-wide)."),
+}
+
+
+def queue_stats_samples(rows: List[dict]) -> List[Sample]:
+    """Turn ``job_queue_stats()`` rows into one gauge family per column."""
+    samples = []
+    for column, (name, help_text) in QUEUE_STATS.items():
+        values = {labels(job_type=row["job_type"]): float(row.get(column) or 0) for row in rows}
+        samples.append(Sample(name, help_text, values))
+    return samples
+
+
+def labels(**values: str) -> LabelKey:
+    return _label_key(values)
+
+
+def _label_key(values: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in values.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_sample(name: str, key: LabelKey, value: float) -> str:
+    if key:
+        rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+        return f"{name}{{{rendered}}} {value:g}"
+    return f"{name} {value:g}"
+
+
+metrics = MetricsRegistry()
+metrics.counter("datacanvas_jobs_processed_total", "Jobs finished by this worker, by job type and outcome.")
+metrics.histogram("datacanvas_job_duration_seconds", "Wall time of jobs finished by this worker.")
+metrics.gauge("datacanvas_worker_inflight_jobs", "Jobs currently running on this worker.")
+metrics.gauge("datacanvas_worker_slots", "Concurrent job slots on this worker.")
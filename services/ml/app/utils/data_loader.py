@@ -1,8 +1,10 @@
-import io
 from typing import Any, Tuple
 import pandas as pd
 
 from app.config import get_settings
+from app.services.excel_reader import read_excel_sheet
+from app.services.json_reader import read_json_file
+from app.services.storage_reader import open_dataset_file, split_compression
 from app.services.supabase_client import get_supabase_client
 
 
@@ -27,8 +29,11 @@ def load_dataset_version(version_id: str) -> Tuple[pd.DataFrame, dict[str, Any]]
         raise ValueError("Dataset version missing storage path")
 
     file_type = (dataset.get("file_type") or "").lower()
-    file_bytes = supabase.storage.from_(settings.supabase_datasets_bucket).download(storage_path)
-    df = _read_dataset(file_bytes, file_type, storage_path)
+    # Prefer the typed Parquet copy written after upload.
+    read_path = version.get("parquet_path") or storage_path
+    read_type = "parquet" if version.get("parquet_path") else file_type
+    with open_dataset_file(settings.supabase_datasets_bucket, read_path) as local_path:
+        df = _read_dataset(local_path, read_type, read_path)
 
     return df, {
         "dataset_id": dataset.get("id"),
@@ -42,24 +47,19 @@ def load_dataset_version(version_id: str) -> Tuple[pd.DataFrame, dict[str, Any]]
     }
 
 
-def _read_dataset(file_bytes: bytes, file_type: str, storage_path: str) -> pd.DataFrame:
-    buffer = io.BytesIO(file_bytes)
+def _read_dataset(path: str, file_type: str, storage_path: str) -> pd.DataFrame:
     file_type = _normalize_file_type(file_type, storage_path)
 
     if file_type in ["csv", "txt"]:
-        return pd.read_csv(buffer)
+        return pd.read_csv(path, memory_map=True)
     if file_type == "tsv":
-        return pd.read_csv(buffer, sep="	")
-    if file_type in ["json", "ndjson"]:
-        try:
-            return pd.read_json(buffer, lines=True)
-        except ValueError:
-            buffer.seek(0)
-            return pd.read_json(buffer)
+        return pd.read_csv(path, sep="	", memory_map=True)
+    if file_type in ["json", "ndjson", "jsonl"]:
+        return read_json_file(path)
     if file_type == "parquet":
-        return pd.read_parquet(buffer)
+        return pd.read_parquet(path, memory_map=True)
     if file_type in ["xlsx", "xls"]:
-        return pd.read_excel(buffer)
+        return read_excel_sheet(path)
 
     raise ValueError(f"Unsupported file type: {file_type}")
 
@@ -68,6 +68,8 @@ def _normalize_file_type(file_type: str, storage_path: str) -> str:
     cleaned = file_type
     if "/" in cleaned:
         cleaned = cleaned.split("/")[-1]
-    if not cleaned and "." in storage_path:
-        cleaned = storage_path.rsplit(".", 1)[-1].lower()
+    if not cleaned:
+        storage_path = split_compression(storage_path)[0]
+        if "." in storage_path:
+            cleaned = storage_path.rsplit(".", 1)[-1].lower()
     return cleaned
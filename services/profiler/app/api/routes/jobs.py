@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 from app.services.supabase_client import get_supabase_client
 
@@ -12,6 +12,8 @@ class JobStatus(BaseModel):
     job_type: str
     status: str
     progress: int
+    priority: Optional[int] = None
+    progress_detail: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
     created_at: str
     started_at: Optional[str] = None
@@ -19,7 +21,7 @@ class JobStatus(BaseModel):
 
 
 @router.get("/jobs/{job_id}", response_model=JobStatus)
-async def get_job_status(job_id: str):
+def get_job_status(job_id: str):
     """Get the status of a specific job."""
     supabase = get_supabase_client()
 
@@ -32,12 +34,29 @@ async def get_job_status(job_id: str):
 
 
 @router.get("/jobs", response_model=List[JobStatus])
-async def list_pending_jobs():
+def list_pending_jobs():
     """List all pending jobs (for monitoring)."""
     supabase = get_supabase_client()
 
     result = supabase.table("jobs").select("*").in_(
         "status", ["queued", "running"]
-    ).order("created_at").limit(50).execute()
+    ).order("priority", desc=True).order("created_at").limit(50).execute()
 
     return [JobStatus(**job) for job in result.data]
+
+
+class UserQueueWait(BaseModel):
+    count: int
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+
+@router.get("/scheduler/stats", response_model=Dict[str, UserQueueWait])
+def scheduler_stats(request: Request):
+    """Queue-wait percentiles in seconds per user, over recent dispatches on this worker."""
+    processor = getattr(request.app.state, "job_processor", None)
+    if processor is None:
+        return {}
+    return processor.scheduler.stats()
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics import Sample, labels, metrics, queue_stats_samples
+from app.services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def scrape_metrics(request: Request):
+    """
+    Prometheus text-format metrics: cluster-wide queue depth, oldest queued age
+    and recent throughput per job type, plus this worker's slots and in-flight jobs.
+    """
+    extra = []
+    supabase = get_supabase_client()
+    try:
+        result = await asyncio.to_thread(lambda: supabase.rpc("job_queue_stats", {}).execute())
+        extra.extend(queue_stats_samples(result.data or []))
+    except Exception as e:
+        logger.warning(f"Queue stats unavailable: {e}")
+
+    processor = getattr(request.app.state, "job_processor", None)
+    if processor is not None:
+        in_flight = processor.in_flight_count
+        slots = processor.max_concurrent_jobs
+        metrics.set("datacanvas_worker_inflight_jobs", in_flight, job_type="profile")
+        metrics.set("datacanvas_worker_slots", slots, job_type="profile")
+        extra.append(Sample(
+            "datacanvas_worker_slot_utilization",
+            "Fraction of this worker's job slots in use.",
+            {labels(job_type="profile"): in_flight / slots if slots else 0.0},
+        ))
+
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
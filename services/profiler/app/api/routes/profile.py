@@ -1,116 +1,198 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime, timezone
 
-from app.core.profiler import DataProfiler
+from app.config import get_settings
+from app.services.job_state import profile_record
+from app.services.storage_reader import (
+    ChunkedObject,
+    ObjectTooLarge,
+    check_storage_url,
+    decompress_stream,
+    download_url_to_file,
+    remove_temp,
+    split_compression,
+)
 from app.services.supabase_client import get_supabase_client
 
 router = APIRouter()
 
 
-class ProfileRequest(BaseModel):
-    job_id: str
-    dataset_version_id: str
-    signed_url: str
-
-
 class ProfileResponse(BaseModel):
     success: bool
     message: str
+    mode: str  # "inline" or "queued"
     profile_id: Optional[str] = None
+    job_id: Optional[str] = None
+    profile: Optional[Dict[str, Any]] = None
+    sample_data: Optional[List[Dict[str, Any]]] = None
 
 
 @router.post("/profile", response_model=ProfileResponse)
-async def create_profile(request: ProfileRequest):
+async def create_profile(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    signed_url: Optional[str] = Form(None),
+    file_type: Optional[str] = Form(None),
+    dataset_version_id: Optional[str] = Form(None),
+):
     """
-    Process a profiling job.
-    This endpoint is called by the job processor or can be triggered manually.
+    Profile a dataset from a multipart upload or a signed URL from this
+    project's Supabase Storage.
+
+    Files up to ``fast_path_max_mb`` are profiled in the job process pool, on
+    at most ``fast_path_max_concurrent`` workers, and the profile is returned
+    inline (and stored when ``dataset_version_id`` is given), skipping the
+    storage round trip and the job queue. Larger files, and requests made
+    while every inline worker is busy, are handed to the regular profile job
+    for ``dataset_version_id``. Compressed sources
+    (``.gz``, ``.zst``, ``.zip``) are decompressed while they are written to disk;
+    the size limit applies to both the compressed and the decompressed bytes.
     """
-    try:
+    if file is None and not signed_url:
+        raise HTTPException(status_code=400, detail="Provide a file or a signed_url")
+
+    if file is None:
+        try:
+            check_storage_url(signed_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    settings = get_settings()
+    limit = settings.fast_path_max_mb * 1024 * 1024
+    source_name = file.filename if file is not None else urlparse(signed_url).path
+    inner_name, compression = split_compression(source_name or "")
+    file_type = file_type or os.path.splitext(inner_name)[1].lstrip(".")
+
+    if file is not None and _upload_size(file) > limit:
+        return await _enqueue_profile(dataset_version_id)
+
+    processor = request.app.state.job_processor
+    if processor.inline_slots.locked():
+        # Every inline worker is busy; queue rather than pile up in-process work.
+        return await _enqueue_profile(dataset_version_id, busy=True)
+
+    async with processor.inline_slots:
+        fd, local_path = tempfile.mkstemp(prefix="datacanvas-", suffix=f".{file_type}" if file_type else "")
+        os.close(fd)
+        try:
+            try:
+                if file is not None:
+                    await asyncio.to_thread(_copy_upload, file, local_path, compression, limit)
+                else:
+                    await asyncio.to_thread(download_url_to_file, signed_url, local_path, limit, compression)
+            except (ObjectTooLarge, ChunkedObject):
+                # The profile job reads chunked versions by storage path.
+                return await _enqueue_profile(dataset_version_id)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            if not file_type and dataset_version_id:
+                version = await _get_version(dataset_version_id)
+                file_type = (version.get("dataset") or {}).get("file_type", "")
+
+            try:
+                profile_data, sample_data = await processor.profile_inline(local_path, file_type)
+            except BrokenProcessPool:
+                return await _enqueue_profile(dataset_version_id, busy=True)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            remove_temp(local_path)
+
+    profile_data["dataset"] = {"name": os.path.basename(source_name or "") or "Dataset"}
+
+    profile_id = None
+    if dataset_version_id:
         supabase = get_supabase_client()
-
-        # Update job status to running
-        supabase.table("jobs").update({
-            "status": "running",
-            "progress": 10,
-            "started_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", request.job_id).execute()
-
-        # Download the file
-        # For now, we'll use a placeholder since we need the actual file
-        # In production, download from the signed_url
-
-        # Create profiler and run
-        profiler = DataProfiler()
-
-        # Update progress
-        supabase.table("jobs").update({"progress": 50}).eq("id", request.job_id).execute()
-
-        # Get dataset version info
-        version_result = (
-            supabase.table("dataset_versions")
-            .select("*, dataset:datasets(*)")
-            .eq("id", request.dataset_version_id)
-            .single()
-            .execute()
+        result = await asyncio.to_thread(
+            lambda: supabase.rpc("complete_profile_job", {
+                "p_job_id": None,
+                "p_version_id": dataset_version_id,
+                "p_profile": profile_record(profile_data, sample_data),
+            }).execute()
         )
-
-        if not version_result.data:
-            raise HTTPException(status_code=404, detail="Dataset version not found")
-
-        version = version_result.data
-
-        # For demo, create a mock profile
-        profile_data = profiler.create_demo_profile()
-
-        # Insert profile
-        schema_info = profile_data.get("schema", {}).get("columns", [])
-        statistics = profile_data.get("stats", {})
-        profile_result = supabase.table("dataset_profiles").upsert({
-            "version_id": request.dataset_version_id,
-            "schema_info": schema_info,
-            "statistics": statistics,
-            "correlations": profile_data.get("correlations"),
-            "missing_values": profile_data.get("missing"),
-            "warnings": profile_data.get("warnings", []),
-            "sample_data": [],
-            "computed_at": datetime.now(timezone.utc).isoformat(),
-        }, on_conflict="version_id").execute()
-
-        # Update dataset version status
-        supabase.table("dataset_versions").update({
-            "status": "ready",
-            "row_count": statistics.get("row_count"),
-            "column_count": statistics.get("column_count"),
-            "error_message": None,
-        }).eq("id", request.dataset_version_id).execute()
-
-        # Complete the job
-        supabase.table("jobs").update({
-            "status": "completed",
-            "progress": 100,
-            "completed_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", request.job_id).execute()
-
-        return ProfileResponse(
-            success=True,
-            message="Profile created successfully",
-            profile_id=profile_result.data[0]["id"] if profile_result.data else None
+        profile_id = result.data
+
+    return ProfileResponse(
+        success=True,
+        message="Profile created successfully",
+        mode="inline",
+        profile_id=profile_id,
+        profile=profile_data,
+        sample_data=sample_data,
+    )
+
+
+def _upload_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, os.SEEK_END)
+    return file.file.tell()
+
+
+def _copy_upload(file: UploadFile, destination: str, compression: Optional[str] = None, limit: Optional[int] = None):
+    file.file.seek(0)
+    with open(destination, "wb") as handle:
+        if compression:
+            decompress_stream(file.file, handle, compression, limit)
+        else:
+            shutil.copyfileobj(file.file, handle)
+
+
+async def _get_version(version_id: str) -> dict:
+    supabase = get_supabase_client()
+    result = await asyncio.to_thread(
+        lambda: supabase.table("dataset_versions")
+        .select("*, dataset:datasets(*, project:projects(*))")
+        .eq("id", version_id)
+        .single()
+        .execute()
+    )
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Dataset version not found")
+    return result.data
+
+
+async def _enqueue_profile(dataset_version_id: Optional[str], busy: bool = False) -> ProfileResponse:
+    """
+    Fall back to the asynchronous profile job for files over the fast-path
+    limit, or (``busy``) when every inline worker is taken.
+    """
+    if not dataset_version_id:
+        if busy:
+            raise HTTPException(
+                status_code=503,
+                detail="Inline profiling is at capacity; retry shortly or upload it as a dataset version",
+            )
+        raise HTTPException(
+            status_code=413,
+            detail="File exceeds the inline profiling limit; upload it as a dataset version instead",
         )
-
-    except Exception as e:
-        # Mark job as failed
-        supabase = get_supabase_client()
-        supabase.table("jobs").update({
-            "status": "failed",
-            "error_message": str(e),
-            "completed_at": datetime.now(timezone.utc).isoformat(),
-        }).eq("id", request.job_id).execute()
-
-        supabase.table("dataset_versions").update({
-            "status": "error",
-            "error_message": str(e),
-        }).eq("id", request.dataset_version_id).execute()
-
-        raise HTTPException(status_code=500, detail=str(e))
+    version = await _get_version(dataset_version_id)
+    if not version.get("storage_path"):
+        raise HTTPException(status_code=400, detail="Dataset version missing storage_path")
+    project = (version.get("dataset") or {}).get("project") or {}
+
+    supabase = get_supabase_client()
+    result = await asyncio.to_thread(
+        lambda: supabase.rpc("enqueue_job", {
+            "p_user_id": project.get("user_id"),
+            "p_job_type": "profile",
+            "p_payload": {"version_id": dataset_version_id, "storage_path": version["storage_path"]},
+        }).execute()
+    )
+    job_id = result.data[0]["id"] if result.data else None
+    return ProfileResponse(
+        success=True,
+        message="File queued for profiling",
+        mode="queued",
+        job_id=job_id,
+    )
@@ -1,16 +1,55 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
     supabase_url: str
     supabase_service_role_key: str
     supabase_datasets_bucket: str = "datasets"
+    # Direct Postgres connection used for LISTEN/NOTIFY job wakeups
+    database_url: Optional[str] = None
 
     # Profiling settings
     max_sample_size: int = 50000
     head_sample_size: int = 5000
     max_file_size_mb: int = 200
+    # Files up to this size are profiled inline by POST /api/profile
+    fast_path_max_mb: int = 10
+    # Inline profiles run in the job process pool on this many extra workers;
+    # requests beyond that are queued as profile jobs
+    fast_path_max_concurrent: int = 2
+    # Write a typed, zstd-compressed Parquet copy of each upload for readers
+    parquet_conversion_enabled: bool = True
+
+    # Shared on-disk dataset cache
+    dataset_cache_dir: Optional[str] = None
+    dataset_cache_max_mb: int = 2048  # 0 disables the cache
+
+    # Worker settings
+    max_concurrent_jobs: int = 2
+    job_poll_fallback_seconds: int = 60
+    progress_write_interval_ms: int = 1000
+    # Leases: a job whose worker stops heartbeating for this long is requeued
+    worker_id: Optional[str] = None
+    job_lease_seconds: int = 60
+    job_retry_base_seconds: int = 30
+    job_retry_max_seconds: int = 900
+
+    # Scheduling
+    per_user_max_concurrent_jobs: int = 1
+    scheduler_window: int = 200
+    scheduler_user_weights: Dict[str, float] = {}
+    # Slots bulk (re-profile) jobs may never take, kept free for interactive work
+    bulk_reserved_slots: int = 1
+
+    # Background re-profiling of profiles computed by an older profiler
+    reprofile_enabled: bool = True
+    reprofile_interval_seconds: int = 60
+    reprofile_batch_size: int = 200
+    reprofile_max_pending: int = 500
+    # A version whose re-profile failed is not retried for this long
+    reprofile_failure_backoff_seconds: int = 86400
 
     class Config:
         env_file = ".env"
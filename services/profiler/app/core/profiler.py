@@ -1,11 +1,101 @@
 import polars as pl
 import numpy as np
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from dataclasses import dataclass, asdict
 import io
 import time
 
 
+# Bump whenever profile output changes; stored profiles with an older version
+# are refreshed in the background by the re-profile scheduler.
+PROFILER_VERSION = 2
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class JobCancelled(Exception):
+    """Raised at a progress checkpoint once the job has been cancelled."""
+
+
+class ProgressReporter:
+    """
+    Rate-limited progress reporting for a profiling run.
+
+    Each event is a dict with the current ``stage``, the overall ``fraction``
+    done (0-1) and, when known, ``columns_done``/``columns_total`` and
+    ``rows_scanned``/``rows_estimated``. Stage changes are always reported;
+    updates within a stage at most once per ``min_interval`` seconds.
+
+    Every update is also a cancellation checkpoint: when ``cancel_check``
+    returns True the reporter raises :class:`JobCancelled`, unwinding the run.
+    """
+
+    # Share of the whole run covered by each stage, as (start, end)
+    STAGES = {
+        "reading": (0.0, 0.3),
+        "sampling": (0.3, 0.35),
+        "columns": (0.35, 0.85),
+        "correlations": (0.85, 0.9),
+        "missing": (0.9, 0.93),
+        "warnings": (0.93, 0.96),
+        "charts": (0.96, 1.0),
+        "done": (1.0, 1.0),
+    }
+
+    def __init__(
+        self,
+        callback: Optional[ProgressCallback] = None,
+        min_interval: float = 0.5,
+        cancel_check: Optional[Callable[[], bool]] = None,
+    ):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.cancel_check = cancel_check
+        self._stage = "reading"
+        self._stage_fraction = 0.0
+        self._details: Dict[str, Any] = {}
+        self._last_emit = 0.0
+
+    def checkpoint(self):
+        if self.cancel_check is not None and self.cancel_check():
+            raise JobCancelled(f"Cancelled during {self._stage}")
+
+    def stage(self, name: str):
+        self.checkpoint()
+        self._stage = name
+        self._stage_fraction = 0.0
+        self._emit(force=True)
+
+    def columns(self, done: int, total: int):
+        self._details.update({"columns_done": done, "columns_total": total})
+        self._advance(done / total if total else 1.0)
+
+    def rows(self, scanned: int, estimated: Optional[int] = None):
+        self._details["rows_scanned"] = scanned
+        if estimated:
+            self._details["rows_estimated"] = estimated
+        self._advance(min(scanned / estimated, 0.99) if estimated else self._stage_fraction)
+
+    @property
+    def fraction(self) -> float:
+        start, end = self.STAGES.get(self._stage, (0.0, 1.0))
+        return start + (end - start) * self._stage_fraction
+
+    def _advance(self, stage_fraction: float):
+        self.checkpoint()
+        self._stage_fraction = max(0.0, min(stage_fraction, 1.0))
+        self._emit()
+
+    def _emit(self, force: bool = False):
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_emit < self.min_interval:
+            return
+        self._last_emit = now
+        self.callback({"stage": self._stage, "fraction": round(self.fraction, 4), **self._details})
+
+
 @dataclass
 class ColumnProfile:
     name: str
@@ -38,17 +128,25 @@ class ColumnProfile:
 
 
 class DataProfiler:
-    def __init__(self, max_sample_size: int = 50000):
+    def __init__(
+        self,
+        max_sample_size: int = 50000,
+        progress_callback: Optional[ProgressCallback] = None,
+        reporter: Optional[ProgressReporter] = None,
+    ):
         self.max_sample_size = max_sample_size
+        self.reporter = reporter or ProgressReporter(progress_callback)
 
     def profile_dataframe(self, df: pl.DataFrame) -> Dict[str, Any]:
         """Profile a Polars DataFrame and return comprehensive statistics."""
         start_time = time.time()
+        reporter = self.reporter
 
         row_count = len(df)
         column_count = len(df.columns)
 
         # Sample if needed
+        reporter.stage("sampling")
         if row_count > self.max_sample_size:
             df_sample = df.sample(n=self.max_sample_size, seed=42)
             sampled = True
@@ -57,24 +155,31 @@ class DataProfiler:
             sampled = False
 
         # Profile each column
+        reporter.stage("columns")
         columns = []
-        for col_name in df.columns:
+        for index, col_name in enumerate(df.columns):
             col_profile = self._profile_column(df_sample, col_name)
             columns.append(asdict(col_profile))
+            reporter.columns(index + 1, column_count)
 
         # Compute correlations for numeric columns
+        reporter.stage("correlations")
         numeric_cols = [c for c in df.columns if df[c].dtype in [pl.Float64, pl.Int64, pl.Float32, pl.Int32]]
         correlations = self._compute_correlations(df_sample, numeric_cols)
 
         # Compute missing patterns
+        reporter.stage("missing")
         missing = self._analyze_missing(df_sample)
 
         # Generate warnings
+        reporter.stage("warnings")
         warnings = self._generate_warnings(columns, correlations)
 
         # Generate chart specs
+        reporter.stage("charts")
         charts = self._generate_chart_specs(columns, correlations)
 
+        reporter.stage("done")
         processing_time_ms = int((time.time() - start_time) * 1000)
 
         return {
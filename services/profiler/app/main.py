@@ -3,22 +3,31 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import asyncio
 
-from app.api.routes import health, profile, jobs
+from app.api.routes import health, profile, jobs, metrics
+from app.config import get_settings
 from app.services.job_processor import JobProcessor
+from app.services.reprofile import ReprofileScheduler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Start the job processor
     processor = JobProcessor()
-    task = asyncio.create_task(processor.start_polling())
+    app.state.job_processor = processor
+    tasks = [asyncio.create_task(processor.start_polling())]
+    # Refresh profiles made by older profiler versions in the background
+    if get_settings().reprofile_enabled:
+        tasks.append(asyncio.create_task(ReprofileScheduler().run()))
     yield
-    # Shutdown: Cancel the job processor
-    task.cancel()
-    try:
-        await task
-    except asyncio.CancelledError:
-        pass
+    # Shutdown: Cancel the background tasks and release the process pool
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    processor.shutdown()
 
 
 app = FastAPI(
@@ -41,6 +50,7 @@ app.add_middleware(
 app.include_router(health.router, tags=["health"])
 app.include_router(profile.router, prefix="/api", tags=["profile"])
 app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+app.include_router(metrics.router, tags=["metrics"])
 
 
 @app.get("/")
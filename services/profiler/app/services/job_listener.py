@@ -0,0 +1,69 @@
+import asyncio
+import json
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobListener:
+    """
+    Listens on a Postgres NOTIFY channel and calls ``on_notify`` for each job
+    event, so the job processor wakes as soon as work is queued instead of
+    waiting for its next poll.
+
+    Requires the ``notify_job_queued`` trigger from the ``005_job_notify``
+    migration and a direct Postgres connection string (``DATABASE_URL``).
+    Reconnects with capped backoff if the connection drops.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        on_notify: Callable[[dict], None],
+        channel: str = "jobs_queued",
+        max_backoff: float = 30.0,
+    ):
+        self.dsn = dsn
+        self.on_notify = on_notify
+        self.channel = channel
+        self.max_backoff = max_backoff
+        self.connected = asyncio.Event()
+
+    async def run(self):
+        """Hold a LISTEN connection open until cancelled."""
+        import asyncpg
+
+        backoff = 1.0
+        while True:
+            connection: Optional["asyncpg.Connection"] = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _conn: closed.set())
+                await connection.add_listener(self.channel, self._handle)
+                self.connected.set()
+                backoff = 1.0
+                logger.info(f"Listening for job notifications on '{self.channel}'")
+                # Wake once on (re)connect in case inserts raced the LISTEN.
+                self.on_notify({})
+                await closed.wait()
+                logger.warning("Job notification connection closed, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job listener error: {e}")
+            finally:
+                self.connected.clear()
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _handle(self, _connection, _pid: int, _channel: str, payload: str):
+        try:
+            event = json.loads(payload) if payload else {}
+        except ValueError:
+            event = {}
+        self.on_notify(event)
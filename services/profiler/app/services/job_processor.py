@@ -1,132 +1,322 @@
 import asyncio
 import logging
-import io
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
+from contextlib import ExitStack
+from functools import partial
+from multiprocessing.managers import SyncManager
+from typing import Any, Dict, List, Optional, Set, Tuple
+import httpx
 import polars as pl
 
 from app.services.supabase_client import get_supabase_client
-from app.core.profiler import DataProfiler
+from app.services.job_listener import JobListener
+from app.services.job_state import JobStateWriter, profile_record
+from app.services.excel_reader import read_excel_sheet, read_excel_sheets, sheet_names
+from app.services.json_reader import read_json_file
+from app.services.metrics import metrics
+from app.services.parquet_converter import (
+    CSV_READ_OPTIONS,
+    PARQUET_CONTENT_TYPE,
+    canonical_parquet_path,
+    convert_to_parquet,
+)
+from app.services.scheduler import FairScheduler, is_bulk, job_user
+from app.services.storage_reader import open_dataset_file, remove_temp, upload_file
+from app.core.profiler import DataProfiler, JobCancelled, ProgressReporter
 from app.config import get_settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Errors worth another attempt: storage/network hiccups and crashed workers.
+# Anything else (bad file, unsupported type) fails the job straight away.
+_TRANSIENT_ERRORS = (httpx.TransportError, BrokenProcessPool, ConnectionError, TimeoutError)
+
 
 class JobProcessor:
     """
-    Background job processor that polls the jobs table for pending work.
+    Background job processor for the jobs table.
+
+    When ``DATABASE_URL`` is configured the processor wakes on Postgres
+    ``NOTIFY`` events for newly queued jobs and only falls back to polling every
+    ``job_poll_fallback_seconds``; otherwise it polls every ``poll_interval``.
+
+    Blocking Supabase calls run in worker threads and parsing/profiling runs in a
+    process pool, so the event loop stays free to serve health checks and the API.
+    At most ``max_concurrent_jobs`` jobs are in flight per process; which queued
+    jobs fill free slots is decided by :class:`FairScheduler`.
+
+    Claimed jobs are leased to ``worker_id`` and kept alive by heartbeats, so any
+    replica can requeue the jobs of a replica that died (see ``_reclaim_expired``).
     """
 
-    def __init__(self, poll_interval: int = 5):
+    def __init__(self, poll_interval: int = 5, max_concurrent_jobs: Optional[int] = None):
+        settings = get_settings()
         self.poll_interval = poll_interval
+        self.max_concurrent_jobs = max_concurrent_jobs or settings.max_concurrent_jobs
         self.running = True
+        self.worker_id = settings.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._last_reclaim = 0.0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager: Optional[SyncManager] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._in_flight_users: Dict[str, str] = {}
+        self._in_flight_bulk: Set[str] = set()
+        self._cancel_events: Dict[str, Any] = {}
+        self.scheduler = FairScheduler(
+            per_user_limit=settings.per_user_max_concurrent_jobs,
+            user_weights=settings.scheduler_user_weights,
+        )
+        # Pool workers reserved for inline (fast path) profiles, on top of the job slots.
+        self.inline_slots = asyncio.Semaphore(settings.fast_path_max_concurrent)
+        self._inline_workers = settings.fast_path_max_concurrent
+        self._wakeup = asyncio.Event()
+        self._listener: Optional[JobListener] = None
+        if settings.database_url:
+            self._listener = JobListener(settings.database_url, self._on_notify)
 
     async def start_polling(self):
-        """Start the polling loop."""
-        logger.info("Starting job processor...")
+        """Start the dispatch loop (and the NOTIFY listener when configured)."""
+        logger.info(f"Starting job processor with {self.max_concurrent_jobs} slots...")
 
-        while self.running:
-            try:
-                await self.process_pending_jobs()
-            except Exception as e:
-                logger.error(f"Error processing jobs: {e}")
+        listener_task = asyncio.create_task(self._listener.run()) if self._listener else None
+        try:
+            while self.running:
+                try:
+                    await self.process_pending_jobs()
+                except Exception as e:
+                    logger.error(f"Error processing jobs: {e}")
+
+                await self._wait_for_work()
+        finally:
+            if listener_task is not None:
+                listener_task.cancel()
+            self.shutdown()
+
+    @property
+    def in_flight_count(self) -> int:
+        return len(self._in_flight)
+
+    def wake(self):
+        """Trigger an immediate dispatch pass."""
+        self._wakeup.set()
+
+    async def _wait_for_work(self):
+        timeout = self.poll_interval
+        if self._listener is not None and self._listener.connected.is_set():
+            timeout = get_settings().job_poll_fallback_seconds
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def _on_notify(self, event: dict):
+        if event.get("status") == "cancelled":
+            self.cancel(event.get("id"))
+            return
+        job_type = event.get("job_type")
+        if job_type is None or job_type == "profile":
+            self.wake()
 
-            await asyncio.sleep(self.poll_interval)
+    def cancel(self, job_id: Optional[str]):
+        """Ask an in-flight job to stop at its next checkpoint."""
+        cancel_event = self._cancel_events.get(job_id)
+        if cancel_event is not None:
+            logger.info(f"Cancelling job {job_id}")
+            cancel_event.set()
 
     async def process_pending_jobs(self):
-        """Process all pending jobs."""
-        supabase = get_supabase_client()
+        """Dispatch pending jobs into free slots, in the order chosen by the scheduler."""
+        free_slots = self.max_concurrent_jobs - len(self._in_flight)
+        if free_slots <= 0:
+            return
 
-        # Get queued jobs
-        result = (
-            supabase.table("jobs")
-            .select("*")
-            .eq("status", "queued")
-            .eq("job_type", "profile")
-            .limit(5)
-            .execute()
+        settings = get_settings()
+        supabase = get_supabase_client()
+        await self._reclaim_expired()
+
+        # Get a window of queued jobs whose retry backoff has elapsed plus who is running what, for per-user caps
+        queued_result, running_result = await asyncio.gather(
+            asyncio.to_thread(
+                lambda: supabase.table("jobs")
+                .select("*")
+                .eq("status", "queued")
+                .eq("job_type", "profile")
+                .or_(f"next_attempt_at.is.null,next_attempt_at.lte.{datetime.now(timezone.utc).isoformat()}")
+                .order("priority", desc=True)
+                .order("created_at")
+                .limit(settings.scheduler_window)
+                .execute()
+            ),
+            asyncio.to_thread(
+                lambda: supabase.table("jobs")
+                .select("id, user_id")
+                .eq("status", "running")
+                .eq("job_type", "profile")
+                .execute()
+            ),
         )
 
-        if not result.data:
+        candidates = [job for job in (queued_result.data or []) if job["id"] not in self._in_flight]
+        if not candidates:
             return
 
-        logger.info(f"Found {len(result.data)} pending jobs")
+        running = {job["id"]: job_user(job) for job in (running_result.data or [])}
+        running.update(self._in_flight_users)
+        running_by_user = Counter(running.values())
 
-        for job in result.data:
-            await self.process_job(job)
+        # Keep bulk re-profiles out of the reserved slots so interactive jobs
+        # never wait behind them (a single-slot worker still runs them).
+        bulk_capacity = max(1, self.max_concurrent_jobs - settings.bulk_reserved_slots)
+        bulk_slots = max(0, bulk_capacity - len(self._in_flight_bulk))
 
-    async def process_job(self, job: dict):
-        """Process a single profiling job."""
-        job_id = job["id"]
-        payload = job.get("payload") or {}
-        version_id = payload.get("version_id")
-        if not version_id:
-            supabase = get_supabase_client()
-            supabase.table("jobs").update({
-                "status": "failed",
-                "error_message": "Missing version_id in job payload",
-                "progress": 100,
-            }).eq("id", job_id).execute()
-            return
+        selected = self.scheduler.select(candidates, free_slots, running_by_user, bulk_slots)
+        logger.info(f"Found {len(candidates)} pending jobs, dispatching {len(selected)}")
+
+        for job in selected:
+            self.scheduler.record_dispatch(job)
+            self._dispatch(job)
 
+    async def _reclaim_expired(self):
+        """Requeue jobs whose worker stopped heartbeating (at most every half lease)."""
+        settings = get_settings()
+        now = time.monotonic()
+        if now - self._last_reclaim < settings.job_lease_seconds / 2:
+            return
+        self._last_reclaim = now
         supabase = get_supabase_client()
-        version_result = (
-            supabase.table("dataset_versions")
-            .select("*, dataset:datasets(*, project:projects(*))")
-            .eq("id", version_id)
-            .single()
-            .execute()
-        )
-        version = version_result.data
-        if not version:
-            supabase.table("jobs").update({
-                "status": "failed",
-                "error_message": "Dataset version not found",
-                "progress": 100,
-            }).eq("id", job_id).execute()
+        try:
+            result = await asyncio.to_thread(
+                lambda: supabase.rpc("reclaim_expired_jobs", {
+                    "p_job_type": "profile",
+                    "p_base_seconds": settings.job_retry_base_seconds,
+                    "p_max_seconds": settings.job_retry_max_seconds,
+                }).execute()
+            )
+        except Exception as e:
+            logger.warning(f"Reclaiming expired jobs failed: {e}")
             return
+        if result.data:
+            logger.info(f"Reclaimed {result.data} jobs with expired leases")
 
-        dataset = version.get("dataset") or {}
-        file_path = version.get("storage_path")
-        file_type = dataset.get("file_type", "")
-        dataset_name = dataset.get("name") or "Dataset"
-
-        logger.info(f"Processing job {job_id} for dataset version {version_id}")
+    def _dispatch(self, job: dict):
+        job_id = job["id"]
+        task = asyncio.create_task(self.process_job(job))
+        self._in_flight[job_id] = task
+        self._in_flight_users[job_id] = job_user(job)
+        if is_bulk(job):
+            self._in_flight_bulk.add(job_id)
+        started = time.monotonic()
+        task.add_done_callback(lambda done: self._on_job_done(job_id, done, started))
+
+    def _on_job_done(self, job_id: str, task: asyncio.Task, started: float):
+        outcome = "error" if task.cancelled() or task.exception() else task.result()
+        metrics.inc("datacanvas_jobs_processed_total", job_type="profile", outcome=outcome)
+        if outcome != "skipped":
+            metrics.observe("datacanvas_job_duration_seconds", time.monotonic() - started, job_type="profile")
+        self._in_flight.pop(job_id, None)
+        self._in_flight_users.pop(job_id, None)
+        self._in_flight_bulk.discard(job_id)
+        self._cancel_events.pop(job_id, None)
+        # A slot just freed up; look for more work right away.
+        self.wake()
+
+    async def process_job(self, job: dict) -> str:
+        """
+        Process a single profiling job. Returns the outcome: ``completed``,
+        ``failed``, ``retried``, ``cancelled`` or ``skipped``.
+        """
+        job_id = job["id"]
+        payload = job.get("payload") or {}
+        version_id = payload.get("version_id")
+        # Set on cancellation or lease loss; checked by the worker at every checkpoint
+        cancel_event = self._get_manager().Event()
+        self._cancel_events[job_id] = cancel_event
+        state = JobStateWriter(job_id, version_id, worker_id=self.worker_id, on_lease_lost=cancel_event.set)
+        # Claim the job (and mark the version as profiling) before anything
+        # else: the terminal RPCs only act on a job running under our lease.
+        if not await state.start():
+            logger.info(f"Job {job_id} was already claimed, skipping")
+            return "skipped"
 
         try:
-            # Update job status to running
-            supabase.table("jobs").update({
-                "status": "running",
-                "progress": 10,
-                "started_at": datetime.now(timezone.utc).isoformat(),
-            }).eq("id", job_id).execute()
-
-            # Update version status
-            supabase.table("dataset_versions").update({
-                "status": "profiling"
-            }).eq("id", version_id).execute()
+            if not version_id:
+                raise ValueError("Missing version_id in job payload")
+
+            supabase = get_supabase_client()
+            version_result = await asyncio.to_thread(
+                lambda: supabase.table("dataset_versions")
+                .select("*, dataset:datasets(*, project:projects(*))")
+                .eq("id", version_id)
+                .single()
+                .execute()
+            )
+            version = version_result.data
+            if not version:
+                state.version_id = None
+                raise ValueError("Dataset version not found")
+
+            dataset = version.get("dataset") or {}
+            file_path = version.get("storage_path")
+            file_type = dataset.get("file_type", "")
+            dataset_name = dataset.get("name") or "Dataset"
+            parquet_path = version.get("parquet_path")
+            if parquet_path and _normalize_file_type(file_type) not in ["xlsx", "xls"]:
+                # Re-profiles read the canonical copy; workbooks keep the original
+                # so every sheet is still listed.
+                file_path, file_type = parquet_path, "parquet"
+
+            logger.info(f"Processing job {job_id} for dataset version {version_id}")
 
             settings = get_settings()
             bucket = settings.supabase_datasets_bucket
             logger.info(f"Downloading file from: {bucket}/{file_path}")
             if not file_path:
                 raise ValueError("Dataset version missing storage_path")
-            file_bytes = supabase.storage.from_(bucket).download(file_path)
-            df, sampled_input, sample_note = self._read_dataset(file_bytes, file_type)
-
-            profiler = DataProfiler(max_sample_size=settings.max_sample_size)
-
-            supabase.table("jobs").update({"progress": 50}).eq("id", job_id).execute()
-
-            profile_data = profiler.profile_dataframe(df)
-            if sampled_input:
-                warnings = profile_data.get("warnings") or []
-                warnings.append({
-                    "type": "sampling",
-                    "severity": "medium",
-                    "message": sample_note or "Profile computed on a sample due to file size. Results are approximate.",
-                })
-                profile_data["warnings"] = warnings
+            with ExitStack() as stack:
+                # Download (or hit the dataset cache) in a thread; the file stays
+                # pinned in the cache until the worker is done with it.
+                local_path = await asyncio.to_thread(
+                    stack.enter_context, open_dataset_file(bucket, file_path)
+                )
+                if cancel_event.is_set():
+                    raise JobCancelled("Cancelled during download")
+
+                # The worker reports stage progress through a managed queue
+                progress_queue = self._get_manager().Queue()
+                forwarder = asyncio.create_task(self._forward_progress(progress_queue, state))
+                try:
+                    loop = asyncio.get_running_loop()
+                    profile_data, sample_data = await loop.run_in_executor(
+                        self._get_executor(), profile_file, local_path, file_type, progress_queue, cancel_event
+                    )
+                finally:
+                    forwarder.cancel()
+
+                if settings.parquet_conversion_enabled and not parquet_path:
+                    if cancel_event.is_set():
+                        raise JobCancelled("Cancelled before conversion")
+                    state.progress(96, detail={"stage": "converting"})
+                    parquet_path = await self._write_canonical_parquet(local_path, file_type, file_path)
+                    if parquet_path:
+                        await asyncio.to_thread(
+                            lambda: supabase.table("dataset_versions")
+                            .update({"parquet_path": parquet_path})
+                            .eq("id", version_id)
+                            .execute()
+                        )
+
             profile_data["dataset"] = {
                 "name": dataset_name,
                 "version": version.get("version_number", 1),
@@ -134,98 +324,244 @@ class JobProcessor:
                 "uploadedAt": version.get("created_at"),
             }
 
-            # Update progress
-            supabase.table("jobs").update({"progress": 80}).eq("id", job_id).execute()
-
-            # Store profile
-            schema_info = profile_data.get("schema", {}).get("columns", [])
-            statistics = profile_data.get("stats", {})
-            supabase.table("dataset_profiles").upsert({
-                "version_id": version_id,
-                "schema_info": schema_info,
-                "statistics": statistics,
-                "correlations": profile_data.get("correlations"),
-                "missing_values": profile_data.get("missing"),
-                "warnings": profile_data.get("warnings", []),
-                "sample_data": df.head(50).to_dicts(),
-                "computed_at": datetime.now(timezone.utc).isoformat(),
-            }, on_conflict="version_id").execute()
-
-            # Update dataset version
-            supabase.table("dataset_versions").update({
-                "status": "ready",
-                "row_count": statistics.get("row_count"),
-                "column_count": statistics.get("column_count"),
-                "error_message": None,
-            }).eq("id", version_id).execute()
-
-            # Mark job complete
-            supabase.table("jobs").update({
-                "status": "completed",
-                "progress": 100,
-                "completed_at": datetime.now(timezone.utc).isoformat(),
-            }).eq("id", job_id).execute()
+            # Store profile, mark the version ready and the job complete
+            await state.complete(profile_record(profile_data, sample_data))
 
             logger.info(f"Job {job_id} completed successfully")
+            return "completed"
+
+        except JobCancelled as e:
+            # The row was already marked cancelled (or handed to another worker);
+            # just stop writing to it. Temp files and the pool slot are released.
+            logger.info(f"Job {job_id} stopped: {e}")
+            await state.abandon()
+            return "cancelled"
+
+        except _TRANSIENT_ERRORS as e:
+            if isinstance(e, BrokenProcessPool):
+                # A worker process died (e.g. OOM-killed); start a fresh pool.
+                self._reset_executor()
+            outcome = await state.retry(f"{type(e).__name__}: {e}")
+            logger.warning(f"Job {job_id} hit a transient error ({e}); {outcome or 'abandoned'}")
+            return "retried" if outcome == "queued" else "failed"
 
         except Exception as e:
             logger.error(f"Job {job_id} failed: {e}")
-
-            # Mark as failed
-            supabase.table("jobs").update({
-                "status": "failed",
-                "error_message": str(e),
-            }).eq("id", job_id).execute()
-
-            supabase.table("dataset_versions").update({
-                "status": "error",
-                "error_message": str(e),
-            }).eq("id", version_id).execute()
+            await state.fail(str(e))
+            return "failed"
+
+    async def _write_canonical_parquet(self, local_path: str, file_type: str, storage_path: str) -> Optional[str]:
+        """
+        Convert a dataset to its canonical Parquet copy in the process pool and
+        upload it next to the original. Returns the copy's storage path, or None
+        when there is nothing to convert or the conversion failed; readers then
+        keep using the original file, so a failure here never fails the job.
+        """
+        fd, parquet_local = tempfile.mkstemp(prefix="datacanvas-", suffix=".parquet")
+        os.close(fd)
+        try:
+            loop = asyncio.get_running_loop()
+            rows = await loop.run_in_executor(
+                self._get_executor(), convert_to_parquet, local_path, file_type, parquet_local
+            )
+            if rows is None:
+                return None
+            parquet_path = canonical_parquet_path(storage_path)
+            bucket = get_settings().supabase_datasets_bucket
+            await asyncio.to_thread(upload_file, bucket, parquet_path, parquet_local, PARQUET_CONTENT_TYPE)
+            logger.info(f"Wrote canonical Parquet copy {parquet_path} ({rows} rows)")
+            return parquet_path
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset_executor()
+            logger.warning(f"Parquet conversion of {storage_path} failed: {e}")
+            return None
+        finally:
+            remove_temp(parquet_local)
+
+    async def _forward_progress(self, progress_queue, state: JobStateWriter):
+        """Relay worker progress events to the job row (10% claimed .. 95% profiled)."""
+        while True:
+            event = await asyncio.to_thread(_next_event, progress_queue)
+            if event is not None:
+                state.progress(10 + int(event.get("fraction", 0) * 85), detail=event)
+
+    async def profile_inline(self, local_path: str, file_type: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Profile a small file for ``POST /api/profile`` in the process pool.
+        Callers hold one of :attr:`inline_slots` while this runs, so inline
+        work never takes more than its reserved share of the pool.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), profile_file, local_path, file_type)
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
 
     def stop(self):
         """Stop the polling loop."""
         self.running = False
 
-    def _read_dataset(self, file_bytes: bytes, file_type: str) -> tuple[pl.DataFrame, bool, str | None]:
-        file_type = (file_type or "").lower()
-        if "/" in file_type:
-            file_type = file_type.split("/")[-1]
-        buffer = io.BytesIO(file_bytes)
-        settings = get_settings()
-        max_file_size_bytes = settings.max_file_size_mb * 1024 * 1024
-        is_large = len(file_bytes) > max_file_size_bytes
-        head_rows = settings.head_sample_size
-        sample_note = None
-        if file_type in ["csv", "txt"]:
-            if is_large:
-                sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
-                return pl.read_csv(buffer, n_rows=head_rows, infer_schema_length=1000, try_parse_dates=True, ignore_errors=True), True, sample_note
-            return pl.read_csv(buffer, infer_schema_length=1000, try_parse_dates=True, ignore_errors=True), False, None
-        if file_type in ["tsv"]:
-            if is_large:
-                sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
-                return pl.read_csv(buffer, separator="\t", n_rows=head_rows, infer_schema_length=1000, try_parse_dates=True, ignore_errors=True), True, sample_note
-            return pl.read_csv(buffer, separator="\t", infer_schema_length=1000, try_parse_dates=True, ignore_errors=True), False, None
-        if file_type in ["json", "ndjson"]:
-            if is_large:
-                sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
-                return pl.read_json(buffer, n_rows=head_rows), True, sample_note
-            return pl.read_json(buffer), False, None
-        if file_type in ["parquet"]:
-            if is_large:
-                sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
-                try:
-                    return pl.read_parquet(buffer, n_rows=head_rows), True, sample_note
-                except TypeError:
-                    # Fallback for older polars without n_rows support
-                    return pl.read_parquet(buffer).head(head_rows), True, sample_note
-            return pl.read_parquet(buffer), False, None
-        if file_type in ["xlsx", "xls"]:
-            import pandas as pd
-            if is_large:
-                sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
-                pdf = pd.read_excel(buffer, nrows=head_rows)
-                return pl.from_pandas(pdf), True, sample_note
-            pdf = pd.read_excel(buffer)
-            return pl.from_pandas(pdf), False, None
-        raise ValueError(f"Unsupported file type: {file_type}")
+    def shutdown(self):
+        """Stop polling and release the process pool."""
+        self.stop()
+        self._reset_executor()
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def _reset_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_manager(self) -> SyncManager:
+        if self._manager is None:
+            self._manager = multiprocessing.get_context("spawn").Manager()
+        return self._manager
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Spawned (not forked) workers: polars keeps a native thread pool that
+        # does not survive fork() safely.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_concurrent_jobs + self._inline_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+
+def _next_event(progress_queue, timeout: float = 0.5) -> Optional[Dict[str, Any]]:
+    try:
+        return progress_queue.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+
+def profile_file(
+    local_path: str,
+    file_type: str,
+    progress_queue=None,
+    cancel_event=None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Parse and profile a downloaded dataset file. Runs inside a process pool worker.
+    Progress events are put on ``progress_queue`` when one is given; once
+    ``cancel_event`` is set the run stops at its next checkpoint with
+    :class:`JobCancelled`.
+    """
+    settings = get_settings()
+    reporter = ProgressReporter(
+        progress_queue.put if progress_queue is not None else None,
+        cancel_check=cancel_event.is_set if cancel_event is not None else None,
+    )
+    reporter.stage("reading")
+    df, sampled_input, sample_note = _read_dataset(local_path, file_type, reporter)
+
+    profiler = DataProfiler(max_sample_size=settings.max_sample_size, reporter=reporter)
+    profile_data = profiler.profile_dataframe(df)
+    if sampled_input:
+        warnings = profile_data.get("warnings") or []
+        warnings.append({
+            "type": "sampling",
+            "severity": "medium",
+            "message": sample_note or "Profile computed on a sample due to file size. Results are approximate.",
+        })
+        profile_data["warnings"] = warnings
+    if _normalize_file_type(file_type) in ["xlsx", "xls"]:
+        profile_data.setdefault("stats", {})["sheets"] = sheet_names(local_path)
+
+    # Round-trip through polars' JSON writer so dates and decimals are RPC-safe.
+    return profile_data, json.loads(df.head(50).write_json(row_oriented=True))
+
+
+def _estimate_row_count(path: str, probe_bytes: int = 1024 * 1024) -> Optional[int]:
+    """Estimate line count from the average line length of the first ``probe_bytes``."""
+    with open(path, "rb") as handle:
+        head = handle.read(probe_bytes)
+    lines = head.count(b"\n")
+    if not lines:
+        return None
+    return int(os.path.getsize(path) / (len(head) / lines))
+
+
+def _read_csv(path: str, reporter: Optional[ProgressReporter], **options) -> pl.DataFrame:
+    """
+    Read a CSV; with a reporter, stream it in batches and report rows scanned,
+    checking for cancellation between batches.
+    """
+    if reporter is None or (reporter.callback is None and reporter.cancel_check is None):
+        return pl.read_csv(path, **options)
+    estimated = _estimate_row_count(path)
+    reader = pl.read_csv_batched(path, **options)
+    frames: List[pl.DataFrame] = []
+    scanned = 0
+    while True:
+        batches = reader.next_batches(4)
+        if not batches:
+            break
+        frames.extend(batches)
+        scanned += sum(batch.height for batch in batches)
+        reporter.rows(scanned, estimated)
+    if not frames:
+        return pl.read_csv(path, **options)
+    return pl.concat(frames, how="vertical")
+
+
+def _normalize_file_type(file_type: str) -> str:
+    file_type = (file_type or "").lower()
+    return file_type.split("/")[-1]
+
+
+def _read_dataset(
+    path: str,
+    file_type: str,
+    reporter: Optional[ProgressReporter] = None,
+) -> tuple[pl.DataFrame, bool, str | None]:
+    """Read a local dataset file with path-based (memory-mapped) readers."""
+    file_type = _normalize_file_type(file_type)
+    settings = get_settings()
+    max_file_size_bytes = settings.max_file_size_mb * 1024 * 1024
+    is_large = os.path.getsize(path) > max_file_size_bytes
+    head_rows = settings.head_sample_size
+    sample_note = None
+    if file_type in ["csv", "txt"]:
+        if is_large:
+            sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
+            return pl.read_csv(path, n_rows=head_rows, **CSV_READ_OPTIONS), True, sample_note
+        return _read_csv(path, reporter, **CSV_READ_OPTIONS), False, None
+    if file_type in ["tsv"]:
+        if is_large:
+            sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
+            return pl.read_csv(path, separator="\t", n_rows=head_rows, **CSV_READ_OPTIONS), True, sample_note
+        return _read_csv(path, reporter, separator="\t", **CSV_READ_OPTIONS), False, None
+    if file_type in ["json", "ndjson", "jsonl"]:
+        if is_large:
+            sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
+            return read_json_file(path, n_rows=head_rows), True, sample_note
+        on_rows = None
+        if reporter is not None and (reporter.callback is not None or reporter.cancel_check is not None):
+            estimated = _estimate_row_count(path)
+            on_rows = partial(reporter.rows, estimated=estimated)
+        return read_json_file(path, on_rows=on_rows), False, None
+    if file_type in ["parquet"]:
+        if is_large:
+            sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
+            try:
+                return pl.read_parquet(path, n_rows=head_rows, memory_map=True), True, sample_note
+            except TypeError:
+                # Fallback for older polars without n_rows support
+                return pl.read_parquet(path, memory_map=True).head(head_rows), True, sample_note
+        return pl.read_parquet(path, memory_map=True), False, None
+    if file_type in ["xlsx", "xls"]:
+        if is_large:
+            sample_note = f"Profile computed on first {head_rows} rows (file size exceeds {settings.max_file_size_mb}MB)."
+            return read_excel_sheet(path, n_rows=head_rows), True, sample_note
+        # Parse every sheet in parallel so each one lands in the Arrow cache;
+        # the first sheet is the dataset's default view.
+        sheets = read_excel_sheets(path)
+        if not sheets:
+            raise ValueError("Workbook has no sheets")
+        return next(iter(sheets.values())), False, None
+    raise ValueError(f"Unsupported file type: {file_type}")
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import get_settings
+from app.core.profiler import PROFILER_VERSION
+from app.services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+def profile_record(profile_data: Dict[str, Any], sample_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shape profiler output as the ``p_profile`` payload of ``complete_profile_job``."""
+    return {
+        "schema_info": profile_data.get("schema", {}).get("columns", []),
+        "statistics": profile_data.get("stats", {}),
+        "column_stats": _finite(profile_data.get("columns", [])),
+        "correlations": profile_data.get("correlations"),
+        "missing_values": profile_data.get("missing"),
+        "warnings": profile_data.get("warnings", []),
+        "sample_data": sample_data,
+        "profiler_version": PROFILER_VERSION,
+    }
+
+
+def _finite(value: Any) -> Any:
+    """Replace NaN/inf (invalid in JSON) with None, recursively."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_finite(item) for item in value]
+    return value
+
+
+class JobStateWriter:
+    """
+    Owns all writes to a single job's row.
+
+    Progress updates are coalesced: at most one write every
+    ``progress_write_interval_ms``, always carrying the latest value. Start,
+    completion and failure go through the ``*_profile_job`` RPCs (migration
+    ``006_job_state_rpc``) so the job, its dataset version and the profile are
+    updated in one round-trip and one transaction.
+
+    A started job is held under a lease owned by ``worker_id`` and renewed by a
+    heartbeat every third of ``job_lease_seconds`` (migration ``009_job_leases``).
+    If the lease is lost (the job was reclaimed by another worker or cancelled),
+    this writer stops touching the row and calls ``on_lease_lost``. The
+    heartbeat only notices that periodically, so the terminal RPCs check the
+    lease themselves (migration ``021_job_terminal_guards``): they change
+    nothing unless the job is still running under ``worker_id``.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        version_id: Optional[str],
+        min_interval_ms: Optional[int] = None,
+        worker_id: Optional[str] = None,
+        on_lease_lost: Optional[Callable[[], Any]] = None,
+    ):
+        settings = get_settings()
+        if min_interval_ms is None:
+            min_interval_ms = settings.progress_write_interval_ms
+        self.job_id = job_id
+        self.version_id = version_id
+        self.worker_id = worker_id
+        self.lease_seconds = settings.job_lease_seconds
+        self.lease_lost = False
+        self.on_lease_lost = on_lease_lost
+        self.min_interval = min_interval_ms / 1000
+        self._pending_progress: Optional[int] = None
+        self._pending_detail: Optional[Dict[str, Any]] = None
+        self._last_progress: Optional[int] = None
+        self._last_write = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._writing = False
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> bool:
+        """Claim the job under a lease. Returns False if it is no longer claimable."""
+        result = await self._rpc("start_profile_job", {
+            "p_job_id": self.job_id,
+            "p_version_id": self.version_id,
+            "p_worker_id": self.worker_id,
+            "p_lease_seconds": self.lease_seconds,
+        })
+        self._last_progress = 10
+        self._last_write = time.monotonic()
+        if not result.data:
+            return False
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        return True
+
+    def progress(self, value: int, detail: Optional[Dict[str, Any]] = None):
+        """
+        Record progress (and optionally a stage detail dict for ``progress_detail``).
+        The write is throttled and runs in the background.
+        """
+        if self.lease_lost:
+            return
+        value = max(0, min(int(value), 99))
+        if detail is None and (value == self._last_progress or value == self._pending_progress):
+            return
+        self._pending_progress = value
+        if detail is not None:
+            self._pending_detail = detail
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def complete(self, profile: Dict[str, Any]) -> Optional[str]:
+        """
+        Store the profile and mark the version ready and the job completed.
+        Returns the profile id, or None when the job is no longer ours.
+        """
+        await self._settle_flush()
+        if self.lease_lost:
+            logger.warning(f"Job {self.job_id} lost its lease; dropping result")
+            return None
+        result = await self._rpc("complete_profile_job", {
+            "p_job_id": self.job_id,
+            "p_version_id": self.version_id,
+            "p_profile": profile,
+            "p_worker_id": self.worker_id,
+        })
+        if not result.data:
+            logger.warning(f"Job {self.job_id} is no longer running under this worker; result dropped")
+        return result.data
+
+    async def fail(self, error: str):
+        """Mark the job failed and its dataset version errored, if the job is still ours."""
+        await self._settle_flush()
+        if self.lease_lost:
+            return
+        await self._rpc("fail_profile_job", {
+            "p_job_id": self.job_id,
+            "p_version_id": self.version_id,
+            "p_error": error,
+            "p_worker_id": self.worker_id,
+        })
+
+    async def retry(self, error: str) -> Optional[str]:
+        """
+        Requeue the job after a transient error with exponential backoff, or fail
+        it once it is out of attempts. Returns ``"queued"`` or ``"failed"``, or
+        None when the job is no longer ours.
+        """
+        await self._settle_flush()
+        if self.lease_lost:
+            return None
+        settings = get_settings()
+        result = await self._rpc("retry_or_fail_job", {
+            "p_job_id": self.job_id,
+            "p_error": error,
+            "p_base_seconds": settings.job_retry_base_seconds,
+            "p_max_seconds": settings.job_retry_max_seconds,
+            "p_worker_id": self.worker_id,
+        })
+        return result.data
+
+    async def abandon(self):
+        """Stop heartbeating and writing progress, leaving the row as it is."""
+        await self._settle_flush()
+
+    async def _heartbeat(self):
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                result = await self._rpc("heartbeat_job", {
+                    "p_job_id": self.job_id,
+                    "p_worker_id": self.worker_id,
+                    "p_lease_seconds": self.lease_seconds,
+                })
+            except Exception as e:
+                # Keep trying; the lease outlives a few missed beats.
+                logger.warning(f"Heartbeat for job {self.job_id} failed: {e}")
+                continue
+            if not result.data:
+                logger.warning(f"Job {self.job_id} is no longer leased to this worker")
+                self.lease_lost = True
+                if self.on_lease_lost is not None:
+                    self.on_lease_lost()
+                return
+
+    async def _flush_later(self):
+        # Loops so progress reported while a write was in flight is not lost.
+        while self._pending_progress is not None:
+            delay = self.min_interval - (time.monotonic() - self._last_write)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            value = self._pending_progress
+            if value is None:
+                return
+            update: Dict[str, Any] = {"progress": value}
+            if self._pending_detail is not None:
+                update["progress_detail"] = self._pending_detail
+            self._pending_progress = None
+            self._pending_detail = None
+            self._last_write = time.monotonic()
+            self._writing = True
+            try:
+                supabase = get_supabase_client()
+                await asyncio.to_thread(
+                    lambda: supabase.table("jobs").update(update).eq("id", self.job_id).execute()
+                )
+                self._last_progress = value
+            except Exception as e:
+                logger.warning(f"Progress update for job {self.job_id} failed: {e}")
+            finally:
+                self._writing = False
+
+    async def _settle_flush(self):
+        # Stop heartbeating and drop throttled progress, but let a write already
+        # on the wire land first so it cannot overwrite the terminal state.
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        self._pending_progress = None
+        self._pending_detail = None
+        task = self._flush_task
+        if task is None or task.done():
+            return
+        if self._writing:
+            await task
+        else:
+            task.cancel()
+
+    async def _rpc(self, fn: str, params: Dict[str, Any]):
+        supabase = get_supabase_client()
+        return await asyncio.to_thread(lambda: supabase.rpc(fn, params).execute())
@@ -0,0 +1,57 @@
+from typing import Optional
+
+import polars as pl
+
+from app.services.excel_reader import read_excel_sheet
+from app.services.json_reader import read_json_file
+
+# Options every service's CSV reads should agree on, so the canonical copy
+# has the same types the profile describes.
+CSV_READ_OPTIONS = {"infer_schema_length": 1000, "try_parse_dates": True, "ignore_errors": True}
+
+PARQUET_COMPRESSION = "zstd"
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+# ~128k rows per row group: small enough for useful min/max pruning, large
+# enough that column chunks compress well and the footer stays small.
+PARQUET_ROW_GROUP_SIZE = 128 * 1024
+
+CONVERTIBLE_TYPES = {"csv", "txt", "tsv", "json", "ndjson", "jsonl", "xlsx", "xls"}
+
+
+def canonical_parquet_path(storage_path: str) -> str:
+    """Storage path of a version's canonical Parquet copy, next to the original."""
+    return f"{storage_path}.parquet"
+
+
+def convert_to_parquet(local_path: str, file_type: str, destination: str) -> Optional[int]:
+    """
+    Write a typed, zstd-compressed Parquet copy of a dataset file to
+    ``destination``. Returns the row count, or None when the format has no
+    conversion (Parquet uploads are already canonical). Runs inside a process
+    pool worker.
+
+    CSV/TSV stream from ``scan_csv`` into ``sink_parquet`` without materialising
+    the file; JSON and Excel (the first sheet) are read whole, as the profiler
+    does. Column statistics are written so readers can prune row groups.
+    """
+    file_type = (file_type or "").lower().split("/")[-1]
+    if file_type not in CONVERTIBLE_TYPES:
+        return None
+
+    options = {
+        "compression": PARQUET_COMPRESSION,
+        "row_group_size": PARQUET_ROW_GROUP_SIZE,
+        "statistics": True,
+    }
+    if file_type in ["csv", "txt", "tsv"]:
+        separator = "\t" if file_type == "tsv" else ","
+        lazy = pl.scan_csv(local_path, separator=separator, **CSV_READ_OPTIONS)
+        lazy.sink_parquet(destination, **options)
+        return pl.scan_parquet(destination).select(pl.count()).collect().item()
+
+    if file_type in ["json", "ndjson", "jsonl"]:
+        df = read_json_file(local_path)
+    else:
+        df = read_excel_sheet(local_path)
+    df.write_parquet(destination, **options)
+    return df.height
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+
+from app.config import get_settings
+from app.core.profiler import PROFILER_VERSION
+from app.services.scheduler import JOB_PRIORITY_BULK
+from app.services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+class ReprofileScheduler:
+    """
+    Refreshes profiles computed by an older ``PROFILER_VERSION``.
+
+    Every ``reprofile_interval_seconds`` it asks the database to queue up to
+    ``reprofile_batch_size`` bulk-priority profile jobs, never letting more than
+    ``reprofile_max_pending`` of them wait at once. Bulk jobs are kept out of
+    the worker slots reserved for interactive work, and the files they read go
+    through the shared dataset cache like any other job. A version whose
+    re-profile failed is skipped for ``reprofile_failure_backoff_seconds``, so
+    persistent failures cannot take every batch. Running it on several
+    replicas is safe: identical jobs are coalesced by ``enqueue_job``.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.interval = settings.reprofile_interval_seconds
+        self.batch_size = settings.reprofile_batch_size
+        self.max_pending = settings.reprofile_max_pending
+        self.failure_backoff = settings.reprofile_failure_backoff_seconds
+        self.running = True
+
+    async def run(self):
+        logger.info(f"Re-profile scheduler started for profiler version {PROFILER_VERSION}")
+        while self.running:
+            try:
+                enqueued = await self.enqueue_batch()
+                if enqueued:
+                    logger.info(f"Queued {enqueued} re-profile jobs")
+            except Exception as e:
+                logger.warning(f"Re-profile scheduling failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def enqueue_batch(self) -> int:
+        """Queue one batch of re-profile jobs. Returns how many were queued."""
+        supabase = get_supabase_client()
+        result = await asyncio.to_thread(
+            lambda: supabase.rpc("enqueue_reprofile_jobs", {
+                "p_profiler_version": PROFILER_VERSION,
+                "p_limit": self.batch_size,
+                "p_max_pending": self.max_pending,
+                "p_priority": JOB_PRIORITY_BULK,
+                "p_failure_backoff_seconds": self.failure_backoff,
+            }).execute()
+        )
+        return int(result.data or 0)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,128 @@
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+ANONYMOUS_USER = "anonymous"
+
+# Mirrors the API's JOB_PRIORITY_* levels; jobs at or below BULK are background work.
+JOB_PRIORITY_BULK = 10
+
+
+def is_bulk(job: dict) -> bool:
+    return (job.get("priority") or 0) <= JOB_PRIORITY_BULK
+
+
+def job_user(job: dict) -> str:
+    return job.get("user_id") or ANONYMOUS_USER
+
+
+def _created_ts(job: dict) -> float:
+    created_at = job.get("created_at")
+    if not created_at:
+        return time.time()
+    try:
+        return datetime.fromisoformat(str(created_at).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return time.time()
+
+
+class FairScheduler:
+    """
+    Decides which queued jobs get the free worker slots.
+
+    - Higher ``priority`` always goes first, so small uploads and previews
+      overtake bulk re-profiles.
+    - Within a priority level, users are served by weighted fair queuing: each
+      dispatch advances the user's virtual time by ``1 / weight`` and the user
+      with the lowest virtual time goes next. Users returning from idle start at
+      the current virtual time, so they cannot bank credit.
+    - No user runs more than ``per_user_limit`` jobs at once.
+    - Bulk jobs (priority <= ``JOB_PRIORITY_BULK``) only fill ``bulk_slots``.
+
+    Queue wait (``created_at`` to dispatch) is recorded per user for tuning.
+    """
+
+    def __init__(
+        self,
+        per_user_limit: int = 1,
+        user_weights: Optional[Dict[str, float]] = None,
+        wait_samples: int = 1000,
+    ):
+        self.per_user_limit = per_user_limit
+        self.user_weights = user_weights or {}
+        self._virtual_time: Dict[str, float] = {}
+        self._clock = 0.0
+        self._waits: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=wait_samples))
+
+    def select(
+        self,
+        candidates: List[dict],
+        free_slots: int,
+        running_by_user: Dict[str, int],
+        bulk_slots: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Pick up to ``free_slots`` jobs from ``candidates`` in dispatch order, of
+        which at most ``bulk_slots`` bulk jobs (unlimited when None).
+        """
+        queues: Dict[str, List[dict]] = defaultdict(list)
+        for job in candidates:
+            queues[job_user(job)].append(job)
+        for jobs in queues.values():
+            jobs.sort(key=lambda job: (-(job.get("priority") or 0), _created_ts(job)))
+
+        running = dict(running_by_user)
+        selected: List[dict] = []
+        while len(selected) < free_slots:
+            bulk_allowed = bulk_slots is None or bulk_slots > 0
+            heads = [
+                (user, jobs[0])
+                for user, jobs in queues.items()
+                if jobs and running.get(user, 0) < self.per_user_limit and (bulk_allowed or not is_bulk(jobs[0]))
+            ]
+            if not heads:
+                break
+            top_priority = max(job.get("priority") or 0 for _, job in heads)
+            user, job = min(
+                (head for head in heads if (head[1].get("priority") or 0) == top_priority),
+                key=lambda head: (self._start_time(head[0]), _created_ts(head[1])),
+            )
+            queues[user].pop(0)
+            running[user] = running.get(user, 0) + 1
+            self._charge(user)
+            selected.append(job)
+            if bulk_slots is not None and is_bulk(job):
+                bulk_slots -= 1
+        return selected
+
+    def record_dispatch(self, job: dict, now: Optional[float] = None):
+        """Record how long ``job`` waited in the queue."""
+        now = time.time() if now is None else now
+        self._waits[job_user(job)].append(max(0.0, now - _created_ts(job)))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Queue-wait percentiles (seconds) per user over recent dispatches."""
+        result = {}
+        for user, waits in self._waits.items():
+            if not waits:
+                continue
+            values = np.fromiter(waits, dtype=float)
+            result[user] = {
+                "count": int(values.size),
+                "p50": float(np.percentile(values, 50)),
+                "p90": float(np.percentile(values, 90)),
+                "p99": float(np.percentile(values, 99)),
+                "max": float(values.max()),
+            }
+        return result
+
+    def _start_time(self, user: str) -> float:
+        return max(self._virtual_time.get(user, 0.0), self._clock)
+
+    def _charge(self, user: str):
+        start = self._start_time(user)
+        self._clock = start
+        self._virtual_time[user] = start + 1.0 / max(self.user_weights.get(user, 1.0), 1e-6)
@@ -0,0 +1,23 @@
+-- =====================================================
+-- JOB NOTIFICATIONS
+-- Wakes job workers listening on the "jobs_queued" channel
+-- (LISTEN jobs_queued) as soon as a job becomes queued.
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION public.notify_job_queued()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM pg_notify(
+    'jobs_queued',
+    json_build_object('id', NEW.id, 'job_type', NEW.job_type)::text
+  );
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS on_job_queued ON public.jobs;
+CREATE TRIGGER on_job_queued
+  AFTER INSERT OR UPDATE OF status ON public.jobs
+  FOR EACH ROW
+  WHEN (NEW.status = 'queued')
+  EXECUTE FUNCTION public.notify_job_queued();
@@ -0,0 +1,95 @@
+-- =====================================================
+-- JOB STATE RPCs
+-- Collapse the per-job status writes of the profiler into
+-- single-transaction calls (supabase.rpc(...)).
+-- =====================================================
+
+-- Claim a queued profile job and mark its version as profiling.
+-- Returns FALSE when another worker already claimed the job.
+CREATE OR REPLACE FUNCTION public.start_profile_job(p_job_id UUID, p_version_id UUID)
+RETURNS BOOLEAN AS $$
+BEGIN
+  UPDATE public.jobs
+  SET status = 'running', progress = 10, started_at = NOW()
+  WHERE id = p_job_id AND status = 'queued';
+
+  IF NOT FOUND THEN
+    RETURN FALSE;
+  END IF;
+
+  UPDATE public.dataset_versions
+  SET status = 'profiling'
+  WHERE id = p_version_id;
+
+  RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Store the profile, mark the version ready and complete the job atomically.
+CREATE OR REPLACE FUNCTION public.complete_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_profile JSONB
+)
+RETURNS UUID AS $$
+DECLARE
+  v_profile_id UUID;
+BEGIN
+  INSERT INTO public.dataset_profiles (
+    version_id, schema_info, statistics, correlations, missing_values,
+    warnings, sample_data, computed_at
+  )
+  VALUES (
+    p_version_id,
+    COALESCE(p_profile->'schema_info', '[]'::jsonb),
+    COALESCE(p_profile->'statistics', '{}'::jsonb),
+    p_profile->'correlations',
+    p_profile->'missing_values',
+    COALESCE(p_profile->'warnings', '[]'::jsonb),
+    p_profile->'sample_data',
+    NOW()
+  )
+  ON CONFLICT (version_id) DO UPDATE SET
+    schema_info = EXCLUDED.schema_info,
+    statistics = EXCLUDED.statistics,
+    correlations = EXCLUDED.correlations,
+    missing_values = EXCLUDED.missing_values,
+    warnings = EXCLUDED.warnings,
+    sample_data = EXCLUDED.sample_data,
+    computed_at = EXCLUDED.computed_at
+  RETURNING id INTO v_profile_id;
+
+  UPDATE public.dataset_versions
+  SET status = 'ready',
+      row_count = (p_profile->'statistics'->>'row_count')::INTEGER,
+      column_count = (p_profile->'statistics'->>'column_count')::INTEGER,
+      error_message = NULL
+  WHERE id = p_version_id;
+
+  UPDATE public.jobs
+  SET status = 'completed', progress = 100, completed_at = NOW(), error_message = NULL
+  WHERE id = p_job_id;
+
+  RETURN v_profile_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fail the job and flag its version (when known) in one transaction.
+CREATE OR REPLACE FUNCTION public.fail_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_error TEXT
+)
+RETURNS VOID AS $$
+BEGIN
+  UPDATE public.jobs
+  SET status = 'failed', progress = 100, error_message = p_error, completed_at = NOW()
+  WHERE id = p_job_id;
+
+  IF p_version_id IS NOT NULL THEN
+    UPDATE public.dataset_versions
+    SET status = 'error', error_message = p_error
+    WHERE id = p_version_id;
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
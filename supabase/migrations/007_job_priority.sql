@@ -0,0 +1,12 @@
+-- =====================================================
+-- JOB PRIORITIES
+-- Higher priority jobs are dispatched first. Interactive work
+-- (small uploads, previews) uses high values, bulk re-profiles low ones.
+-- =====================================================
+
+ALTER TABLE public.jobs
+  ADD COLUMN IF NOT EXISTS priority INTEGER NOT NULL DEFAULT 50;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_dispatch
+  ON public.jobs(job_type, priority DESC, created_at)
+  WHERE status = 'queued';
@@ -0,0 +1,8 @@
+-- =====================================================
+-- JOB PROGRESS DETAIL
+-- Stage-level progress reported by workers, e.g.
+-- {"stage": "columns", "fraction": 0.62, "columns_done": 14, "columns_total": 20}
+-- =====================================================
+
+ALTER TABLE public.jobs
+  ADD COLUMN IF NOT EXISTS progress_detail JSONB;
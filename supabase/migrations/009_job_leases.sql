@@ -0,0 +1,156 @@
+-- =====================================================
+-- JOB LEASES
+-- A worker that claims a job holds a lease on it and renews it
+-- with heartbeats. Jobs whose lease expired (the worker died)
+-- are requeued with bounded exponential backoff, or failed once
+-- they run out of attempts.
+-- =====================================================
+
+ALTER TABLE public.jobs
+  ADD COLUMN IF NOT EXISTS lease_owner TEXT,
+  ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ,
+  ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ,
+  ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS max_attempts INTEGER NOT NULL DEFAULT 3,
+  ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_lease_expiry
+  ON public.jobs(lease_expires_at)
+  WHERE status = 'running';
+
+-- Requeue a job after a crash or a transient error, or fail it for good
+-- when it has used up its attempts. Backoff doubles per attempt:
+-- p_base_seconds, 2 * p_base_seconds, ... capped at p_max_seconds.
+CREATE OR REPLACE FUNCTION public.retry_or_fail_job(
+  p_job_id UUID,
+  p_error TEXT,
+  p_base_seconds INTEGER DEFAULT 30,
+  p_max_seconds INTEGER DEFAULT 900
+)
+RETURNS TEXT AS $$
+DECLARE
+  v_job public.jobs%ROWTYPE;
+  v_version_id UUID;
+BEGIN
+  SELECT * INTO v_job FROM public.jobs WHERE id = p_job_id FOR UPDATE;
+  IF NOT FOUND OR v_job.status <> 'running' THEN
+    RETURN NULL;
+  END IF;
+
+  v_version_id := NULLIF(v_job.payload->>'version_id', '')::UUID;
+
+  IF v_job.attempts >= v_job.max_attempts THEN
+    UPDATE public.jobs
+    SET status = 'failed', progress = 100, error_message = p_error, completed_at = NOW(),
+        lease_owner = NULL, lease_expires_at = NULL
+    WHERE id = p_job_id;
+
+    IF v_version_id IS NOT NULL THEN
+      UPDATE public.dataset_versions
+      SET status = 'error', error_message = p_error
+      WHERE id = v_version_id;
+    END IF;
+    RETURN 'failed';
+  END IF;
+
+  UPDATE public.jobs
+  SET status = 'queued', progress = 0, error_message = p_error,
+      lease_owner = NULL, lease_expires_at = NULL,
+      next_attempt_at = NOW() + make_interval(
+        secs => LEAST(p_max_seconds, p_base_seconds * POWER(2, GREATEST(v_job.attempts - 1, 0)))
+      )
+  WHERE id = p_job_id;
+
+  IF v_version_id IS NOT NULL THEN
+    UPDATE public.dataset_versions
+    SET status = 'uploaded'
+    WHERE id = v_version_id AND status = 'profiling';
+  END IF;
+  RETURN 'queued';
+END;
+$$ LANGUAGE plpgsql;
+
+-- Claim a queued job under a lease. Returns FALSE when another worker
+-- already claimed it or its retry backoff has not elapsed.
+DROP FUNCTION IF EXISTS public.start_profile_job(UUID, UUID);
+CREATE OR REPLACE FUNCTION public.start_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_worker_id TEXT DEFAULT NULL,
+  p_lease_seconds INTEGER DEFAULT 60
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+  UPDATE public.jobs
+  SET status = 'running', progress = 10, started_at = NOW(),
+      lease_owner = p_worker_id,
+      lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+      heartbeat_at = NOW(),
+      attempts = attempts + 1,
+      next_attempt_at = NULL
+  WHERE id = p_job_id
+    AND status = 'queued'
+    AND (next_attempt_at IS NULL OR next_attempt_at <= NOW());
+
+  IF NOT FOUND THEN
+    RETURN FALSE;
+  END IF;
+
+  UPDATE public.dataset_versions
+  SET status = 'profiling'
+  WHERE id = p_version_id;
+
+  RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Extend the lease of a running job. Returns FALSE when the caller no
+-- longer owns it (the lease expired and the job was reclaimed).
+CREATE OR REPLACE FUNCTION public.heartbeat_job(
+  p_job_id UUID,
+  p_worker_id TEXT,
+  p_lease_seconds INTEGER DEFAULT 60
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+  UPDATE public.jobs
+  SET heartbeat_at = NOW(),
+      lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+  WHERE id = p_job_id AND status = 'running' AND lease_owner = p_worker_id;
+
+  RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Requeue (or fail) every running job whose lease has expired.
+-- Safe to call from any number of workers concurrently.
+CREATE OR REPLACE FUNCTION public.reclaim_expired_jobs(
+  p_job_type TEXT DEFAULT NULL,
+  p_base_seconds INTEGER DEFAULT 30,
+  p_max_seconds INTEGER DEFAULT 900
+)
+RETURNS INTEGER AS $$
+DECLARE
+  v_job_id UUID;
+  v_count INTEGER := 0;
+BEGIN
+  FOR v_job_id IN
+    SELECT id FROM public.jobs
+    WHERE status = 'running'
+      AND lease_expires_at < NOW()
+      AND (p_job_type IS NULL OR job_type = p_job_type)
+    FOR UPDATE SKIP LOCKED
+  LOOP
+    PERFORM public.retry_or_fail_job(v_job_id, 'Worker lease expired', p_base_seconds, p_max_seconds);
+    v_count := v_count + 1;
+  END LOOP;
+
+  RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Profile jobs left running by workers that predate leases get an
+-- already-expired lease, so the next reclaim pass picks them up.
+UPDATE public.jobs
+SET lease_expires_at = NOW()
+WHERE status = 'running' AND job_type = 'profile' AND lease_expires_at IS NULL;
@@ -0,0 +1,52 @@
+-- =====================================================
+-- JOB CANCELLATION
+-- cancel_job() marks a queued or running job cancelled. Workers
+-- hear about it on the "jobs_queued" channel (status = cancelled)
+-- and stop at the next checkpoint; heartbeats fail for cancelled
+-- jobs, so workers without LISTEN stop within a heartbeat interval.
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION public.cancel_job(p_job_id UUID)
+RETURNS BOOLEAN AS $$
+DECLARE
+  v_job public.jobs%ROWTYPE;
+  v_version_id UUID;
+BEGIN
+  UPDATE public.jobs
+  SET status = 'cancelled', completed_at = NOW(), error_message = 'Cancelled by user',
+      lease_owner = NULL, lease_expires_at = NULL, next_attempt_at = NULL
+  WHERE id = p_job_id AND status IN ('queued', 'running')
+  RETURNING * INTO v_job;
+
+  IF NOT FOUND THEN
+    RETURN FALSE;
+  END IF;
+
+  v_version_id := NULLIF(v_job.payload->>'version_id', '')::UUID;
+  IF v_job.job_type = 'profile' AND v_version_id IS NOT NULL THEN
+    UPDATE public.dataset_versions
+    SET status = 'error', error_message = 'Profiling cancelled'
+    WHERE id = v_version_id AND status IN ('uploaded', 'profiling');
+  END IF;
+
+  RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.notify_job_queued()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM pg_notify(
+    'jobs_queued',
+    json_build_object('id', NEW.id, 'job_type', NEW.job_type, 'status', NEW.status)::text
+  );
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS on_job_queued ON public.jobs;
+CREATE TRIGGER on_job_queued
+  AFTER INSERT OR UPDATE OF status ON public.jobs
+  FOR EACH ROW
+  WHEN (NEW.status IN ('queued', 'cancelled'))
+  EXECUTE FUNCTION public.notify_job_queued();
@@ -0,0 +1,111 @@
+-- =====================================================
+-- JOB DEDUPLICATION
+-- Identical pending work (same job type and payload) is coalesced
+-- into one job: enqueue_job() returns the queued/running job that
+-- already holds the dedupe key instead of inserting a duplicate.
+-- =====================================================
+
+ALTER TABLE public.jobs
+  ADD COLUMN IF NOT EXISTS dedupe_key TEXT;
+
+-- Key the oldest pending job of each identical group; younger legacy
+-- duplicates keep a NULL key and are completed along with it.
+UPDATE public.jobs j
+SET dedupe_key = j.job_type || ':' || md5(j.payload::text)
+WHERE j.status IN ('queued', 'running')
+  AND j.dedupe_key IS NULL
+  AND NOT EXISTS (
+    SELECT 1 FROM public.jobs o
+    WHERE o.status IN ('queued', 'running')
+      AND o.job_type = j.job_type
+      AND o.payload = j.payload
+      AND (o.created_at, o.id) < (j.created_at, j.id)
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe_pending
+  ON public.jobs(dedupe_key)
+  WHERE status IN ('queued', 'running') AND dedupe_key IS NOT NULL;
+
+-- Enqueue a job, or attach to the identical pending one. An attached
+-- submission raises the pending job's priority if it asks for more.
+CREATE OR REPLACE FUNCTION public.enqueue_job(
+  p_user_id UUID,
+  p_job_type TEXT,
+  p_payload JSONB,
+  p_priority INTEGER DEFAULT 50,
+  p_dedupe_key TEXT DEFAULT NULL
+)
+RETURNS SETOF public.jobs AS $$
+DECLARE
+  v_job_id UUID;
+BEGIN
+  INSERT INTO public.jobs (user_id, job_type, payload, priority, dedupe_key)
+  VALUES (
+    p_user_id, p_job_type, p_payload, p_priority,
+    COALESCE(p_dedupe_key, p_job_type || ':' || md5(p_payload::text))
+  )
+  ON CONFLICT (dedupe_key) WHERE status IN ('queued', 'running') AND dedupe_key IS NOT NULL
+  DO UPDATE SET priority = GREATEST(public.jobs.priority, EXCLUDED.priority)
+  RETURNING id INTO v_job_id;
+
+  RETURN QUERY SELECT * FROM public.jobs WHERE id = v_job_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same as 006, plus: queued profile jobs for the same version receive
+-- this result instead of profiling it again.
+CREATE OR REPLACE FUNCTION public.complete_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_profile JSONB
+)
+RETURNS UUID AS $$
+DECLARE
+  v_profile_id UUID;
+BEGIN
+  INSERT INTO public.dataset_profiles (
+    version_id, schema_info, statistics, correlations, missing_values,
+    warnings, sample_data, computed_at
+  )
+  VALUES (
+    p_version_id,
+    COALESCE(p_profile->'schema_info', '[]'::jsonb),
+    COALESCE(p_profile->'statistics', '{}'::jsonb),
+    p_profile->'correlations',
+    p_profile->'missing_values',
+    COALESCE(p_profile->'warnings', '[]'::jsonb),
+    p_profile->'sample_data',
+    NOW()
+  )
+  ON CONFLICT (version_id) DO UPDATE SET
+    schema_info = EXCLUDED.schema_info,
+    statistics = EXCLUDED.statistics,
+    correlations = EXCLUDED.correlations,
+    missing_values = EXCLUDED.missing_values,
+    warnings = EXCLUDED.warnings,
+    sample_data = EXCLUDED.sample_data,
+    computed_at = EXCLUDED.computed_at
+  RETURNING id INTO v_profile_id;
+
+  UPDATE public.dataset_versions
+  SET status = 'ready',
+      row_count = (p_profile->'statistics'->>'row_count')::INTEGER,
+      column_count = (p_profile->'statistics'->>'column_count')::INTEGER,
+      error_message = NULL
+  WHERE id = p_version_id;
+
+  UPDATE public.jobs
+  SET status = 'completed', progress = 100, completed_at = NOW(), error_message = NULL
+  WHERE id = p_job_id;
+
+  UPDATE public.jobs
+  SET status = 'completed', progress = 100, completed_at = NOW(), error_message = NULL,
+      result = jsonb_build_object('coalesced_into', p_job_id, 'profile_id', v_profile_id)
+  WHERE job_type = 'profile'
+    AND status = 'queued'
+    AND payload->>'version_id' = p_version_id::text
+    AND id IS DISTINCT FROM p_job_id;
+
+  RETURN v_profile_id;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,54 @@
+-- =====================================================
+-- JOB QUEUE STATS
+-- One-row-per-job-type snapshot of the queue, scraped by the
+-- worker services' /metrics endpoints to drive autoscaling.
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_jobs_finished
+  ON public.jobs(job_type, completed_at)
+  WHERE status IN ('completed', 'failed', 'cancelled');
+
+CREATE OR REPLACE FUNCTION public.job_queue_stats(p_window_seconds INTEGER DEFAULT 300)
+RETURNS TABLE (
+  job_type TEXT,
+  queued BIGINT,
+  queued_ready BIGINT,
+  running BIGINT,
+  oldest_queued_seconds DOUBLE PRECISION,
+  completed_recent BIGINT,
+  failed_recent BIGINT
+) AS $$
+  WITH pending AS (
+    SELECT
+      j.job_type,
+      COUNT(*) FILTER (WHERE j.status = 'queued') AS queued,
+      COUNT(*) FILTER (
+        WHERE j.status = 'queued' AND (j.next_attempt_at IS NULL OR j.next_attempt_at <= NOW())
+      ) AS queued_ready,
+      COUNT(*) FILTER (WHERE j.status = 'running') AS running,
+      EXTRACT(EPOCH FROM NOW() - MIN(j.created_at) FILTER (WHERE j.status = 'queued')) AS oldest
+    FROM public.jobs j
+    WHERE j.status IN ('queued', 'running')
+    GROUP BY j.job_type
+  ),
+  finished AS (
+    SELECT
+      j.job_type,
+      COUNT(*) FILTER (WHERE j.status = 'completed') AS completed,
+      COUNT(*) FILTER (WHERE j.status = 'failed') AS failed
+    FROM public.jobs j
+    WHERE j.status IN ('completed', 'failed', 'cancelled')
+      AND j.completed_at >= NOW() - make_interval(secs => p_window_seconds)
+    GROUP BY j.job_type
+  )
+  SELECT
+    COALESCE(p.job_type, f.job_type),
+    COALESCE(p.queued, 0),
+    COALESCE(p.queued_ready, 0),
+    COALESCE(p.running, 0),
+    COALESCE(p.oldest, 0)::DOUBLE PRECISION,
+    COALESCE(f.completed, 0),
+    COALESCE(f.failed, 0)
+  FROM pending p
+  FULL OUTER JOIN finished f ON f.job_type = p.job_type;
+$$ LANGUAGE sql STABLE;
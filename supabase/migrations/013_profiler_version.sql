@@ -0,0 +1,225 @@
+-- =====================================================
+-- PROFILER VERSIONS AND BULK RE-PROFILING
+-- Every profile records the profiler version that computed it.
+-- enqueue_reprofile_jobs() queues low-priority profile jobs for
+-- versions whose profile predates the current profiler.
+-- A ready version stays ready (serving its old profile) while it
+-- is re-profiled, and keeps it if the re-profile fails.
+-- =====================================================
+
+ALTER TABLE public.dataset_profiles
+  ADD COLUMN IF NOT EXISTS profiler_version INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_dataset_profiles_profiler_version
+  ON public.dataset_profiles(profiler_version, computed_at);
+
+-- Queue up to p_limit re-profile jobs, keeping at most p_max_pending
+-- of them queued or running. Returns the number of jobs enqueued.
+CREATE OR REPLACE FUNCTION public.enqueue_reprofile_jobs(
+  p_profiler_version INTEGER,
+  p_limit INTEGER DEFAULT 100,
+  p_max_pending INTEGER DEFAULT 500,
+  p_priority INTEGER DEFAULT 10
+)
+RETURNS INTEGER AS $$
+DECLARE
+  v_pending INTEGER;
+  v_row RECORD;
+  v_count INTEGER := 0;
+BEGIN
+  SELECT COUNT(*) INTO v_pending
+  FROM public.jobs
+  WHERE job_type = 'profile' AND status IN ('queued', 'running') AND priority <= p_priority;
+
+  FOR v_row IN
+    SELECT v.id, v.storage_path, pr.user_id
+    FROM public.dataset_profiles p
+    JOIN public.dataset_versions v ON v.id = p.version_id
+    JOIN public.datasets d ON d.id = v.dataset_id
+    JOIN public.projects pr ON pr.id = d.project_id
+    WHERE p.profiler_version < p_profiler_version
+      AND v.status = 'ready'
+      AND v.storage_path IS NOT NULL
+      AND NOT EXISTS (
+        SELECT 1 FROM public.jobs j
+        WHERE j.job_type = 'profile'
+          AND j.status IN ('queued', 'running')
+          AND j.payload->>'version_id' = v.id::text
+      )
+    ORDER BY p.computed_at
+    LIMIT GREATEST(0, LEAST(p_limit, p_max_pending - v_pending))
+  LOOP
+    -- Same payload as an upload's profile job, so enqueue_job dedupes them.
+    PERFORM public.enqueue_job(
+      v_row.user_id,
+      'profile',
+      jsonb_build_object('version_id', v_row.id, 'storage_path', v_row.storage_path),
+      p_priority
+    );
+    v_count := v_count + 1;
+  END LOOP;
+
+  RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same as 009, but a ready version is not flipped to profiling.
+CREATE OR REPLACE FUNCTION public.start_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_worker_id TEXT DEFAULT NULL,
+  p_lease_seconds INTEGER DEFAULT 60
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+  UPDATE public.jobs
+  SET status = 'running', progress = 10, started_at = NOW(),
+      lease_owner = p_worker_id,
+      lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+      heartbeat_at = NOW(),
+      attempts = attempts + 1,
+      next_attempt_at = NULL
+  WHERE id = p_job_id
+    AND status = 'queued'
+    AND (next_attempt_at IS NULL OR next_attempt_at <= NOW());
+
+  IF NOT FOUND THEN
+    RETURN FALSE;
+  END IF;
+
+  UPDATE public.dataset_versions
+  SET status = 'profiling'
+  WHERE id = p_version_id AND status <> 'ready';
+
+  RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same as 006, but a ready version keeps its previous profile.
+CREATE OR REPLACE FUNCTION public.fail_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_error TEXT
+)
+RETURNS VOID AS $$
+BEGIN
+  UPDATE public.jobs
+  SET status = 'failed', progress = 100, error_message = p_error, completed_at = NOW()
+  WHERE id = p_job_id;
+
+  IF p_version_id IS NOT NULL THEN
+    UPDATE public.dataset_versions
+    SET status = 'error', error_message = p_error
+    WHERE id = p_version_id AND status <> 'ready';
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same as 009, but a ready version keeps its previous profile.
+CREATE OR REPLACE FUNCTION public.retry_or_fail_job(
+  p_job_id UUID,
+  p_error TEXT,
+  p_base_seconds INTEGER DEFAULT 30,
+  p_max_seconds INTEGER DEFAULT 900
+)
+RETURNS TEXT AS $$
+DECLARE
+  v_job public.jobs%ROWTYPE;
+  v_version_id UUID;
+BEGIN
+  SELECT * INTO v_job FROM public.jobs WHERE id = p_job_id FOR UPDATE;
+  IF NOT FOUND OR v_job.status <> 'running' THEN
+    RETURN NULL;
+  END IF;
+
+  v_version_id := NULLIF(v_job.payload->>'version_id', '')::UUID;
+
+  IF v_job.attempts >= v_job.max_attempts THEN
+    UPDATE public.jobs
+    SET status = 'failed', progress = 100, error_message = p_error, completed_at = NOW(),
+        lease_owner = NULL, lease_expires_at = NULL
+    WHERE id = p_job_id;
+
+    IF v_version_id IS NOT NULL THEN
+      UPDATE public.dataset_versions
+      SET status = 'error', error_message = p_error
+      WHERE id = v_version_id AND status <> 'ready';
+    END IF;
+    RETURN 'failed';
+  END IF;
+
+  UPDATE public.jobs
+  SET status = 'queued', progress = 0, error_message = p_error,
+      lease_owner = NULL, lease_expires_at = NULL,
+      next_attempt_at = NOW() + make_interval(
+        secs => LEAST(p_max_seconds, p_base_seconds * POWER(2, GREATEST(v_job.attempts - 1, 0)))
+      )
+  WHERE id = p_job_id;
+
+  IF v_version_id IS NOT NULL THEN
+    UPDATE public.dataset_versions
+    SET status = 'uploaded'
+    WHERE id = v_version_id AND status = 'profiling';
+  END IF;
+  RETURN 'queued';
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same as 011, plus the profiler_version stamp.
+CREATE OR REPLACE FUNCTION public.complete_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_profile JSONB
+)
+RETURNS UUID AS $$
+DECLARE
+  v_profile_id UUID;
+BEGIN
+  INSERT INTO public.dataset_profiles (
+    version_id, schema_info, statistics, correlations, missing_values,
+    warnings, sample_data, profiler_version, computed_at
+  )
+  VALUES (
+    p_version_id,
+    COALESCE(p_profile->'schema_info', '[]'::jsonb),
+    COALESCE(p_profile->'statistics', '{}'::jsonb),
+    p_profile->'correlations',
+    p_profile->'missing_values',
+    COALESCE(p_profile->'warnings', '[]'::jsonb),
+    p_profile->'sample_data',
+    COALESCE((p_profile->>'profiler_version')::INTEGER, 0),
+    NOW()
+  )
+  ON CONFLICT (version_id) DO UPDATE SET
+    schema_info = EXCLUDED.schema_info,
+    statistics = EXCLUDED.statistics,
+    correlations = EXCLUDED.correlations,
+    missing_values = EXCLUDED.missing_values,
+    warnings = EXCLUDED.warnings,
+    sample_data = EXCLUDED.sample_data,
+    profiler_version = EXCLUDED.profiler_version,
+    computed_at = EXCLUDED.computed_at
+  RETURNING id INTO v_profile_id;
+
+  UPDATE public.dataset_versions
+  SET status = 'ready',
+      row_count = (p_profile->'statistics'->>'row_count')::INTEGER,
+      column_count = (p_profile->'statistics'->>'column_count')::INTEGER,
+      error_message = NULL
+  WHERE id = p_version_id;
+
+  UPDATE public.jobs
+  SET status = 'completed', progress = 100, completed_at = NOW(), error_message = NULL
+  WHERE id = p_job_id;
+
+  UPDATE public.jobs
+  SET status = 'completed', progress = 100, completed_at = NOW(), error_message = NULL,
+      result = jsonb_build_object('coalesced_into', p_job_id, 'profile_id', v_profile_id)
+  WHERE job_type = 'profile'
+    AND status = 'queued'
+    AND payload->>'version_id' = p_version_id::text
+    AND id IS DISTINCT FROM p_job_id;
+
+  RETURN v_profile_id;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,10 @@
+-- =====================================================
+-- COMPRESSED DATASET UPLOADS
+-- .gz, .zst and .zip uploads are stored as uploaded; services
+-- decompress them while streaming from storage. The codec is
+-- also implied by the storage_path extension.
+-- =====================================================
+
+ALTER TABLE public.dataset_versions
+  ADD COLUMN IF NOT EXISTS compression TEXT
+  CHECK (compression IS NULL OR compression IN ('gzip', 'zstd', 'zip'));
@@ -0,0 +1,9 @@
+-- =====================================================
+-- CANONICAL PARQUET COPIES
+-- After profiling, the profiler writes a typed, zstd-compressed
+-- Parquet copy of each CSV/JSON/Excel upload next to the original
+-- (<storage_path>.parquet). Readers prefer it when it is set.
+-- =====================================================
+
+ALTER TABLE public.dataset_versions
+  ADD COLUMN IF NOT EXISTS parquet_path TEXT;
@@ -0,0 +1,9 @@
+-- =====================================================
+-- PRELIMINARY SCHEMA
+-- Columns, dtypes, delimiter and an estimated row count sniffed
+-- from the first chunk of an upload (or a Parquet footer), shown
+-- until the profile job completes.
+-- =====================================================
+
+ALTER TABLE public.dataset_versions
+  ADD COLUMN IF NOT EXISTS preliminary_schema JSONB;
@@ -0,0 +1,41 @@
+-- =====================================================
+-- STREAMING AND RESUMABLE UPLOADS
+-- One-shot uploads are streamed to storage and hashed inline
+-- (content_sha256). Large files use resumable upload sessions,
+-- relayed chunk by chunk to the storage TUS endpoint.
+-- =====================================================
+
+ALTER TABLE public.dataset_versions
+  ADD COLUMN IF NOT EXISTS content_sha256 TEXT;
+
+CREATE TABLE IF NOT EXISTS public.upload_sessions (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  dataset_id UUID NOT NULL REFERENCES public.datasets(id) ON DELETE CASCADE,
+  storage_path TEXT NOT NULL,
+  filename TEXT NOT NULL,
+  file_type TEXT NOT NULL,
+  compression TEXT,
+  content_type TEXT,
+  size BIGINT NOT NULL CHECK (size > 0),
+  received_bytes BIGINT NOT NULL DEFAULT 0,
+  upload_url TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'active' CHECK (status IN ('active', 'completed', 'aborted')),
+  preliminary_schema JSONB,
+  dataset_version_id UUID REFERENCES public.dataset_versions(id) ON DELETE SET NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_user_status
+  ON public.upload_sessions(user_id, status);
+
+DROP TRIGGER IF EXISTS set_updated_at ON public.upload_sessions;
+CREATE TRIGGER set_updated_at BEFORE UPDATE ON public.upload_sessions
+  FOR EACH ROW EXECUTE FUNCTION public.handle_updated_at();
+
+ALTER TABLE public.upload_sessions ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own upload sessions" ON public.upload_sessions;
+CREATE POLICY "Users can view own upload sessions" ON public.upload_sessions
+  FOR SELECT USING (auth.uid() = user_id);
@@ -0,0 +1,26 @@
+-- =====================================================
+-- DEDUPLICATED VERSION STORAGE
+-- Uploads are split into content-defined chunks stored once per
+-- user under <user_id>/chunks/<aa>/<sha256>; a version's storage
+-- path holds a small manifest listing its chunks in order.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS public.dataset_chunks (
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  sha256 TEXT NOT NULL CHECK (sha256 ~ '^[0-9a-f]{64}$'),
+  size INTEGER NOT NULL CHECK (size > 0),
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (user_id, sha256)
+);
+
+ALTER TABLE public.dataset_chunks ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own dataset chunks" ON public.dataset_chunks;
+CREATE POLICY "Users can view own dataset chunks" ON public.dataset_chunks
+  FOR SELECT USING (auth.uid() = user_id);
+
+-- chunk_count is NULL for versions stored as a single object;
+-- stored_bytes is what the upload actually added to storage.
+ALTER TABLE public.dataset_versions
+  ADD COLUMN IF NOT EXISTS chunk_count INTEGER,
+  ADD COLUMN IF NOT EXISTS stored_bytes BIGINT;
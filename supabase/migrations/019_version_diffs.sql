@@ -0,0 +1,100 @@
+-- =====================================================
+-- DATASET VERSION DIFFS
+-- Profiles keep their per-column statistics (histograms,
+-- quantiles, top values) so versions can be compared without
+-- re-reading them; computed diffs are cached per version pair.
+-- =====================================================
+
+ALTER TABLE public.dataset_profiles
+  ADD COLUMN IF NOT EXISTS column_stats JSONB;
+
+-- Same as 013, plus column_stats.
+CREATE OR REPLACE FUNCTION public.complete_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_profile JSONB
+)
+RETURNS UUID AS $$
+DECLARE
+  v_profile_id UUID;
+BEGIN
+  INSERT INTO public.dataset_profiles (
+    version_id, schema_info, statistics, column_stats, correlations, missing_values,
+    warnings, sample_data, profiler_version, computed_at
+  )
+  VALUES (
+    p_version_id,
+    COALESCE(p_profile->'schema_info', '[]'::jsonb),
+    COALESCE(p_profile->'statistics', '{}'::jsonb),
+    p_profile->'column_stats',
+    p_profile->'correlations',
+    p_profile->'missing_values',
+    COALESCE(p_profile->'warnings', '[]'::jsonb),
+    p_profile->'sample_data',
+    COALESCE((p_profile->>'profiler_version')::INTEGER, 0),
+    NOW()
+  )
+  ON CONFLICT (version_id) DO UPDATE SET
+    schema_info = EXCLUDED.schema_info,
+    statistics = EXCLUDED.statistics,
+    column_stats = EXCLUDED.column_stats,
+    correlations = EXCLUDED.correlations,
+    missing_values = EXCLUDED.missing_values,
+    warnings = EXCLUDED.warnings,
+    sample_data = EXCLUDED.sample_data,
+    profiler_version = EXCLUDED.profiler_version,
+    computed_at = EXCLUDED.computed_at
+  RETURNING id INTO v_profile_id;
+
+  UPDATE public.dataset_versions
+  SET status = 'ready',
+      row_count = (p_profile->'statistics'->>'row_count')::INTEGER,
+      column_count = (p_profile->'statistics'->>'column_count')::INTEGER,
+      error_message = NULL
+  WHERE id = p_version_id;
+
+  UPDATE public.jobs
+  SET status = 'completed', progress = 100, completed_at = NOW(), error_message = NULL
+  WHERE id = p_job_id;
+
+  UPDATE public.jobs
+  SET status = 'completed', progress = 100, completed_at = NOW(), error_message = NULL,
+      result = jsonb_build_object('coalesced_into', p_job_id, 'profile_id', v_profile_id)
+  WHERE job_type = 'profile'
+    AND status = 'queued'
+    AND payload->>'version_id' = p_version_id::text
+    AND id IS DISTINCT FROM p_job_id;
+
+  RETURN v_profile_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row-level results never change (versions are immutable); the
+-- statistical part is recomputed when either profile is newer
+-- than base_profile_at / target_profile_at.
+CREATE TABLE IF NOT EXISTS public.dataset_version_diffs (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  base_version_id UUID NOT NULL REFERENCES public.dataset_versions(id) ON DELETE CASCADE,
+  target_version_id UUID NOT NULL REFERENCES public.dataset_versions(id) ON DELETE CASCADE,
+  key_columns TEXT NOT NULL DEFAULT '',
+  diff_version INTEGER NOT NULL,
+  base_profile_at TIMESTAMPTZ,
+  target_profile_at TIMESTAMPTZ,
+  result JSONB NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE (base_version_id, target_version_id, key_columns)
+);
+
+ALTER TABLE public.dataset_version_diffs ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view diffs of accessible versions" ON public.dataset_version_diffs;
+CREATE POLICY "Users can view diffs of accessible versions" ON public.dataset_version_diffs
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM public.dataset_versions
+      JOIN public.datasets ON datasets.id = dataset_versions.dataset_id
+      JOIN public.projects ON projects.id = datasets.project_id
+      WHERE dataset_versions.id = dataset_version_diffs.target_version_id
+      AND (projects.user_id = auth.uid() OR projects.is_demo = TRUE)
+    )
+  );
@@ -0,0 +1,48 @@
+-- =====================================================
+-- TRANSFORMATION PIPELINES
+-- A pipeline is a stored plan of cleaning steps over a dataset.
+-- Running it (a 'transform' job) writes the result as a new
+-- dataset version, linked back to the pipeline and the version
+-- it was computed from.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS public.dataset_pipelines (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  dataset_id UUID NOT NULL REFERENCES public.datasets(id) ON DELETE CASCADE,
+  name TEXT NOT NULL,
+  steps JSONB NOT NULL DEFAULT '[]'::jsonb,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_dataset_pipelines_dataset
+  ON public.dataset_pipelines(dataset_id);
+
+DROP TRIGGER IF EXISTS set_updated_at ON public.dataset_pipelines;
+CREATE TRIGGER set_updated_at BEFORE UPDATE ON public.dataset_pipelines
+  FOR EACH ROW EXECUTE FUNCTION public.handle_updated_at();
+
+ALTER TABLE public.dataset_pipelines ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view pipelines of accessible datasets" ON public.dataset_pipelines;
+CREATE POLICY "Users can view pipelines of accessible datasets" ON public.dataset_pipelines
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM public.datasets
+      JOIN public.projects ON projects.id = datasets.project_id
+      WHERE datasets.id = dataset_pipelines.dataset_id
+      AND (projects.user_id = auth.uid() OR projects.is_demo = TRUE)
+    )
+  );
+
+-- Lineage of versions produced by a pipeline run. The fingerprint
+-- identifies the source file plus every step, so an identical run can
+-- be recognised.
+ALTER TABLE public.dataset_versions
+  ADD COLUMN IF NOT EXISTS pipeline_id UUID REFERENCES public.dataset_pipelines(id) ON DELETE SET NULL,
+  ADD COLUMN IF NOT EXISTS source_version_id UUID REFERENCES public.dataset_versions(id) ON DELETE SET NULL,
+  ADD COLUMN IF NOT EXISTS pipeline_fingerprint TEXT;
+
+ALTER TABLE public.jobs DROP CONSTRAINT IF EXISTS jobs_job_type_check;
+ALTER TABLE public.jobs ADD CONSTRAINT jobs_job_type_check
+  CHECK (job_type IN ('profile', 'drift', 'train', 'inference', 'export', 'transform'));
@@ -0,0 +1,190 @@
+-- =====================================================
+-- LEASE-GUARDED TERMINAL JOB STATES
+-- complete_profile_job, fail_profile_job and retry_or_fail_job only
+-- act on a job that is still running under the caller's lease. A
+-- worker whose lease expired (and whose job another worker has
+-- reclaimed), or whose job was cancelled meanwhile, changes nothing:
+-- not the job, not its dataset version, not its profile.
+-- =====================================================
+
+DROP FUNCTION IF EXISTS public.complete_profile_job(UUID, UUID, JSONB);
+DROP FUNCTION IF EXISTS public.fail_profile_job(UUID, UUID, TEXT);
+DROP FUNCTION IF EXISTS public.retry_or_fail_job(UUID, TEXT, INTEGER, INTEGER);
+
+-- Same as 019, guarded. A NULL p_job_id (an inline profile from
+-- POST /api/profile) stores the profile without touching any job.
+-- Returns NULL when the job is no longer running under p_worker_id.
+CREATE OR REPLACE FUNCTION public.complete_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_profile JSONB,
+  p_worker_id TEXT DEFAULT NULL
+)
+RETURNS UUID AS $$
+DECLARE
+  v_profile_id UUID;
+BEGIN
+  IF p_job_id IS NOT NULL THEN
+    UPDATE public.jobs
+    SET status = 'completed', progress = 100, completed_at = NOW(), error_message = NULL,
+        lease_owner = NULL, lease_expires_at = NULL
+    WHERE id = p_job_id AND status = 'running' AND lease_owner = p_worker_id;
+
+    IF NOT FOUND THEN
+      RETURN NULL;
+    END IF;
+  END IF;
+
+  INSERT INTO public.dataset_profiles (
+    version_id, schema_info, statistics, column_stats, correlations, missing_values,
+    warnings, sample_data, profiler_version, computed_at
+  )
+  VALUES (
+    p_version_id,
+    COALESCE(p_profile->'schema_info', '[]'::jsonb),
+    COALESCE(p_profile->'statistics', '{}'::jsonb),
+    p_profile->'column_stats',
+    p_profile->'correlations',
+    p_profile->'missing_values',
+    COALESCE(p_profile->'warnings', '[]'::jsonb),
+    p_profile->'sample_data',
+    COALESCE((p_profile->>'profiler_version')::INTEGER, 0),
+    NOW()
+  )
+  ON CONFLICT (version_id) DO UPDATE SET
+    schema_info = EXCLUDED.schema_info,
+    statistics = EXCLUDED.statistics,
+    column_stats = EXCLUDED.column_stats,
+    correlations = EXCLUDED.correlations,
+    missing_values = EXCLUDED.missing_values,
+    warnings = EXCLUDED.warnings,
+    sample_data = EXCLUDED.sample_data,
+    profiler_version = EXCLUDED.profiler_version,
+    computed_at = EXCLUDED.computed_at
+  RETURNING id INTO v_profile_id;
+
+  UPDATE public.dataset_versions
+  SET status = 'ready',
+      row_count = (p_profile->'statistics'->>'row_count')::INTEGER,
+      column_count = (p_profile->'statistics'->>'column_count')::INTEGER,
+      error_message = NULL
+  WHERE id = p_version_id;
+
+  UPDATE public.jobs
+  SET status = 'completed', progress = 100, completed_at = NOW(), error_message = NULL,
+      result = jsonb_build_object('coalesced_into', p_job_id, 'profile_id', v_profile_id)
+  WHERE job_type = 'profile'
+    AND status = 'queued'
+    AND payload->>'version_id' = p_version_id::text
+    AND id IS DISTINCT FROM p_job_id;
+
+  RETURN v_profile_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same as 013, guarded. Returns FALSE when nothing was changed.
+CREATE OR REPLACE FUNCTION public.fail_profile_job(
+  p_job_id UUID,
+  p_version_id UUID,
+  p_error TEXT,
+  p_worker_id TEXT DEFAULT NULL
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+  UPDATE public.jobs
+  SET status = 'failed', progress = 100, error_message = p_error, completed_at = NOW(),
+      lease_owner = NULL, lease_expires_at = NULL
+  WHERE id = p_job_id AND status = 'running' AND lease_owner = p_worker_id;
+
+  IF NOT FOUND THEN
+    RETURN FALSE;
+  END IF;
+
+  IF p_version_id IS NOT NULL THEN
+    UPDATE public.dataset_versions
+    SET status = 'error', error_message = p_error
+    WHERE id = p_version_id AND status <> 'ready';
+  END IF;
+  RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same as 013, guarded on the lease owner as well as the status.
+CREATE OR REPLACE FUNCTION public.retry_or_fail_job(
+  p_job_id UUID,
+  p_error TEXT,
+  p_base_seconds INTEGER DEFAULT 30,
+  p_max_seconds INTEGER DEFAULT 900,
+  p_worker_id TEXT DEFAULT NULL
+)
+RETURNS TEXT AS $$
+DECLARE
+  v_job public.jobs%ROWTYPE;
+  v_version_id UUID;
+BEGIN
+  SELECT * INTO v_job FROM public.jobs WHERE id = p_job_id FOR UPDATE;
+  IF NOT FOUND OR v_job.status <> 'running' OR v_job.lease_owner IS DISTINCT FROM p_worker_id THEN
+    RETURN NULL;
+  END IF;
+
+  v_version_id := NULLIF(v_job.payload->>'version_id', '')::UUID;
+
+  IF v_job.attempts >= v_job.max_attempts THEN
+    UPDATE public.jobs
+    SET status = 'failed', progress = 100, error_message = p_error, completed_at = NOW(),
+        lease_owner = NULL, lease_expires_at = NULL
+    WHERE id = p_job_id;
+
+    IF v_version_id IS NOT NULL THEN
+      UPDATE public.dataset_versions
+      SET status = 'error', error_message = p_error
+      WHERE id = v_version_id AND status <> 'ready';
+    END IF;
+    RETURN 'failed';
+  END IF;
+
+  UPDATE public.jobs
+  SET status = 'queued', progress = 0, error_message = p_error,
+      lease_owner = NULL, lease_expires_at = NULL,
+      next_attempt_at = NOW() + make_interval(
+        secs => LEAST(p_max_seconds, p_base_seconds * POWER(2, GREATEST(v_job.attempts - 1, 0)))
+      )
+  WHERE id = p_job_id;
+
+  IF v_version_id IS NOT NULL THEN
+    UPDATE public.dataset_versions
+    SET status = 'uploaded'
+    WHERE id = v_version_id AND status = 'profiling';
+  END IF;
+  RETURN 'queued';
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same as 009; acts for the expired lease's owner, which the row lock
+-- taken here keeps current.
+CREATE OR REPLACE FUNCTION public.reclaim_expired_jobs(
+  p_job_type TEXT DEFAULT NULL,
+  p_base_seconds INTEGER DEFAULT 30,
+  p_max_seconds INTEGER DEFAULT 900
+)
+RETURNS INTEGER AS $$
+DECLARE
+  v_job RECORD;
+  v_count INTEGER := 0;
+BEGIN
+  FOR v_job IN
+    SELECT id, lease_owner FROM public.jobs
+    WHERE status = 'running'
+      AND lease_expires_at < NOW()
+      AND (p_job_type IS NULL OR job_type = p_job_type)
+    FOR UPDATE SKIP LOCKED
+  LOOP
+    PERFORM public.retry_or_fail_job(
+      v_job.id, 'Worker lease expired', p_base_seconds, p_max_seconds, v_job.lease_owner
+    );
+    v_count := v_count + 1;
+  END LOOP;
+
+  RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,73 @@
+-- =====================================================
+-- RE-PROFILE FAILURE BACKOFF
+-- A version whose re-profile fails keeps its old profile (013), so
+-- it stays a candidate for enqueue_reprofile_jobs. The oldest
+-- profiles are picked first, so without a backoff those versions are
+-- re-queued first on every pass. Once a batch's worth of them
+-- exists, the refresh never gets past them. Versions with a profile
+-- job that failed after their profile was computed are now skipped
+-- until p_failure_backoff_seconds have passed since that failure.
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_jobs_profile_version
+  ON public.jobs((payload->>'version_id'), status)
+  WHERE job_type = 'profile';
+
+DROP FUNCTION IF EXISTS public.enqueue_reprofile_jobs(INTEGER, INTEGER, INTEGER, INTEGER);
+
+-- Same as 013, plus the failure backoff.
+CREATE OR REPLACE FUNCTION public.enqueue_reprofile_jobs(
+  p_profiler_version INTEGER,
+  p_limit INTEGER DEFAULT 100,
+  p_max_pending INTEGER DEFAULT 500,
+  p_priority INTEGER DEFAULT 10,
+  p_failure_backoff_seconds INTEGER DEFAULT 86400
+)
+RETURNS INTEGER AS $$
+DECLARE
+  v_pending INTEGER;
+  v_row RECORD;
+  v_count INTEGER := 0;
+BEGIN
+  SELECT COUNT(*) INTO v_pending
+  FROM public.jobs
+  WHERE job_type = 'profile' AND status IN ('queued', 'running') AND priority <= p_priority;
+
+  FOR v_row IN
+    SELECT v.id, v.storage_path, pr.user_id
+    FROM public.dataset_profiles p
+    JOIN public.dataset_versions v ON v.id = p.version_id
+    JOIN public.datasets d ON d.id = v.dataset_id
+    JOIN public.projects pr ON pr.id = d.project_id
+    WHERE p.profiler_version < p_profiler_version
+      AND v.status = 'ready'
+      AND v.storage_path IS NOT NULL
+      AND NOT EXISTS (
+        SELECT 1 FROM public.jobs j
+        WHERE j.job_type = 'profile'
+          AND j.payload->>'version_id' = v.id::text
+          AND (
+            j.status IN ('queued', 'running')
+            OR (
+              j.status = 'failed'
+              AND j.completed_at > p.computed_at
+              AND j.completed_at > NOW() - make_interval(secs => p_failure_backoff_seconds)
+            )
+          )
+      )
+    ORDER BY p.computed_at
+    LIMIT GREATEST(0, LEAST(p_limit, p_max_pending - v_pending))
+  LOOP
+    -- Same payload as an upload's profile job, so enqueue_job dedupes them.
+    PERFORM public.enqueue_job(
+      v_row.user_id,
+      'profile',
+      jsonb_build_object('version_id', v_row.id, 'storage_path', v_row.storage_path),
+      p_priority
+    );
+    v_count := v_count + 1;
+  END LOOP;
+
+  RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,58 @@
+-- =====================================================
+-- API JOB LEASES
+-- Jobs the API runs in-process (exports and transforms) are
+-- claimed under a lease and heartbeated like profile jobs (009).
+-- Nothing polls the queue for them, so an API restart used to
+-- leave them queued or running for good, and enqueue_job (011)
+-- attached every later identical request to the dead job.
+-- fail_orphaned_jobs fails them instead: running jobs whose lease
+-- expired, and queued jobs no process claimed within the grace
+-- period. A failed job no longer dedupes, so the client's next
+-- request starts a fresh one.
+-- =====================================================
+
+-- Same claim as start_profile_job, without a dataset version.
+CREATE OR REPLACE FUNCTION public.start_job(
+  p_job_id UUID,
+  p_worker_id TEXT,
+  p_lease_seconds INTEGER DEFAULT 60
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+  UPDATE public.jobs
+  SET status = 'running', progress = 10, started_at = NOW(),
+      lease_owner = p_worker_id,
+      lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+      heartbeat_at = NOW(),
+      attempts = attempts + 1,
+      next_attempt_at = NULL
+  WHERE id = p_job_id AND status = 'queued';
+
+  RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fail jobs of p_job_types left behind by a process that stopped.
+-- Running jobs without a lease were claimed before this migration.
+CREATE OR REPLACE FUNCTION public.fail_orphaned_jobs(
+  p_job_types TEXT[],
+  p_queued_grace_seconds INTEGER DEFAULT 300
+)
+RETURNS INTEGER AS $$
+DECLARE
+  v_count INTEGER;
+BEGIN
+  UPDATE public.jobs
+  SET status = 'failed', progress = 100, completed_at = NOW(),
+      error_message = 'The API stopped before the job finished; please retry',
+      lease_owner = NULL, lease_expires_at = NULL
+  WHERE job_type = ANY(p_job_types)
+    AND (
+      (status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < NOW()))
+      OR (status = 'queued' AND created_at < NOW() - make_interval(secs => p_queued_grace_seconds))
+    );
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
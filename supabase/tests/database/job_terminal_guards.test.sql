@@ -0,0 +1,91 @@
+-- Terminal job RPCs act only on a job still running under the caller's
+-- lease (migration 021). Run with `supabase test db`.
+BEGIN;
+CREATE EXTENSION IF NOT EXISTS pgtap WITH SCHEMA extensions;
+SELECT plan(13);
+
+INSERT INTO public.projects (id, name, is_demo)
+VALUES ('00000000-0000-0000-0000-0000000000a1', 'Job guard tests', TRUE);
+INSERT INTO public.datasets (id, project_id, name, file_type)
+VALUES ('00000000-0000-0000-0000-0000000000b1', '00000000-0000-0000-0000-0000000000a1', 'guards', 'csv');
+INSERT INTO public.dataset_versions (id, dataset_id, version_number, storage_path)
+VALUES
+  ('00000000-0000-0000-0000-0000000000c1', '00000000-0000-0000-0000-0000000000b1', 1, 'guards/v1.csv'),
+  ('00000000-0000-0000-0000-0000000000c2', '00000000-0000-0000-0000-0000000000b1', 2, 'guards/v2.csv');
+INSERT INTO public.jobs (id, job_type, payload)
+VALUES
+  ('00000000-0000-0000-0000-0000000000d1', 'profile',
+   '{"version_id": "00000000-0000-0000-0000-0000000000c1", "storage_path": "guards/v1.csv"}'),
+  ('00000000-0000-0000-0000-0000000000d2', 'profile',
+   '{"version_id": "00000000-0000-0000-0000-0000000000c2", "storage_path": "guards/v2.csv"}');
+
+-- A cancel that lands while the worker is finishing wins.
+SELECT ok(
+  public.start_profile_job('00000000-0000-0000-0000-0000000000d1', '00000000-0000-0000-0000-0000000000c1', 'worker-a', 60),
+  'worker-a claims the first job'
+);
+SELECT ok(public.cancel_job('00000000-0000-0000-0000-0000000000d1'), 'the running job is cancelled');
+SELECT is(
+  public.complete_profile_job(
+    '00000000-0000-0000-0000-0000000000d1', '00000000-0000-0000-0000-0000000000c1',
+    '{"statistics": {"row_count": 3, "column_count": 2}}', 'worker-a'
+  ),
+  NULL::uuid,
+  'completing a cancelled job is a no-op'
+);
+SELECT is(
+  (SELECT status FROM public.jobs WHERE id = '00000000-0000-0000-0000-0000000000d1'),
+  'cancelled',
+  'the job stays cancelled'
+);
+SELECT is(
+  (SELECT status FROM public.dataset_versions WHERE id = '00000000-0000-0000-0000-0000000000c1'),
+  'error',
+  'the version is not flipped back to ready'
+);
+SELECT is_empty(
+  $$SELECT 1 FROM public.dataset_profiles WHERE version_id = '00000000-0000-0000-0000-0000000000c1'$$,
+  'no profile is written for the cancelled job'
+);
+SELECT ok(
+  NOT public.fail_profile_job('00000000-0000-0000-0000-0000000000d1', '00000000-0000-0000-0000-0000000000c1', 'boom', 'worker-a'),
+  'failing a cancelled job is a no-op'
+);
+SELECT is(
+  public.retry_or_fail_job('00000000-0000-0000-0000-0000000000d1', 'boom', 30, 900, 'worker-a'),
+  NULL::text,
+  'requeueing a cancelled job is a no-op'
+);
+
+-- A worker whose lease expired cannot finish a job another worker reclaimed.
+SELECT ok(
+  public.start_profile_job('00000000-0000-0000-0000-0000000000d2', '00000000-0000-0000-0000-0000000000c2', 'worker-a', 60),
+  'worker-a claims the second job'
+);
+UPDATE public.jobs SET lease_expires_at = NOW() - INTERVAL '1 second'
+WHERE id = '00000000-0000-0000-0000-0000000000d2';
+SELECT cmp_ok(public.reclaim_expired_jobs('profile'), '>=', 1, 'the expired lease is reclaimed');
+UPDATE public.jobs SET next_attempt_at = NULL WHERE id = '00000000-0000-0000-0000-0000000000d2';
+SELECT ok(
+  public.start_profile_job('00000000-0000-0000-0000-0000000000d2', '00000000-0000-0000-0000-0000000000c2', 'worker-b', 60),
+  'worker-b reclaims the expired job'
+);
+SELECT is(
+  public.complete_profile_job(
+    '00000000-0000-0000-0000-0000000000d2', '00000000-0000-0000-0000-0000000000c2',
+    '{"statistics": {"row_count": 3, "column_count": 2}}', 'worker-a'
+  ),
+  NULL::uuid,
+  'the stale worker cannot complete it'
+);
+SELECT isnt(
+  public.complete_profile_job(
+    '00000000-0000-0000-0000-0000000000d2', '00000000-0000-0000-0000-0000000000c2',
+    '{"statistics": {"row_count": 3, "column_count": 2}}', 'worker-b'
+  ),
+  NULL::uuid,
+  'the lease owner completes it'
+);
+
+SELECT * FROM finish();
+ROLLBACK;
@@ -0,0 +1,46 @@
+-- fail_orphaned_jobs fails API jobs a stopped process left behind, and
+-- only those (migration 023). Run with `supabase test db`.
+BEGIN;
+CREATE EXTENSION IF NOT EXISTS pgtap WITH SCHEMA extensions;
+SELECT plan(7);
+
+INSERT INTO public.jobs (id, job_type, payload, created_at)
+VALUES
+  ('00000000-0000-0000-0000-0000000000e1', 'export', '{"version_id": "v1", "format": "csv"}', NOW()),
+  ('00000000-0000-0000-0000-0000000000e2', 'export', '{"version_id": "v2", "format": "csv"}', NOW()),
+  ('00000000-0000-0000-0000-0000000000e3', 'export', '{"version_id": "v3", "format": "csv"}', NOW() - INTERVAL '1 hour'),
+  ('00000000-0000-0000-0000-0000000000e4', 'export', '{"version_id": "v4", "format": "csv"}', NOW()),
+  ('00000000-0000-0000-0000-0000000000e5', 'profile', '{"version_id": "v5"}', NOW() - INTERVAL '1 hour');
+-- As enqueue_job keys them (011).
+UPDATE public.jobs SET dedupe_key = job_type || ':' || md5(payload::text)
+WHERE id::text LIKE '00000000-0000-0000-0000-0000000000e%';
+
+SELECT ok(public.start_job('00000000-0000-0000-0000-0000000000e1', 'api-a', 60), 'api-a claims a job');
+SELECT ok(NOT public.start_job('00000000-0000-0000-0000-0000000000e1', 'api-b', 60), 'a running job cannot be claimed again');
+SELECT ok(public.start_job('00000000-0000-0000-0000-0000000000e2', 'api-a', 60), 'api-a claims a second job');
+UPDATE public.jobs SET lease_expires_at = NOW() - INTERVAL '1 second'
+WHERE id = '00000000-0000-0000-0000-0000000000e2';
+
+SELECT is(public.fail_orphaned_jobs(ARRAY['export'], 300), 2, 'the expired and the stale queued job are failed');
+SELECT results_eq(
+  $$SELECT id::text, status FROM public.jobs WHERE id::text LIKE '00000000-0000-0000-0000-0000000000e%' ORDER BY id$$,
+  $$VALUES
+    ('00000000-0000-0000-0000-0000000000e1', 'running'),
+    ('00000000-0000-0000-0000-0000000000e2', 'failed'),
+    ('00000000-0000-0000-0000-0000000000e3', 'failed'),
+    ('00000000-0000-0000-0000-0000000000e4', 'queued'),
+    ('00000000-0000-0000-0000-0000000000e5', 'queued')$$,
+  'live leases, fresh queued jobs and other job types are left alone'
+);
+SELECT ok(
+  NOT public.heartbeat_job('00000000-0000-0000-0000-0000000000e2', 'api-a', 60),
+  'the failed job can no longer be heartbeated'
+);
+SELECT isnt(
+  (SELECT id FROM public.enqueue_job(NULL, 'export', '{"version_id": "v2", "format": "csv"}')),
+  '00000000-0000-0000-0000-0000000000e2'::uuid,
+  'a new identical request no longer dedupes onto the failed job'
+);
+
+SELECT * FROM finish();
+ROLLBACK;